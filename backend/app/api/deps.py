@@ -1,46 +1,112 @@
-from typing import Generator, Optional
+import hashlib
+import math
+from datetime import datetime, timezone
+from typing import Callable, Generator, Optional
 from bson import ObjectId
 
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Query, Request, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from pydantic import ValidationError
 
 from app.core.config import settings
+from app.core.rate_limit import RateLimit, check_rate_limits
 from app.db.mongodb import db
 from app.models.user import UserInDB
-from app.schemas.user import TokenPayload
+from app.schemas.user import Principal, TokenPayload
+from app.services.token_versions import get_token_version
+from app.utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
+# Decoded token payloads keyed by a digest of the token, and loaded users keyed
+# by id. Both are per worker and short-lived; explicit invalidation covers the
+# changes made through this worker, the TTL bounds staleness everywhere else.
+token_cache = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+principal_cache = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+def invalidate_user(user_id: str) -> None:
     """
-    Get the current user from the token.
+    Drop a user from the principal cache after their document changed.
     """
-    try:
+    principal_cache.pop(user_id)
+
+def _decode_token(token: str) -> TokenPayload:
+    digest = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(digest)
+    if token_data is None:
         payload = jwt.decode(
             token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
         )
         token_data = TokenPayload(**payload)
+        remaining = (token_data.exp - datetime.now(timezone.utc)).total_seconds()
+        token_cache.set(digest, token_data, ttl=remaining)
+    elif token_data.exp <= datetime.now(timezone.utc):
+        raise JWTError("Signature has expired.")
+    return token_data
+
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials",
+    )
+
+async def _authenticate(token: str, token_type: str = "access") -> Principal:
+    try:
+        token_data = _decode_token(token)
     except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    
+        raise _credentials_error()
+    if token_data.type != token_type:
+        raise _credentials_error()
+
+    # Revoked tokens and tokens of disabled users carry an outdated version
+    version = await get_token_version(token_data.sub)
+    if version is None or token_data.ver != version:
+        raise _credentials_error()
+    return Principal(
+        id=token_data.sub,
+        username=token_data.username,
+        token_version=version,
+        expires_at=token_data.until or token_data.exp,
+    )
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Authenticate a request from its access token alone.
+
+    No user document is read: the token's claims are trusted once its
+    signature, expiry and token version check out. Use this wherever the
+    user id is all an endpoint needs.
+    """
+    return await _authenticate(token)
+
+async def get_current_user(principal: Principal = Depends(get_current_principal)) -> UserInDB:
+    """
+    Get the current user from the token.
+
+    The returned user may be shared with other requests through the principal
+    cache and must not be mutated.
+    """
+    user = principal_cache.get(principal.id)
+    if user is not None:
+        return user
+
     try:
         # Convert the string ID to ObjectId
-        object_id = ObjectId(token_data.sub)
+        object_id = ObjectId(principal.id)
         user = await db.db.users.find_one({"_id": object_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
     except Exception as e:
         raise HTTPException(
-            status_code=404, 
+            status_code=404,
             detail=f"User not found. Error: {str(e)}"
         )
-    
-    return UserInDB(**user)
+
+    user = UserInDB(**user)
+    principal_cache.set(principal.id, user)
+    return user
 
 async def get_current_active_user(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
     """
@@ -48,4 +114,101 @@ async def get_current_active_user(current_user: UserInDB = Depends(get_current_u
     """
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user
+
+async def authenticate_refresh_token(token: str) -> TokenPayload:
+    """
+    Validate a refresh token and return its claims.
+
+    Like access tokens, refresh tokens stop working when the user's token
+    version is bumped.
+    """
+    try:
+        token_data = _decode_token(token)
+    except (JWTError, ValidationError):
+        raise _credentials_error()
+    if token_data.type != "refresh" or token_data.ver != await get_token_version(token_data.sub):
+        raise _credentials_error()
+    return token_data
+
+async def get_event_stream_principal(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    ticket: Optional[str] = Query(None, description="Stream ticket, for clients that cannot send headers"),
+) -> Principal:
+    """
+    Authenticate a streaming request.
+
+    Browsers' ``EventSource`` cannot set an Authorization header, so a stream
+    ticket is accepted in the ``ticket`` query parameter instead. Access
+    tokens never are: URLs end up in access logs, and a ticket found there
+    expires within ``TASK_EVENTS_TICKET_SECONDS`` and opens nothing but a
+    stream.
+    """
+    if token:
+        return await _authenticate(token)
+    if ticket:
+        return await _authenticate(ticket, token_type="stream")
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def login_account(form_data: OAuth2PasswordRequestForm = Depends()) -> str:
+    """Account a login attempt is made for, as typed by the client."""
+    return form_data.username.strip().lower()
+
+def token_account(token: str = Depends(oauth2_scheme)) -> Optional[str]:
+    """
+    Account a bearer token belongs to, without touching the database.
+
+    Invalid tokens yield None; they are rejected later by :func:`get_current_user`.
+    """
+    try:
+        return _decode_token(token).sub
+    except (JWTError, ValidationError):
+        return None
+
+def _no_account() -> None:
+    return None
+
+def rate_limit(
+    name: str,
+    ip_limit: str,
+    account_limit: str = "",
+    account: Optional[Callable[..., Optional[str]]] = None,
+) -> Callable:
+    """
+    Build a dependency enforcing ``ip_limit`` per client IP and ``account_limit``
+    per account, as named by the ``account`` dependency.
+
+    Limits use the ``"<requests>/<seconds>"`` format of the RATE_LIMIT_*
+    settings. Routes sharing a ``name`` share their counters. Use it in the
+    route's ``dependencies`` so it runs before any other dependency, letting
+    rejected requests skip the database and password hashing entirely.
+    """
+    per_ip = RateLimit.parse(ip_limit)
+    per_account = RateLimit.parse(account_limit)
+
+    async def check(request: Request, account_id: Optional[str] = Depends(account or _no_account)) -> None:
+        checks = []
+        if per_ip and request.client:
+            checks.append((f"ip:{request.client.host}", per_ip))
+        if per_account and account_id:
+            digest = hashlib.sha256(account_id.encode()).hexdigest()[:32]
+            checks.append((f"account:{digest}", per_account))
+
+        retry_after = await check_rate_limits(name, checks)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    return check
+
+# Shared by every endpoint that writes user data
+write_rate_limit = rate_limit(
+    "write", settings.RATE_LIMIT_WRITE_IP, settings.RATE_LIMIT_WRITE_ACCOUNT, account=token_account
+)
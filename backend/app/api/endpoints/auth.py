@@ -1,18 +1,41 @@
-from datetime import timedelta
-from typing import Any
+from typing import Any, Dict
 
+from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from pymongo.errors import DuplicateKeyError
 
+from app.api.deps import authenticate_refresh_token, get_current_principal, login_account, rate_limit
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    hash_password,
+    verify_and_update_password,
+)
 from app.db.mongodb import db
 from app.models.user import UserInDB
-from app.schemas.user import Token, User, UserCreate
+from app.schemas.user import Principal, Token, TokenRefresh, User, UserCreate
+from app.services.token_versions import bump_token_version
 
 router = APIRouter()
 
-@router.post("/register", response_model=User)
+login_rate_limit = rate_limit(
+    "login", settings.RATE_LIMIT_LOGIN_IP, settings.RATE_LIMIT_LOGIN_ACCOUNT, account=login_account
+)
+register_rate_limit = rate_limit("register", settings.RATE_LIMIT_REGISTER_IP)
+refresh_rate_limit = rate_limit("refresh", settings.RATE_LIMIT_LOGIN_IP)
+
+def _issue_tokens(user: Dict[str, Any]) -> Dict[str, str]:
+    """Create an access and a refresh token for a user document."""
+    version = user.get("token_version", 0)
+    return {
+        "access_token": create_access_token(str(user["_id"]), username=user["username"], version=version),
+        "refresh_token": create_refresh_token(str(user["_id"]), version=version),
+        "token_type": "bearer",
+    }
+
+@router.post("/register", response_model=User, dependencies=[Depends(register_rate_limit)])
 async def register(user_in: UserCreate) -> Any:
     """
     Register a new user.
@@ -35,15 +58,21 @@ async def register(user_in: UserCreate) -> Any:
     
     # Create new user
     user_dict = user_in.model_dump()
-    hashed_password = get_password_hash(user_dict.pop("password"))
+    hashed_password = await hash_password(user_dict.pop("password"))
     
     user_db = UserInDB(
         **user_dict,
         hashed_password=hashed_password,
     )
     
-    # Insert user into database
-    result = await db.db.users.insert_one(user_db.model_dump(exclude={"id"}))
+    # Insert user into database; the unique indexes catch concurrent duplicates
+    try:
+        result = await db.db.users.insert_one(user_db.model_dump(exclude={"id"}))
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email or username already exists",
+        )
     
     # Update user with the generated ID
     user_db.id = str(result.inserted_id)
@@ -56,10 +85,11 @@ async def register(user_in: UserCreate) -> Any:
     
     return user_db
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(login_rate_limit)])
 async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     """
-    OAuth2 compatible token login, get an access token for future requests.
+    OAuth2 compatible token login, get an access token for future requests
+    and a refresh token to renew it with.
     """
     # Try to find user by username
     user = await db.db.users.find_one({"username": form_data.username})
@@ -68,17 +98,49 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
     if not user:
         user = await db.db.users.find_one({"email": form_data.username})
     
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if user:
+        verified, new_hash = await verify_and_update_password(
+            form_data.password, user["hashed_password"]
+        )
+    else:
+        verified, new_hash = False, None
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=str(user["_id"]), expires_delta=access_token_expires
-    )
+    if user.get("disabled"):
+        raise HTTPException(status_code=400, detail="Inactive user")
     
-    return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
+    # Transparently upgrade hashes created with an older cost factor
+    if new_hash:
+        await db.db.users.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+    
+    return _issue_tokens(user)
+
+@router.post("/refresh", response_model=Token, dependencies=[Depends(refresh_rate_limit)])
+async def refresh(token_in: TokenRefresh) -> Any:
+    """
+    Exchange a refresh token for a new access token and refresh token.
+    """
+    token_data = await authenticate_refresh_token(token_in.refresh_token)
+    user = await db.db.users.find_one({"_id": ObjectId(token_data.sub)})
+    if not user or user.get("disabled"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    return _issue_tokens(user)
+
+@router.post("/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke(current_user: Principal = Depends(get_current_principal)) -> None:
+    """
+    Sign out everywhere: invalidate every access and refresh token issued so far.
+    """
+    await bump_token_version(current_user.id) 
\ No newline at end of file
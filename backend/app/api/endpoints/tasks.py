@@ -1,47 +1,410 @@
-from typing import Any, List
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
+
+import orjson
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from pymongo import ASCENDING, DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_principal, get_event_stream_principal, write_rate_limit
+from app.core.config import settings
+from app.core.security import create_stream_ticket
 from app.db.mongodb import db
-from app.db.redis import delete_cache, get_cache, set_cache
-from app.models.task import TaskInDB
-from app.models.user import UserInDB
-from app.schemas.task import Task, TaskCreate, TaskUpdate
+from app.db.redis import delete_cache, get_or_load, get_version
+from app.models.task import TaskInDB, TaskPriority, TaskStatus
+from app.schemas.task import (
+    Task,
+    TaskBulkDelete,
+    TaskBulkResult,
+    TaskBulkUpdate,
+    TaskCreate,
+    TaskOccurrence,
+    TaskPage,
+    TaskSearchPage,
+    TaskStats,
+    TaskUpdate,
+)
+from app.schemas.user import Principal, StreamTicket
+from app.services.task_events import (
+    publish_task_events,
+    stream_events,
+    task_created,
+    task_deleted,
+    task_event,
+    task_updated,
+)
+from app.services.recurrence import completes_occurrence, load_window, materialize_next
+from app.services.reminders import schedule_reminders
+from app.services.task_export import EXPORT_FIELDS, MEDIA_TYPES, projection_for, stream_tasks
+from app.services.task_query import SORT_FIELDS, TaskFilter
+from app.services.task_search import dump_search_page, normalize_query, search_tasks
+from app.services.task_stats import STATS_PROJECTION, apply_changes, get_stats
+from app.services.task_serialization import as_stored, dump_task, dump_task_page, dump_tasks
+from app.utils.etag import etag_matches, make_etag
+from app.utils.pagination import (
+    InvalidCursor,
+    decode_offset_cursor,
+    encode_cursor,
+    encode_offset_cursor,
+    keyset_filter,
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Task])
+# Task responses are per user and must be revalidated before reuse
+TASK_CACHE_CONTROL = "private, no-cache"
+
+def _parse_object_id(value: str) -> Optional[ObjectId]:
+    """Return the ObjectId for ``value``, or None if it is not a valid id."""
+    return ObjectId(value) if ObjectId.is_valid(value) else None
+
+async def _invalidate_tasks(user_id: str, *task_ids: str) -> None:
+    """
+    Drop the user's cached task data and bump their task collection version,
+    which changes the ETags of all their task responses.
+    """
+    await delete_cache(
+        f"tasks:{user_id}",
+        f"task_search:{user_id}",
+        *(f"task:{task_id}" for task_id in task_ids),
+        bump=[f"tasks_version:{user_id}"],
+    )
+
+def _conditional_headers(if_none_match: Optional[str], *etag_parts: str) -> Tuple[Dict[str, str], bool]:
+    """
+    Build the ETag and caching headers for a response.
+
+    Also returns whether the client's copy is current, i.e. a 304 can be sent.
+    """
+    etag = make_etag(*etag_parts)
+    headers = {"ETag": etag, "Cache-Control": TASK_CACHE_CONTROL}
+    return headers, etag_matches(if_none_match, etag)
+
+def _json_response(payload: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Send an already serialized JSON payload, bypassing response_model validation.
+    """
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+async def _not_found_or_forbidden(task_id: Optional[ObjectId]) -> HTTPException:
+    """
+    Explain why an owner-scoped query matched nothing.
+
+    Only called on the failure path, so successful writes stay a single round trip.
+    """
+    if task_id is not None and await db.db.tasks.find_one({"_id": task_id}, {"_id": 1}):
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Task not found",
+    )
+
+RECURRENCE_WITHOUT_DUE_DATE = "A recurring task needs a due_date"
+
+def _recurrence_guard(update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Conditions the stored task must meet for ``update_data`` to leave it with
+    a due date if it recurs: the calendar expands recurring tasks from it.
+    """
+    if "due_date" in update_data and update_data["due_date"] is None:
+        # Clearing both is fine; the schema rejects a recurrence without one
+        return {} if "recurrence" in update_data else {"recurrence": None}
+    if update_data.get("recurrence") is not None and "due_date" not in update_data:
+        return {"due_date": {"$ne": None}}
+    return {}
+
+def task_filter(
+    status_in: Optional[List[TaskStatus]] = Query(None, alias="status"),
+    priority: Optional[List[TaskPriority]] = Query(None),
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    sort: str = Query("created_at", pattern=f"^-?({'|'.join(SORT_FIELDS)})$"),
+) -> TaskFilter:
+    """
+    Collect the task list filters from the query string.
+
+    ``status`` and ``priority`` may be repeated to match any of several values;
+    ``*_after`` bounds are inclusive and ``*_before`` bounds exclusive.
+    """
+    return TaskFilter(
+        status=status_in,
+        priority=priority,
+        due_after=due_after,
+        due_before=due_before,
+        created_after=created_after,
+        created_before=created_before,
+        sort=sort,
+    )
+
+def _check_window(start: Optional[datetime], end: Optional[datetime]) -> None:
+    """Reject windows that are open-ended, empty or too long to expand."""
+    if start is None or end is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expanding recurring tasks needs both due_after and due_before",
+        )
+    if end <= start or end - start > timedelta(days=settings.TASK_CALENDAR_MAX_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The window must end after it starts and span at most {settings.TASK_CALENDAR_MAX_DAYS} days",
+        )
+
+@router.get("/", response_model=Union[List[Task], List[TaskOccurrence], TaskPage])
 async def read_tasks(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: UserInDB = Depends(get_current_active_user),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    expand: bool = False,
+    filters: TaskFilter = Depends(task_filter),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
 ) -> Any:
     """
-    Retrieve tasks for the current user.
+    Retrieve tasks for the current user, oldest first unless ``sort`` says otherwise.
+
+    Passing ``cursor`` (an empty value requests the first page) switches to
+    keyset pagination: the response is a page object whose ``next_cursor``
+    fetches the following page. Without it, ``skip``/``limit`` offset paging
+    returns a plain list as before.
+
+    A recurring task is listed once, as its next occurrence. With ``expand``,
+    the ``due_after``/``due_before`` window also lists the occurrences that
+    follow it, as virtual tasks, ordered by due date (descending for
+    ``sort=-due_date``); only offset paging applies.
+
+    Responses carry an ETag tied to the user's task collection version;
+    ``If-None-Match`` gets a 304 without reading the cache or the database.
     """
-    # Try to get tasks from cache
-    cache_key = f"tasks:{current_user.id}"
-    cached_tasks = get_cache(cache_key)
-    
-    if cached_tasks:
-        return cached_tasks
-    
-    # If not in cache, get from database
-    tasks = await db.db.tasks.find(
-        {"user_id": current_user.id}
-    ).skip(skip).limit(limit).to_list(length=limit)
-    
-    # Store in cache for future requests
-    set_cache(cache_key, tasks, expire=300)  # Cache for 5 minutes
-    
-    return tasks
+    if expand:
+        _check_window(filters.due_after, filters.due_before)
+        if cursor is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expanded windows are paged with skip and limit",
+            )
+        page_key = f"{filters.cache_key()}|expand:{skip}:{limit}"
+    elif cursor is not None:
+        page_key = f"{filters.cache_key()}|cursor:{cursor}:{limit}"
+    else:
+        page_key = f"{filters.cache_key()}|offset:{skip}:{limit}"
+
+    # Read the version before the data so a concurrent write can only make the
+    # ETag older than the body, never newer
+    headers: Dict[str, str] = {}
+    version = await get_version(f"tasks_version:{current_user.id}")
+    if version is not None:
+        headers, not_modified = _conditional_headers(if_none_match, current_user.id, version, page_key)
+        if not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        # A page loaded before a write can't be served under the new version
+        page_key = f"v{version}|{page_key}"
+
+    query = filters.to_query(current_user.id)
+    sort = filters.to_sort()
+
+    if cursor is not None:
+        try:
+            query.update(keyset_filter(cursor, filters.sort_field, filters.direction))
+        except InvalidCursor as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
+
+    async def load_page() -> str:
+        if expand:
+            return orjson.dumps(await load_window(db.db.tasks, current_user.id, filters, skip, limit)).decode()
+        if cursor is None:
+            return dump_tasks(await db.db.tasks.find(query).sort(sort).skip(skip).limit(limit).to_list(length=limit))
+
+        # Fetch one extra document to learn whether another page exists
+        tasks = await db.db.tasks.find(query).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = None
+        if len(tasks) > limit:
+            next_cursor = encode_cursor(tasks[limit - 1], filters.sort_field, filters.direction)
+        return dump_task_page(tasks[:limit], next_cursor)
+
+    # Every page is cached, already serialized, as a field of the user's task
+    # hash so that a single delete of tasks:{user_id} invalidates all of them
+    payload = await get_or_load(
+        f"tasks:{current_user.id}", load_page, expire=300, field=page_key  # Cache for 5 minutes
+    )
+    return _json_response(payload, headers)
+
+@router.get("/calendar", response_model=List[TaskOccurrence])
+async def read_calendar(
+    start: datetime,
+    end: datetime,
+    status_in: Optional[List[TaskStatus]] = Query(None, alias="status"),
+    priority: Optional[List[TaskPriority]] = Query(None),
+    limit: int = Query(1000, ge=1, le=5000),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    List the current user's tasks due in ``[start, end)``, by due date, with
+    the occurrences of recurring tasks in the window.
+
+    Occurrences that are not stored yet have ``virtual`` set and the id of
+    the recurring task; they are stored one at a time, as each preceding one
+    is completed.
+    """
+    filters = TaskFilter(status=status_in, priority=priority, due_after=start, due_before=end, sort="due_date")
+    return await read_tasks(
+        skip=0,
+        limit=limit,
+        cursor=None,
+        expand=True,
+        filters=filters,
+        if_none_match=if_none_match,
+        current_user=current_user,
+    )
+
+@router.get("/export")
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: Optional[str] = Query(None, description="Comma-separated columns to export"),
+    gzip: bool = False,
+    current_user: Principal = Depends(get_current_principal),
+) -> StreamingResponse:
+    """
+    Stream all tasks of the current user as NDJSON or CSV.
+    """
+    columns = [field.strip() for field in fields.split(",") if field.strip()] if fields else list(EXPORT_FIELDS)
+    unknown = [field for field in columns if field not in EXPORT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export fields: {', '.join(unknown)}",
+        )
+
+    cursor = db.db.tasks.find(
+        {"user_id": current_user.id}, projection_for(columns)
+    ).sort([("created_at", ASCENDING), ("_id", ASCENDING)]).batch_size(settings.TASK_EXPORT_BATCH_SIZE)
+
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_tasks(cursor, columns, format, gzip_level=6 if gzip else None),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+@router.get("/search", response_model=TaskSearchPage)
+async def search_user_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    Search the current user's tasks by title and description, best match first.
+
+    ``q`` follows MongoDB text search syntax (``"exact phrase"``, ``-excluded``);
+    titles starting with ``q`` rank highest. Matched words are wrapped in
+    ``<mark>`` in the HTML-escaped ``highlights``. Pass ``next_cursor`` back as
+    ``cursor`` for the following page.
+    """
+    query = normalize_query(q)
+    if not query:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty search query",
+        )
+    try:
+        offset = decode_offset_cursor(cursor, query)
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    # Only the first TASK_SEARCH_MAX_RESULTS results can be paged through
+    limit = max(0, min(limit, settings.TASK_SEARCH_MAX_RESULTS - offset))
+
+    page_key = f"{query}|{offset}:{limit}"
+    version = await get_version(f"tasks_version:{current_user.id}")
+    if version is not None:
+        page_key = f"v{version}|{page_key}"
+
+    async def load_results() -> str:
+        if not limit:
+            return dump_search_page([], query, None)
+        tasks, has_more = await search_tasks(db.db.tasks, current_user.id, query, offset, limit)
+        next_cursor = encode_offset_cursor(offset + limit, query) if has_more else None
+        return dump_search_page(tasks, query, next_cursor)
+
+    # Result pages live in their own short-lived hash, dropped on every write
+    payload = await get_or_load(
+        f"task_search:{current_user.id}", load_results, expire=settings.TASK_SEARCH_CACHE_SECONDS, field=page_key
+    )
+    return _json_response(payload)
+
+@router.get("/stats", response_model=TaskStats)
+async def read_task_stats(
+    current_user: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    Count the current user's tasks by status and priority, and how many are overdue.
+    """
+    return await get_stats(db.db, current_user.id)
+
+@router.post("/events/ticket", response_model=StreamTicket)
+async def create_task_events_ticket(
+    current_user: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    Issue a short-lived ticket for opening the task event stream, for clients
+    that cannot send an Authorization header with it.
+    """
+    ticket = create_stream_ticket(
+        current_user.id, current_user.username, current_user.token_version, current_user.expires_at
+    )
+    return {"ticket": ticket, "expires_in": settings.TASK_EVENTS_TICKET_SECONDS}
+
+@router.get("/events")
+async def task_events(
+    current_user: Principal = Depends(get_event_stream_principal),
+) -> StreamingResponse:
+    """
+    Stream changes to the current user's tasks as Server-Sent Events.
+
+    Events are ``task.created`` and ``task.updated`` (with the ``task``, or
+    only the changed fields as ``changes`` for bulk updates) and
+    ``task.deleted`` (with the ``id``). ``resync`` means events were dropped
+    because the client fell behind, and it should refetch its tasks.
+    Heartbeat comments are sent while nothing happens.
 
-@router.post("/", response_model=Task, status_code=status.HTTP_201_CREATED)
+    Authenticate with the Authorization header, or, from browsers'
+    ``EventSource``, with a ticket from ``POST /tasks/events/ticket`` in the
+    ``ticket`` query parameter. The stream ends when the access token expires
+    or is revoked; reconnect with fresh credentials.
+    """
+    return StreamingResponse(
+        stream_events(current_user.id, current_user.expires_at, current_user.token_version),
+        media_type="text/event-stream",
+        # Stop proxies such as nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post(
+    "/",
+    response_model=Task,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(write_rate_limit)],
+)
 async def create_task(
     task_in: TaskCreate,
-    current_user: UserInDB = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     Create a new task.
@@ -51,138 +414,324 @@ async def create_task(
         user_id=current_user.id,
     )
     
-    # Insert task into database
-    result = await db.db.tasks.insert_one(task.model_dump(exclude={"id"}))
-    
-    # Update task with the generated ID
+    # Insert task into database; its id is derived from _id when serialized
+    document = task.model_dump(exclude={"id"})
+    result = await db.db.tasks.insert_one(document)
     task.id = str(result.inserted_id)
     
-    # Update the document with the ID
-    await db.db.tasks.update_one(
-        {"_id": result.inserted_id},
-        {"$set": {"id": str(result.inserted_id)}}
-    )
-    
-    # Invalidate cache
-    delete_cache(f"tasks:{current_user.id}")
+    # Update statistics and reminders, invalidate cache and notify
+    await apply_changes(current_user.id, [(None, document)])
+    await schedule_reminders([(None, document)])
+    await _invalidate_tasks(current_user.id)
+    await publish_task_events(current_user.id, [task_created(document)])
     
     return task
 
+# Fields read by the ownership check of bulk writes: those statistics need,
+# and those telling whether an update completes a recurring task
+OWNERSHIP_PROJECTION = {"user_id": 1, "recurrence": 1, "next_id": 1, **STATS_PROJECTION}
+
+def _check_bulk_size(items: list) -> None:
+    if len(items) > settings.TASK_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.TASK_BULK_MAX_ITEMS} items per bulk request",
+        )
+
+async def _resolve_owned_tasks(
+    ids: List[str], user_id: str, results: List[Optional[TaskBulkResult]]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Check ownership of every id with a single query.
+
+    Fills ``results`` for the items that cannot be written, including repeats
+    of an id earlier in the request, and returns the writable tasks, with the
+    ``OWNERSHIP_PROJECTION`` fields, keyed by their position in the request.
+    """
+    parsed = {index: _parse_object_id(task_id) for index, task_id in enumerate(ids)}
+    lookup = list({oid for oid in parsed.values() if oid is not None})
+    tasks = {
+        doc["_id"]: doc
+        async for doc in db.db.tasks.find({"_id": {"$in": lookup}}, OWNERSHIP_PROJECTION)
+    }
+
+    owned = {}
+    seen = set()
+    for index, oid in parsed.items():
+        if oid is not None and oid in seen:
+            # Writing a task twice would apply its statistics changes twice
+            results[index] = TaskBulkResult(index=index, id=ids[index], status="failed", detail="Duplicate id")
+            continue
+        seen.add(oid)
+        if oid is None or oid not in tasks:
+            results[index] = TaskBulkResult(index=index, id=ids[index], status="not_found", detail="Task not found")
+        elif tasks[oid]["user_id"] != user_id:
+            results[index] = TaskBulkResult(index=index, id=ids[index], status="forbidden", detail="Not enough permissions")
+        else:
+            owned[index] = tasks[oid]
+    return owned
+
+async def _execute_bulk(
+    operations: List[Any],
+    positions: List[int],
+    ids: List[str],
+    success: str,
+    results: List[Optional[TaskBulkResult]],
+) -> None:
+    """
+    Run ``operations`` as one unordered bulk write and record per-item results.
+
+    ``positions[i]`` is the request index of ``operations[i]``.
+    """
+    failed = {}
+    if operations:
+        try:
+            await db.db.tasks.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg") for error in e.details.get("writeErrors", [])}
+
+    for op_index, index in enumerate(positions):
+        if op_index in failed:
+            results[index] = TaskBulkResult(index=index, id=ids[index], status="failed", detail=failed[op_index])
+        else:
+            results[index] = TaskBulkResult(index=index, id=ids[index], status=success)
+
+@router.post("/bulk", response_model=List[TaskBulkResult], dependencies=[Depends(write_rate_limit)])
+async def create_tasks_bulk(
+    tasks_in: List[TaskCreate],
+    current_user: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    Create many tasks in a single bulk write.
+    """
+    _check_bulk_size(tasks_in)
+
+    documents = []
+    for task_in in tasks_in:
+        task = TaskInDB(**task_in.model_dump(), user_id=current_user.id)
+        document = task.model_dump(exclude={"id"})
+        document["_id"] = ObjectId()
+        documents.append(document)
+    operations = [InsertOne(document) for document in documents]
+    ids = [str(document["_id"]) for document in documents]
+
+    results: List[Optional[TaskBulkResult]] = [None] * len(ids)
+    await _execute_bulk(operations, list(range(len(ids))), ids, "created", results)
+
+    # Update statistics and reminders, invalidate cache and notify
+    created = [document for document, result in zip(documents, results) if result.status == "created"]
+    await apply_changes(current_user.id, [(None, document) for document in created])
+    await schedule_reminders([(None, document) for document in created])
+    await _invalidate_tasks(current_user.id)
+    await publish_task_events(current_user.id, [task_created(document) for document in created])
+
+    return results
+
+@router.patch("/bulk", response_model=List[TaskBulkResult], dependencies=[Depends(write_rate_limit)])
+async def update_tasks_bulk(
+    tasks_in: List[TaskBulkUpdate],
+    current_user: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    Update many tasks, checking ownership with one query and writing with one bulk write.
+    """
+    _check_bulk_size(tasks_in)
+
+    ids = [task_in.id for task_in in tasks_in]
+    results: List[Optional[TaskBulkResult]] = [None] * len(ids)
+    owned = await _resolve_owned_tasks(ids, current_user.id, results)
+
+    now = as_stored(datetime.utcnow())
+    operations = []
+    changes = []
+    for index, task in list(owned.items()):
+        update_data = as_stored(tasks_in[index].model_dump(exclude_unset=True, exclude={"id"}))
+        merged = {**task, **update_data}
+        if merged.get("recurrence") and merged.get("due_date") is None:
+            results[index] = TaskBulkResult(
+                index=index, id=ids[index], status="failed", detail=RECURRENCE_WITHOUT_DUE_DATE
+            )
+            del owned[index]
+            continue
+        update_data["updated_at"] = now
+        operations.append(UpdateOne({"_id": task["_id"], "user_id": current_user.id}, {"$set": update_data}))
+        changes.append((index, task, update_data))
+
+    await _execute_bulk(operations, list(owned), ids, "updated", results)
+
+    # Update statistics and reminders from the images read for the ownership
+    # check, then invalidate caches and notify
+    updated = [change for change in changes if results[change[0]].status == "updated"]
+
+    # Completed recurring tasks store their next occurrence, built from the
+    # full updated documents
+    completed = [
+        before["_id"] for _, before, update_data in updated
+        if completes_occurrence(before, {**before, **update_data})
+    ]
+    created = []
+    if completed:
+        documents = await db.db.tasks.find({"_id": {"$in": completed}}).to_list(length=None)
+        created = await materialize_next(db.db.tasks, documents, now)
+
+    images = [(before, {**before, **update_data}) for _, before, update_data in updated]
+    images += [(None, document) for document in created]
+    await apply_changes(current_user.id, images)
+    await schedule_reminders(images)
+    await _invalidate_tasks(current_user.id, *(ids[index] for index in owned))
+    await publish_task_events(
+        current_user.id,
+        [task_event("updated", ids[index], changes=update_data) for index, _, update_data in updated]
+        + [task_created(document) for document in created],
+    )
+
+    return results
+
+@router.delete("/bulk", response_model=List[TaskBulkResult], dependencies=[Depends(write_rate_limit)])
+async def delete_tasks_bulk(
+    tasks_in: TaskBulkDelete,
+    current_user: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    Delete many tasks, checking ownership with one query and writing with one bulk write.
+    """
+    _check_bulk_size(tasks_in.ids)
+
+    ids = tasks_in.ids
+    results: List[Optional[TaskBulkResult]] = [None] * len(ids)
+    owned = await _resolve_owned_tasks(ids, current_user.id, results)
+
+    operations = [DeleteOne({"_id": task["_id"], "user_id": current_user.id}) for task in owned.values()]
+    await _execute_bulk(operations, list(owned), ids, "deleted", results)
+
+    # Update statistics and reminders, invalidate caches and notify
+    deleted = [index for index in owned if results[index].status == "deleted"]
+    await apply_changes(current_user.id, [(owned[index], None) for index in deleted])
+    await schedule_reminders([(owned[index], None) for index in deleted])
+    await _invalidate_tasks(current_user.id, *(ids[index] for index in owned))
+    await publish_task_events(current_user.id, [task_deleted(ids[index]) for index in deleted])
+
+    return results
+
 @router.get("/{task_id}", response_model=Task)
 async def read_task(
     task_id: str,
-    current_user: UserInDB = Depends(get_current_active_user),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     Get a specific task by ID.
     """
-    # Try to get task from cache
-    cache_key = f"task:{task_id}"
-    cached_task = get_cache(cache_key)
-    
-    if cached_task:
-        # Verify that the task belongs to the current user
-        if cached_task["user_id"] != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions",
-            )
-        return cached_task
-    
-    # If not in cache, get from database
-    task = await db.db.tasks.find_one({"_id": ObjectId(task_id)})
+    headers: Dict[str, str] = {}
+    field = None
+    version = await get_version(f"tasks_version:{current_user.id}")
+    if version is not None:
+        headers, not_modified = _conditional_headers(if_none_match, current_user.id, version, f"task:{task_id}")
+        if not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        # A document loaded before a write can't be served under the new version
+        field = f"v{version}"
+
+    object_id = _parse_object_id(task_id)
+
+    async def load_task() -> Optional[str]:
+        task = await db.db.tasks.find_one({"_id": object_id}) if object_id else None
+        return dump_task(task) if task else None
+
+    # Served from cache when possible; concurrent misses share one query
+    payload = await get_or_load(f"task:{task_id}", load_task, expire=300, field=field)  # Cache for 5 minutes
     
-    if not task:
+    if not payload:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found",
         )
     
     # Verify that the task belongs to the current user
-    if task["user_id"] != current_user.id:
+    if orjson.loads(payload)["user_id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    # Store in cache for future requests
-    set_cache(cache_key, task, expire=300)  # Cache for 5 minutes
-    
-    return task
+    return _json_response(payload, headers)
 
-@router.put("/{task_id}", response_model=Task)
+@router.put("/{task_id}", response_model=Task, dependencies=[Depends(write_rate_limit)])
 async def update_task(
     task_id: str,
     task_in: TaskUpdate,
-    current_user: UserInDB = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     Update a task.
     """
-    # Get the task from the database
-    task = await db.db.tasks.find_one({"_id": ObjectId(task_id)})
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found",
-        )
+    # Add updated_at timestamp; values are written as Mongo stores them, so
+    # the image built from them matches later reads
+    update_data = as_stored({**task_in.model_dump(exclude_unset=True), "updated_at": datetime.utcnow()})
     
-    # Verify that the task belongs to the current user
-    if task["user_id"] != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
+    # Update and fetch the pre-image in one round trip, scoped to the owner;
+    # the post-image is derived from it so statistics see both
+    object_id = _parse_object_id(task_id)
+    guard = _recurrence_guard(update_data)
+    previous_task = None
+    if object_id:
+        previous_task = await db.db.tasks.find_one_and_update(
+            {"_id": object_id, "user_id": current_user.id, **guard},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE,
         )
     
-    # Update the task
-    update_data = task_in.model_dump(exclude_unset=True)
+    if not previous_task:
+        if guard and object_id and await db.db.tasks.find_one({"_id": object_id, "user_id": current_user.id}, {"_id": 1}):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=RECURRENCE_WITHOUT_DUE_DATE,
+            )
+        raise await _not_found_or_forbidden(object_id)
+    updated_task = {**previous_task, **update_data}
     
-    # Add updated_at timestamp
-    from datetime import datetime
-    update_data["updated_at"] = datetime.utcnow()
+    # Completing a recurring task stores its next occurrence
+    created = []
+    if completes_occurrence(previous_task, updated_task):
+        created = await materialize_next(db.db.tasks, [updated_task], update_data["updated_at"])
     
-    await db.db.tasks.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": update_data}
+    # Update statistics and reminders, invalidate caches and notify
+    images = [(previous_task, updated_task), *((None, doc) for doc in created)]
+    await apply_changes(current_user.id, images)
+    await schedule_reminders(images)
+    await _invalidate_tasks(current_user.id, task_id)
+    await publish_task_events(
+        current_user.id, [task_updated(updated_task), *(task_created(doc) for doc in created)]
     )
     
-    # Get the updated task
-    updated_task = await db.db.tasks.find_one({"_id": ObjectId(task_id)})
-    
-    # Invalidate caches
-    delete_cache(f"task:{task_id}")
-    delete_cache(f"tasks:{current_user.id}")
-    
-    return updated_task
+    return _json_response(dump_task(updated_task))
 
-@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete(
+    "/{task_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(write_rate_limit)],
+)
 async def delete_task(
     task_id: str,
-    current_user: UserInDB = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
 ) -> None:
     """
     Delete a task.
     """
-    # Get the task from the database
-    task = await db.db.tasks.find_one({"_id": ObjectId(task_id)})
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found",
-        )
-    
-    # Verify that the task belongs to the current user
-    if task["user_id"] != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions",
+    # Delete the task in one round trip, scoped to the owner
+    object_id = _parse_object_id(task_id)
+    deleted_task = None
+    if object_id:
+        deleted_task = await db.db.tasks.find_one_and_delete(
+            {"_id": object_id, "user_id": current_user.id},
+            projection=STATS_PROJECTION,
         )
     
-    # Delete the task
-    await db.db.tasks.delete_one({"_id": ObjectId(task_id)})
+    if not deleted_task:
+        raise await _not_found_or_forbidden(object_id)
     
-    # Invalidate caches
-    delete_cache(f"task:{task_id}")
-    delete_cache(f"tasks:{current_user.id}") 
\ No newline at end of file
+    # Update statistics and reminders, invalidate caches and notify
+    await apply_changes(current_user.id, [(deleted_task, None)])
+    await schedule_reminders([(deleted_task, None)])
+    await _invalidate_tasks(current_user.id, task_id)
+    await publish_task_events(current_user.id, [task_deleted(task_id)])
@@ -1,12 +1,15 @@
 from typing import Any
 
+from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, status
+from pymongo.errors import DuplicateKeyError
 
-from app.api.deps import get_current_active_user
-from app.core.security import get_password_hash
+from app.api.deps import get_current_active_user, invalidate_user, write_rate_limit
+from app.core.security import hash_password
 from app.db.mongodb import db
 from app.models.user import UserInDB
 from app.schemas.user import User, UserUpdate
+from app.services.token_versions import bump_token_version
 
 router = APIRouter()
 
@@ -19,7 +22,7 @@ async def read_user_me(
     """
     return current_user
 
-@router.put("/me", response_model=User)
+@router.put("/me", response_model=User, dependencies=[Depends(write_rate_limit)])
 async def update_user_me(
     user_in: UserUpdate,
     current_user: UserInDB = Depends(get_current_active_user),
@@ -30,20 +33,33 @@ async def update_user_me(
     update_data = user_in.dict(exclude_unset=True)
     
     if "password" in update_data:
-        hashed_password = get_password_hash(update_data.pop("password"))
+        hashed_password = await hash_password(update_data.pop("password"))
         update_data["hashed_password"] = hashed_password
     
     # Add updated_at timestamp
     from datetime import datetime
     update_data["updated_at"] = datetime.utcnow()
     
-    # Update user in database
-    await db.db.users.update_one(
-        {"_id": current_user.id},
-        {"$set": update_data}
-    )
+    # Update user in database; the unique indexes reject a taken email or username
+    try:
+        await db.db.users.update_one(
+            {"_id": ObjectId(current_user.id)},
+            {"$set": update_data}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email or username already exists",
+        )
+    
+    # Drop the cached principal so the next request sees the change
+    invalidate_user(current_user.id)
+    
+    # A disabled account must not keep using the tokens it already holds
+    if update_data.get("disabled"):
+        await bump_token_version(current_user.id)
     
     # Get updated user
-    updated_user = await db.db.users.find_one({"_id": current_user.id})
+    updated_user = await db.db.users.find_one({"_id": ObjectId(current_user.id)})
     
     return UserInDB(**updated_user) 
\ No newline at end of file
@@ -0,0 +1,276 @@
+"""
+Content-negotiated gzip/brotli compression for responses, and decompression
+of compressed request bodies.
+
+Brotli is used only when the optional ``brotli`` package is installed.
+"""
+import time
+import zlib
+from typing import List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import compression_bytes_total, compression_seconds
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Content types that are already compressed or must reach the client unbuffered
+SKIP_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/octet-stream",
+    "text/event-stream",
+)
+
+class _Encoder:
+    """Incremental compressor recording its byte counts and CPU time."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        started = time.perf_counter()
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            out += self._compressor.finish() if final else self._compressor.flush()
+        else:
+            out = self._compressor.compress(data)
+            out += self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        compression_seconds.observe(time.perf_counter() - started, encoding=self.encoding)
+        compression_bytes_total.inc(len(data), encoding=self.encoding, stage="in")
+        compression_bytes_total.inc(len(out), encoding=self.encoding, stage="out")
+        return out
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick ``br`` or ``gzip`` from an ``Accept-Encoding`` header, honouring q-values.
+    """
+    offered = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    for encoding in candidates:
+        quality = offered.get(encoding, offered.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+# Compressed input fed to, and output taken from, the brotli decompressor per step
+_BROTLI_STEP = 64 * 1024
+
+class BodyTooLarge(ValueError):
+    """The decompressed request body exceeds the allowed size."""
+
+def _inflate_brotli(body: bytes, max_size: int) -> bytes:
+    decompressor = brotli.Decompressor()
+    chunks: List[bytes] = []
+    size = 0
+    for offset in range(0, len(body), _BROTLI_STEP):
+        data = body[offset:offset + _BROTLI_STEP]
+        while True:
+            out = decompressor.process(data, output_buffer_limit=_BROTLI_STEP)
+            size += len(out)
+            if size > max_size:
+                raise BodyTooLarge("Decompressed body too large")
+            chunks.append(out)
+            # Drain the output buffered for this input before feeding more
+            data = b""
+            if not out or decompressor.is_finished():
+                break
+    if not decompressor.is_finished():
+        raise ValueError("Truncated brotli body")
+    return b"".join(chunks)
+
+def decompress_body(body: bytes, encoding: str, max_size: int) -> bytes:
+    """
+    Decompress a request body, refusing output larger than ``max_size`` bytes.
+
+    Output is produced in bounded steps, so a small body that inflates to a
+    huge one is rejected without ever being inflated. Raises BodyTooLarge for
+    oversized output and ValueError for unsupported encodings or corrupt data.
+    """
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = decompressor.decompress(body, max_size + 1)
+        except zlib.error as e:
+            raise ValueError("Invalid gzip body") from e
+        if len(data) > max_size:
+            raise BodyTooLarge("Decompressed body too large")
+        if not decompressor.eof:
+            raise ValueError("Truncated gzip body")
+    elif encoding == "br" and brotli is not None:
+        try:
+            data = _inflate_brotli(body, max_size)
+        except brotli.error as e:
+            raise ValueError("Invalid brotli body") from e
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+    return data
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts.
+
+    Bodies smaller than ``minimum_size``, responses that already carry a
+    Content-Encoding and already-compressed content types pass through
+    untouched. Compressed request bodies (``Content-Encoding: gzip`` or
+    ``br``) are decompressed for the methods and path prefixes given.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        decompress_methods: Sequence[str] = ("POST", "PUT", "PATCH"),
+        decompress_paths: Sequence[str] = (),
+        max_request_size: int = 10 * 1024 * 1024,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.decompress_methods = set(decompress_methods)
+        self.decompress_paths = tuple(decompress_paths)
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if "content-encoding" in headers and self._accepts_compressed_body(scope):
+            try:
+                scope, receive = await self._decompress_request(scope, receive, headers["content-encoding"])
+            except ValueError as e:
+                status_code = 413 if isinstance(e, BodyTooLarge) else 400
+                response = PlainTextResponse(str(e), status_code=status_code)
+                await response(scope, receive, send)
+                return
+
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, _Encoder(encoding, self.gzip_level, self.brotli_quality), self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+    def _accepts_compressed_body(self, scope: Scope) -> bool:
+        return scope["method"] in self.decompress_methods and scope["path"].startswith(self.decompress_paths)
+
+    async def _decompress_request(self, scope: Scope, receive: Receive, encoding: str):
+        chunks: List[bytes] = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+
+        body = decompress_body(b"".join(chunks), encoding.strip().lower(), self.max_request_size)
+
+        headers = MutableHeaders(scope={**scope, "headers": list(scope["headers"])})
+        del headers["content-encoding"]
+        headers["content-length"] = str(len(body))
+        scope = {**scope, "headers": headers.raw}
+
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return scope, replay
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoder: _Encoder, minimum_size: int):
+        self._send = send
+        self.encoder = encoder
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.started = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or content_type.startswith(SKIP_CONTENT_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            if not more_body and len(body) < self.minimum_size:
+                await self._start()
+                await self._send(message)
+                return
+
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoder.encoding
+            headers.add_vary_header("Accept-Encoding")
+            # Strong validators describe the identity representation
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            body = self.encoder.compress(body, final=not more_body)
+            if not more_body:
+                headers["Content-Length"] = str(len(body))
+            await self._start()
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        body = self.encoder.compress(body, final=not more_body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def _start(self) -> None:
+        if not self.started:
+            self.started = True
+            await self._send(self.start_message)
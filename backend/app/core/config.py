@@ -11,13 +11,132 @@ class Settings(BaseSettings):
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your_jwt_secret_key_change_in_production")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+
+    # Per-user token versions, cached per worker: revoking a user's tokens
+    # takes effect on every worker within this many seconds
+    TOKEN_VERSION_CACHE_SECONDS: int = 5
+
+    # Authenticated principal cache (per worker)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+
+    # Rate limits as "<requests>/<seconds>" sliding windows, per client IP
+    # and per account; an empty value disables that limit
+    RATE_LIMIT_LOGIN_IP: str = "20/60"
+    RATE_LIMIT_LOGIN_ACCOUNT: str = "5/60"
+    RATE_LIMIT_REGISTER_IP: str = "5/60"
+    RATE_LIMIT_WRITE_IP: str = "600/60"
+    RATE_LIMIT_WRITE_ACCOUNT: str = "300/60"
+
+    # Per-worker in-process cache in front of Redis
+    CACHE_L1_MAX_ENTRIES: int = 10000
+    CACHE_L1_TTL_SECONDS: int = 5
+
+    # Cache stampede protection: lock held while one worker reloads an entry,
+    # how long expired entries may still be served while being refreshed, and
+    # the probabilistic early expiration factor (0 disables it)
+    CACHE_LOCK_TIMEOUT_SECONDS: int = 5
+    CACHE_STALE_SECONDS: int = 30
+    CACHE_EARLY_EXPIRATION_BETA: float = 1.0
+
+    # Maximum number of items accepted by the bulk task endpoints
+    TASK_BULK_MAX_ITEMS: int = 1000
+
+    # Documents fetched per cursor batch when streaming task exports
+    TASK_EXPORT_BATCH_SIZE: int = 500
+
+    # Task search: how long result pages are cached, and how many ranked
+    # results can be paged through for one query
+    TASK_SEARCH_CACHE_SECONDS: int = 30
+    TASK_SEARCH_MAX_RESULTS: int = 500
+
+    # Task statistics counters: lifetime in Redis before a full rebuild, and
+    # interval at which counters that may have drifted are rebuilt
+    TASK_STATS_TTL_SECONDS: int = 3600
+    TASK_STATS_RECONCILE_SECONDS: int = 60
+
+    # Recurring tasks: longest window that can be expanded, occurrences
+    # expanded per task and window, and expansions cached per worker
+    TASK_CALENDAR_MAX_DAYS: int = 366
+    RECURRENCE_MAX_OCCURRENCES: int = 1000
+    RECURRENCE_CACHE_SIZE: int = 4096
+
+    # Task change feed: events buffered per connection before a slow client
+    # is told to resync, interval of the keep-alive comments (streams are
+    # also checked for expired or revoked credentials then), and how long a
+    # stream ticket can be used to connect
+    TASK_EVENTS_QUEUE_SIZE: int = 100
+    TASK_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    TASK_EVENTS_TICKET_SECONDS: int = 60
+
+    # Due date reminders: how long before the due date they are sent, how
+    # often and how many due reminders each worker claims, how long a claimed
+    # reminder may go unacknowledged before it is delivered again, and where
+    # they are delivered ("log" or "memory")
+    REMINDER_LEAD_SECONDS: int = 900
+    REMINDER_POLL_SECONDS: float = 1.0
+    REMINDER_BATCH_SIZE: int = 100
+    REMINDER_VISIBILITY_TIMEOUT_SECONDS: int = 60
+    REMINDER_NOTIFIER: str = "log"
+
+    # HTTP compression: responses smaller than the minimum size are sent as is,
+    # and decompressed request bodies are capped at the given size
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    MAX_DECOMPRESSED_REQUEST_BYTES: int = 10 * 1024 * 1024
+
+    # Production server (gunicorn.conf.py): worker processes (0 means one per
+    # available CPU), requests after which a worker is replaced, and how long
+    # in-flight requests may take to finish on shutdown
+    SERVER_BIND: str = "0.0.0.0:8000"
+    WEB_CONCURRENCY: int = 0
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    # Comma-separated addresses of the reverse proxies whose X-Forwarded-For
+    # is trusted for the client address that per-IP rate limits key on
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+
+    # Directory where gunicorn workers share their metrics, so that /metrics
+    # reports the sum over all of them, and how often each worker writes its
+    # snapshot there; empty means every worker reports only its own
+    METRICS_DIR: str = ""
+    METRICS_WRITE_INTERVAL_SECONDS: float = 5.0
+
+    # Interval at which each worker samples its event loop lag
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
     
     # MongoDB Settings
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017/taskmanager")
+    # Connection pool per worker process; MIN_POOL_SIZE connections are
+    # opened at startup so the first requests do not pay for the handshakes
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_IDLE_TIME_MS: int = 300_000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+    MONGODB_SOCKET_TIMEOUT_MS: int = 30_000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
     
     # Redis Settings
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
+    # Connection pool per worker process: callers wait up to POOL_TIMEOUT for
+    # a free connection once MAX_CONNECTIONS are in use, and MIN_CONNECTIONS
+    # are opened at startup
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_MIN_CONNECTIONS: int = 5
+    REDIS_POOL_TIMEOUT_SECONDS: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: int = 30
 
     VPS_HOST: str = os.getenv("VPS_HOST", "localhost")
     
@@ -2,7 +2,18 @@ from typing import Callable
 
 from fastapi import FastAPI
 
-from app.db.mongodb import close_mongo_connection, connect_to_mongo
+from app.core.config import settings
+from app.core.monitoring import (
+    start_event_loop_monitor,
+    start_metrics_writer,
+    stop_event_loop_monitor,
+    stop_metrics_writer,
+)
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, db
+from app.db.redis import close_redis_connection, connect_to_redis
+from app.services.reminders import start_reminder_scheduler, stop_reminder_scheduler
+from app.services.task_events import start_task_event_listener, stop_task_event_listener
+from app.services.task_stats import start_stats_reconciler, stop_stats_reconciler
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     """
@@ -10,7 +21,13 @@ def create_start_app_handler(app: FastAPI) -> Callable:
     """
     async def start_app() -> None:
         await connect_to_mongo()
-    
+        await connect_to_redis()
+        start_stats_reconciler(db.db)
+        start_task_event_listener()
+        start_reminder_scheduler(db.db)
+        start_event_loop_monitor(settings.EVENT_LOOP_LAG_INTERVAL_SECONDS)
+        start_metrics_writer(settings.METRICS_DIR, settings.METRICS_WRITE_INTERVAL_SECONDS)
+
     return start_app
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
@@ -18,6 +35,12 @@ def create_stop_app_handler(app: FastAPI) -> Callable:
     Create a function to be called when the application stops.
     """
     async def stop_app() -> None:
+        stop_event_loop_monitor()
+        stop_metrics_writer()
+        stop_reminder_scheduler()
+        stop_task_event_listener()
+        stop_stats_reconciler()
+        await close_redis_connection()
         await close_mongo_connection()
-    
-    return stop_app 
\ No newline at end of file
+
+    return stop_app
@@ -0,0 +1,328 @@
+"""
+Minimal in-process metrics primitives.
+
+Each worker keeps its own counters and histograms; the values are cheap to
+update from the event loop and from executor threads.
+
+Under gunicorn a scrape reaches whichever worker accepts it, so workers also
+write snapshots of their samples to ``METRICS_DIR`` and ``/metrics`` renders
+the sum over all of them. When a worker exits, the master folds its counters
+and histograms into ``archive.json`` and drops its gauges, so totals keep
+growing across worker restarts while gauges only count live workers.
+"""
+import bisect
+import fcntl
+import glob
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+REGISTRY: List[object] = []
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    """Monotonically increasing value, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+class Gauge:
+    """Value that can go up and down, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+class Histogram:
+    """Distribution of observed values over fixed buckets, optionally split by labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], Tuple[List[int], float, int]]]:
+        with self._lock:
+            return [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+# Samples of several workers summed, by metric name then label values
+Merged = Dict[str, Dict[Tuple[str, ...], Any]]
+
+ARCHIVE = "archive.json"
+
+def snapshot(gauges: bool = True) -> Dict[str, List[Any]]:
+    """Samples of every registered metric by name, in JSON-serializable form."""
+    return {
+        metric.name: [[list(key), value] for key, value in metric.samples()]
+        for metric in REGISTRY
+        if gauges or not isinstance(metric, Gauge)
+    }
+
+def _merge(merged: Merged, samples_by_name: Dict[str, List[Any]]) -> None:
+    for name, samples in samples_by_name.items():
+        into = merged.setdefault(name, {})
+        for key, value in samples:
+            key = tuple(key)
+            previous = into.get(key)
+            if isinstance(value, list):
+                # Histogram: per-bucket counts, sum, count
+                counts, total, count = value
+                if previous is not None:
+                    counts = [a + b for a, b in zip(previous[0], counts)]
+                    total, count = previous[1] + total, previous[2] + count
+                into[key] = (counts, total, count)
+            else:
+                into[key] = (previous or 0) + value
+
+def _write_json(path: str, data: Any) -> None:
+    # Readers never see a partly written file
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+@contextmanager
+def _locked(directory: str, exclusive: bool) -> Iterator[None]:
+    with open(os.path.join(directory, "lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+def prepare_metrics_dir(directory: str) -> None:
+    """Create ``directory`` and drop the snapshots of a previous run."""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+
+def write_snapshot(directory: str) -> None:
+    """Write this worker's samples to ``directory``."""
+    _write_json(os.path.join(directory, f"{os.getpid()}.json"), snapshot())
+
+def collect(directory: str) -> Merged:
+    """Sum the samples of every worker that wrote to ``directory``."""
+    merged: Merged = {}
+    with _locked(directory, exclusive=False):
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            with open(path) as f:
+                _merge(merged, json.load(f))
+    return merged
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """
+    Fold the counters and histograms of an exited worker into the archive
+    and forget its gauges. Called by the gunicorn master.
+    """
+    path = os.path.join(directory, f"{pid}.json")
+    gauges = {metric.name for metric in REGISTRY if isinstance(metric, Gauge)}
+    with _locked(directory, exclusive=True):
+        try:
+            with open(path) as f:
+                dead = json.load(f)
+        except OSError:
+            # Exited before writing a snapshot
+            return
+        merged: Merged = {}
+        archive = os.path.join(directory, ARCHIVE)
+        if os.path.exists(archive):
+            with open(archive) as f:
+                _merge(merged, json.load(f))
+        _merge(merged, {name: samples for name, samples in dead.items() if name not in gauges})
+        _write_json(archive, {
+            name: [[list(key), value] for key, value in samples.items()] for name, samples in merged.items()
+        })
+        os.remove(path)
+
+def render_prometheus(merged: Optional[Merged] = None) -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format,
+    from this worker's samples or from those ``collect`` summed.
+    """
+    def samples(metric: Any) -> List[Tuple[Tuple[str, ...], Any]]:
+        if merged is None:
+            return sorted(metric.samples())
+        return sorted(merged.get(metric.name, {}).items())
+
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        if isinstance(metric, (Counter, Gauge)):
+            lines.append(f"# TYPE {metric.name} {'counter' if isinstance(metric, Counter) else 'gauge'}")
+            for key, value in samples(metric):
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+            continue
+
+        lines.append(f"# TYPE {metric.name} histogram")
+        names = (*metric.labelnames, "le")
+        for key, (counts, total, count) in samples(metric):
+            cumulative = 0
+            for bound, bucket_count in zip((*metric.buckets, math.inf), counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, (*key, _format_value(bound)))
+                lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(metric.labelnames, key)
+            lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{metric.name}_count{labels} {count}")
+    return "\n".join(lines) + "\n"
+
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request, by method, route template and status code",
+    labelnames=("method", "route", "status"),
+)
+mongo_command_seconds = Histogram(
+    "mongo_command_seconds",
+    "Duration of MongoDB commands as reported by the driver",
+    labelnames=("command", "outcome"),
+)
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when a periodic event loop callback was due and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+password_hash_queue_seconds = Histogram(
+    "password_hash_queue_seconds",
+    "Time password hashing jobs wait for a free hashing worker",
+    labelnames=("operation",),
+)
+password_hash_seconds = Histogram(
+    "password_hash_seconds",
+    "Time spent hashing or verifying a password",
+    labelnames=("operation",),
+)
+cache_requests_total = Counter(
+    "cache_requests_total",
+    "Cache lookups by tier (l1 in-process, l2 Redis), key family and result",
+    labelnames=("tier", "family", "result"),
+)
+compression_bytes_total = Counter(
+    "compression_bytes_total",
+    "Bytes fed into (stage=in) and produced by (stage=out) response compression",
+    labelnames=("encoding", "stage"),
+)
+compression_seconds = Histogram(
+    "compression_seconds",
+    "Time spent compressing one response chunk",
+    labelnames=("encoding",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+rate_limited_total = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected by a rate limiter",
+    labelnames=("limiter",),
+)
+pool_checkout_seconds = Histogram(
+    "pool_checkout_seconds",
+    "Time spent waiting to check a connection out of a pool",
+    labelnames=("pool",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+pool_checkout_timeouts_total = Counter(
+    "pool_checkout_timeouts_total",
+    "Connection checkouts that gave up because the pool stayed exhausted",
+    labelnames=("pool",),
+)
+pool_connections = Gauge(
+    "pool_connections",
+    "Connections per pool that are open, checked out (in_use) or waited for (waiting)",
+    labelnames=("pool", "state"),
+)
+task_event_streams = Gauge(
+    "task_event_streams",
+    "Open task change feed connections",
+)
+task_event_resyncs_total = Counter(
+    "task_event_resyncs_total",
+    "Times a task change feed fell behind and its client was told to refetch",
+)
+reminders_delivered_total = Counter(
+    "reminders_delivered_total",
+    "Due date reminders handed to the notifier",
+)
+reminder_delivery_failures_total = Counter(
+    "reminder_delivery_failures_total",
+    "Reminder batches the notifier failed to deliver, left for redelivery",
+)
+reminder_lag_seconds = Histogram(
+    "reminder_lag_seconds",
+    "Delay between when a reminder was due and when it was delivered",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
@@ -0,0 +1,151 @@
+"""
+Collection of request, MongoDB and event loop metrics.
+
+The values are kept per worker in ``app.core.metrics`` and served by the
+``/metrics`` endpoint; with ``METRICS_DIR`` set, each worker also writes them
+there periodically for the other workers to sum.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    event_loop_lag_seconds,
+    http_request_duration_seconds,
+    mongo_command_seconds,
+    write_snapshot,
+)
+from app.core.tracing import end_span, start_span
+
+class RequestMetricsMiddleware:
+    """
+    Record the duration of every HTTP request by method, route template and status.
+
+    Routes are labelled by their template (``/api/v1/tasks/{task_id}``) so that
+    the number of label values stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration_seconds.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=self._route(scope),
+                status=str(status_code),
+            )
+
+    def _route(self, scope: Scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Middleware below us may have routed a copy of the scope
+        for candidate in scope["app"].router.routes if "app" in scope else ():
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                return getattr(candidate, "path", "<unmatched>")
+        return "<unmatched>"
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Time every MongoDB command and trace it as a span when tracing is enabled.
+
+    The driver calls these hooks on the thread running the command, which
+    Motor starts with the calling task's context, so spans nest under the
+    request that issued the command.
+    """
+
+    def __init__(self) -> None:
+        self._spans: Dict[Tuple[Any, int], Any] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        current = start_span(
+            f"mongodb.{event.command_name}",
+            **{"db.system": "mongodb", "db.name": event.database_name, "db.operation": event.command_name},
+        )
+        if current is not None:
+            self._spans[(event.connection_id, event.request_id)] = current
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        mongo_command_seconds.observe(event.duration_micros / 1e6, command=event.command_name, outcome="success")
+        end_span(self._spans.pop((event.connection_id, event.request_id), None))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        mongo_command_seconds.observe(event.duration_micros / 1e6, command=event.command_name, outcome="failure")
+        end_span(self._spans.pop((event.connection_id, event.request_id), None), error=str(event.failure))
+
+mongo_command_listener = MongoCommandListener()
+
+class _LoopMonitor:
+    task: Optional["asyncio.Task[None]"] = None
+
+loop_monitor = _LoopMonitor()
+
+async def _measure_event_loop_lag(interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        # Anything past the requested interval was spent waiting for the loop
+        event_loop_lag_seconds.observe(max(0.0, loop.time() - started - interval))
+
+def start_event_loop_monitor(interval: float) -> None:
+    """Start sampling event loop lag every ``interval`` seconds in this worker."""
+    loop_monitor.task = asyncio.ensure_future(_measure_event_loop_lag(interval))
+
+def stop_event_loop_monitor() -> None:
+    if loop_monitor.task:
+        loop_monitor.task.cancel()
+        loop_monitor.task = None
+
+class _MetricsWriter:
+    task: Optional["asyncio.Task[None]"] = None
+    directory: str = ""
+
+metrics_writer = _MetricsWriter()
+
+def _write_snapshot(directory: str) -> None:
+    try:
+        write_snapshot(directory)
+    except OSError as e:
+        print(f"Metrics snapshot failed: {e}")
+
+async def _write_metrics(directory: str, interval: float) -> None:
+    while True:
+        _write_snapshot(directory)
+        await asyncio.sleep(interval)
+
+def start_metrics_writer(directory: str, interval: float) -> None:
+    """Write this worker's metrics to ``directory`` every ``interval`` seconds."""
+    if not directory:
+        return
+    metrics_writer.directory = directory
+    metrics_writer.task = asyncio.ensure_future(_write_metrics(directory, interval))
+
+def stop_metrics_writer() -> None:
+    if metrics_writer.task:
+        metrics_writer.task.cancel()
+        metrics_writer.task = None
+        # The last snapshot is what the master archives once this worker exits
+        _write_snapshot(metrics_writer.directory)
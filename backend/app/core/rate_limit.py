@@ -0,0 +1,82 @@
+"""
+Sliding-window rate limiting in Redis.
+
+Every limited request records its arrival time in a sorted set per client
+key. A request is allowed when each of its keys saw fewer than the limit's
+number of requests in the trailing window. All keys of a request are checked
+and updated by one Lua script, so a check is a single atomic round trip.
+"""
+import secrets
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.metrics import rate_limited_total
+from app.db.redis import cache
+
+# KEYS: one sorted set per limit. ARGV: a unique member for this request,
+# then a limit and window (in milliseconds) per key. Returns 0 when the
+# request is allowed, else the milliseconds until it would be.
+_SLIDING_WINDOW = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local retry = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[2 * i])
+    local window = tonumber(ARGV[2 * i + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        retry = math.max(retry, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry > 0 then
+    return retry
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, tonumber(ARGV[2 * i + 1]))
+end
+return 0
+"""
+
+class RateLimit(NamedTuple):
+    requests: int
+    seconds: int
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["RateLimit"]:
+        """
+        Parse a ``"<requests>/<seconds>"`` spec; an empty spec means no limit.
+        """
+        if not spec or not spec.strip():
+            return None
+        requests, _, seconds = spec.partition("/")
+        limit = cls(int(requests), int(seconds))
+        if limit.requests < 1 or limit.seconds < 1:
+            raise ValueError(f"Invalid rate limit: {spec!r}")
+        return limit
+
+async def check_rate_limits(name: str, checks: Sequence[Tuple[str, RateLimit]]) -> float:
+    """
+    Count a request against every ``(key, limit)`` in ``checks``.
+
+    Returns 0 if the request is allowed, otherwise the number of seconds
+    until it would be. A rejected request is not recorded. When Redis is
+    unavailable requests are allowed, so an outage cannot lock users out.
+    """
+    if cache.client is None or not checks:
+        return 0
+    keys = [f"ratelimit:{name}:{key}" for key, _ in checks]
+    args = [secrets.token_hex(8)]
+    for _, limit in checks:
+        args.extend([limit.requests, limit.seconds * 1000])
+    try:
+        script = cache.client.register_script(_SLIDING_WINDOW)
+        retry_ms = await script(keys=keys, args=args)
+    except RedisError as e:
+        print(f"Redis error: {e}")
+        return 0
+    if retry_ms:
+        rate_limited_total.inc(limiter=name)
+    return retry_ms / 1000
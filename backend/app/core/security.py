@@ -1,25 +1,71 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import password_hash_queue_seconds, password_hash_seconds
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+# bcrypt releases the GIL, so a thread pool lets hashing use every core without
+# blocking the event loop. Its size caps how many hashes run at once.
+hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+def _create_token(claims: Dict[str, Any], expires_delta: timedelta) -> str:
+    to_encode = {"exp": datetime.utcnow() + expires_delta, **claims}
+    return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    username: Optional[str] = None,
+    version: int = 0,
+) -> str:
     """
     Create a JWT access token.
+
+    Besides the user id it carries the username and the user's token version,
+    so requests can be authenticated without reading the user document.
+    """
+    if not expires_delta:
+        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = {"sub": str(subject), "username": username, "ver": version, "type": "access"}
+    return _create_token(claims, expires_delta)
+
+def create_refresh_token(subject: Union[str, Any], version: int = 0, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create a long-lived JWT that can only be exchanged for new tokens.
     """
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
-    return encoded_jwt
+    if not expires_delta:
+        expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return _create_token({"sub": str(subject), "ver": version, "type": "refresh"}, expires_delta)
+
+def create_stream_ticket(
+    subject: Union[str, Any], username: Optional[str], version: int, until: datetime
+) -> str:
+    """
+    Create a short-lived JWT that can only open a task event stream.
+
+    Unlike access tokens it may be put in a URL: it expires after
+    ``TASK_EVENTS_TICKET_SECONDS``. ``until`` is when streams opened with it
+    must end, the expiry of the access token it was issued for.
+    """
+    claims = {
+        "sub": str(subject),
+        "username": username,
+        "ver": version,
+        "type": "stream",
+        "until": int(until.timestamp()),
+    }
+    return _create_token(claims, timedelta(seconds=settings.TASK_EVENTS_TICKET_SECONDS))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -31,4 +77,38 @@ def get_password_hash(password: str) -> str:
     """
     Hash a password.
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+async def _run_hash_job(operation: str, func: Callable, *args: Any) -> Any:
+    """
+    Run a password hashing function on the hashing executor, recording how long
+    the job queued for a worker and how long the hash itself took.
+    """
+    submitted = time.perf_counter()
+
+    def job() -> Any:
+        started = time.perf_counter()
+        password_hash_queue_seconds.observe(started - submitted, operation=operation)
+        try:
+            return func(*args)
+        finally:
+            password_hash_seconds.observe(time.perf_counter() - started, operation=operation)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor, job)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password off the event loop.
+
+    Returns ``(verified, new_hash)``; ``new_hash`` is set when the stored hash
+    uses outdated parameters (e.g. a lower ``BCRYPT_ROUNDS``) and should be
+    replaced.
+    """
+    return await _run_hash_job("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def hash_password(password: str) -> str:
+    """
+    Hash a password off the event loop.
+    """
+    return await _run_hash_job("hash", pwd_context.hash, password)
@@ -0,0 +1,74 @@
+"""
+Production server: gunicorn supervising uvicorn workers.
+
+Gunicorn forks the workers before the application starts, so each worker
+opens its own MongoDB and Redis pools in the startup handlers; nothing that
+holds sockets or threads is created before the fork. Workers run on uvloop
+and httptools, are replaced after ``SERVER_MAX_REQUESTS`` requests (plus
+jitter, so they do not all restart together) and drain on shutdown.
+
+Configured by ``gunicorn.conf.py``; run ``gunicorn -c gunicorn.conf.py main:app``.
+"""
+import math
+import os
+import sys
+from typing import List, Optional
+
+from gunicorn.arbiter import Arbiter
+from uvicorn.main import Server
+from uvicorn.workers import UvicornWorker
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process may use: its CPU affinity, further capped by
+    a cgroup v2 CPU quota such as a container's ``--cpus`` limit.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - not available on macOS
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+class DrainingServer(Server):
+    """
+    Uvicorn server that ends the task event streams when shutdown begins.
+
+    Uvicorn waits for open responses before shutting down, and event streams
+    never finish by themselves; ending them lets clients reconnect to another
+    worker instead of being cut off when the graceful timeout expires.
+    """
+
+    async def shutdown(self, sockets: Optional[List] = None) -> None:
+        # Imported here: this module is loaded by the gunicorn master, which
+        # must not import the application
+        from app.services.task_events import close_streams
+
+        close_streams()
+        await super().shutdown(sockets=sockets)
+
+class TaskManagerWorker(UvicornWorker):
+    """
+    Gunicorn worker running the app on uvloop and httptools when installed.
+    """
+
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto", "lifespan": "on"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Leave time for the shutdown handlers before gunicorn kills the worker
+        self.config.timeout_graceful_shutdown = max(1, int(self.cfg.graceful_timeout) - 5)
+
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(config=self.config)
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
@@ -0,0 +1,35 @@
+"""
+Optional OpenTelemetry tracing.
+
+Spans are recorded only when the ``opentelemetry-api`` package is installed;
+exporting them additionally needs a configured SDK tracer provider (e.g. via
+``opentelemetry-instrument``). Without the package every helper is a no-op.
+"""
+from contextlib import nullcontext
+from typing import Any, ContextManager, Optional
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None
+
+tracer = trace.get_tracer("taskmanager") if trace is not None else None
+
+def span(name: str, **attributes: Any) -> ContextManager[Any]:
+    """Context manager recording ``name`` as a child of the current span."""
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+def start_span(name: str, **attributes: Any) -> Optional[Any]:
+    """Start a span that is ended explicitly with :func:`end_span`."""
+    if tracer is None:
+        return None
+    return tracer.start_span(name, attributes=attributes)
+
+def end_span(current: Optional[Any], error: Optional[str] = None) -> None:
+    if current is None:
+        return
+    if error is not None:
+        current.set_status(trace.Status(trace.StatusCode.ERROR, error))
+    current.end()
@@ -0,0 +1,201 @@
+"""
+Declarative registry of the MongoDB indexes the API relies on.
+
+``ensure_indexes`` reconciles the registry against a live database at startup.
+Run ``python -m app.db.indexes`` to print index drift without changing
+anything, or add ``--apply`` to reconcile from the command line.
+"""
+import argparse
+import asyncio
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+
+# Case-insensitive comparison for title prefix search; queries must pass the
+# same collation to use the index
+TITLE_COLLATION = {"locale": "en", "strength": 2}
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "tasks": [
+        # Task listing and keyset pagination. Following the equality, sort, range
+        # rule, each index starts with user_id, then an optional status or
+        # priority equality, then the sort key with _id as tie-breaker. Range
+        # filters on created_at/due_date are bounds on the same sort key.
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="user_created_at",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)],
+            name="user_due_date",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="user_status",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("status", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)],
+            name="user_status_due_date",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("priority", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="user_priority",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("priority", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)],
+            name="user_priority_due_date",
+        ),
+        # Heads of recurring series, expanded into the occurrences of a window
+        IndexModel(
+            [("user_id", ASCENDING), ("due_date", ASCENDING)],
+            name="user_recurring",
+            partialFilterExpression={"recurrence": {"$type": "object"}},
+        ),
+        # Task search. The text index leads with user_id, so a search only
+        # scans the entries of one user; titles also get a prefix index.
+        IndexModel(
+            [("user_id", ASCENDING), ("title", TEXT), ("description", TEXT)],
+            name="user_text",
+            weights={"title": 10, "description": 2},
+            default_language="english",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("title", ASCENDING)],
+            name="user_title",
+            collation=TITLE_COLLATION,
+        ),
+    ],
+}
+
+# Options that change the behaviour of an index; a mismatch on any of them is drift
+_BOOLEAN_OPTIONS = ("unique", "sparse")
+
+class IndexDrift(NamedTuple):
+    collection: str
+    name: str
+    kind: str  # "missing", "changed" or "extra"
+    detail: str = ""
+
+    def __str__(self) -> str:
+        suffix = f" ({self.detail})" if self.detail else ""
+        return f"{self.kind:<8} {self.collection}.{self.name}{suffix}"
+
+def _normalize_key(key: Any) -> List[tuple]:
+    """Normalize an index key so server and registry specs compare equal."""
+    normalized = []
+    for field, direction in key.items():
+        if direction == TEXT or field in ("_fts", "_ftsx"):
+            # The server stores the fields of a text index as _fts/_ftsx and
+            # lists them in the weights option instead
+            if ("_fts", TEXT) not in normalized:
+                normalized.append(("_fts", TEXT))
+            continue
+        normalized.append((field, int(direction) if isinstance(direction, (int, float)) else direction))
+    return normalized
+
+def _compare(desired: Dict[str, Any], existing: Dict[str, Any]) -> Optional[str]:
+    """Return a description of how ``existing`` differs from ``desired``, if at all."""
+    if _normalize_key(desired["key"]) != _normalize_key(existing["key"]):
+        return f"key {_normalize_key(existing['key'])} != {_normalize_key(desired['key'])}"
+
+    for option in _BOOLEAN_OPTIONS:
+        if bool(desired.get(option, False)) != bool(existing.get(option, False)):
+            return f"{option} is {bool(existing.get(option, False))}"
+
+    for option, value in desired.items():
+        if option in ("key", "name") or option in _BOOLEAN_OPTIONS:
+            continue
+        current = existing.get(option)
+        if isinstance(value, dict) and isinstance(current, dict):
+            # The server expands some options (e.g. collation) with defaults
+            mismatched = [k for k, v in value.items() if current.get(k) != v]
+            if mismatched:
+                return f"{option} differs on {', '.join(mismatched)}"
+        elif current != value:
+            return f"{option} is {current!r}"
+    return None
+
+async def index_drift(database: AsyncIOMotorDatabase) -> List[IndexDrift]:
+    """
+    Compare the registry with the indexes that exist in ``database``.
+    """
+    drift: List[IndexDrift] = []
+    for collection, models in INDEXES.items():
+        existing = {
+            index["name"]: index
+            async for index in database[collection].list_indexes()
+        }
+        wanted = set()
+        for model in models:
+            desired = model.document
+            wanted.add(desired["name"])
+            current = existing.get(desired["name"])
+            if current is None:
+                drift.append(IndexDrift(collection, desired["name"], "missing"))
+                continue
+            difference = _compare(desired, current)
+            if difference:
+                drift.append(IndexDrift(collection, desired["name"], "changed", difference))
+
+        for name in existing:
+            if name != "_id_" and name not in wanted:
+                drift.append(IndexDrift(collection, name, "extra"))
+    return drift
+
+async def ensure_indexes(database: AsyncIOMotorDatabase) -> List[IndexDrift]:
+    """
+    Create missing indexes and rebuild changed ones. Safe to run repeatedly.
+
+    Indexes that exist in the database but not in the registry are reported
+    but left alone, so manual or experimental indexes are never dropped.
+    """
+    drift = await index_drift(database)
+    models = {
+        (collection, model.document["name"]): model
+        for collection, collection_models in INDEXES.items()
+        for model in collection_models
+    }
+    for item in drift:
+        model = models.get((item.collection, item.name))
+        if model is None:
+            continue
+        collection = database[item.collection]
+        try:
+            if item.kind == "changed":
+                await collection.drop_index(item.name)
+            await collection.create_indexes([model])
+            print(f"Applied index {item.collection}.{item.name}")
+        except OperationFailure as e:
+            print(f"Could not apply index {item.collection}.{item.name}: {e}")
+    return drift
+
+async def _main(uri: str, apply: bool) -> int:
+    client = AsyncIOMotorClient(uri, serverSelectionTimeoutMS=5000)
+    try:
+        database = client.get_database()
+        drift = await (ensure_indexes(database) if apply else index_drift(database))
+    finally:
+        client.close()
+
+    if not drift:
+        print("Indexes are in sync with the registry")
+        return 0
+    for item in drift:
+        print(item)
+    return 0 if apply else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check MongoDB indexes against the registry.")
+    parser.add_argument("--uri", default=settings.MONGODB_URI, help="MongoDB connection string")
+    parser.add_argument("--apply", action="store_true", help="create missing and changed indexes")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_main(args.uri, args.apply)))
@@ -1,7 +1,15 @@
+import asyncio
+import time
+from typing import Any, Dict
+
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.database import Database
+from pymongo.errors import PyMongoError
 
 from app.core.config import settings
+from app.core.monitoring import mongo_command_listener
+from app.db.indexes import ensure_indexes
+from app.db.pools import mongo_pool_listener, mongo_pool_stats
 
 class MongoDB:
     client: AsyncIOMotorClient = None
@@ -10,13 +18,56 @@ class MongoDB:
 db = MongoDB()
 
 async def connect_to_mongo():
-    """Connect to MongoDB."""
-    db.client = AsyncIOMotorClient(settings.MONGODB_URI)
+    """Connect to MongoDB, open the minimum pool and make sure the required indexes exist."""
+    mongo_pool_listener.max_pool_size = settings.MONGODB_MAX_POOL_SIZE
+    db.client = AsyncIOMotorClient(
+        settings.MONGODB_URI,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        event_listeners=[mongo_command_listener, mongo_pool_listener],
+    )
     db.db = db.client.get_database()
     print(f"Connected to MongoDB at {settings.MONGODB_URI}")
 
+    try:
+        await warm_mongo_pool(settings.MONGODB_MIN_POOL_SIZE)
+    except PyMongoError as e:
+        print(f"Could not pre-warm the MongoDB pool: {e}")
+
+    try:
+        await ensure_indexes(db.db)
+    except PyMongoError as e:
+        print(f"Could not reconcile MongoDB indexes: {e}")
+
+async def warm_mongo_pool(connections: int) -> None:
+    """
+    Open ``connections`` pooled connections by running that many pings at once.
+
+    The driver only tops the pool up to ``minPoolSize`` in the background,
+    so without this the first requests after a start pay for the handshakes.
+    """
+    if connections > 0:
+        await asyncio.gather(*(db.client.admin.command("ping") for _ in range(connections)))
+
+async def check_mongo() -> Dict[str, Any]:
+    """Ping MongoDB and report the latency together with the pool statistics."""
+    started = time.perf_counter()
+    try:
+        await db.client.admin.command("ping")
+        status: Dict[str, Any] = {"ok": True}
+    except Exception as e:
+        status = {"ok": False, "error": str(e)}
+    status["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    status["pool"] = mongo_pool_stats.snapshot()
+    return status
+
 async def close_mongo_connection():
     """Close MongoDB connection."""
     if db.client:
         db.client.close()
-        print("Closed connection to MongoDB") 
\ No newline at end of file
+        print("Closed connection to MongoDB")
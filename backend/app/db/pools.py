@@ -0,0 +1,213 @@
+"""
+Instrumentation for the MongoDB and Redis connection pools.
+
+Every worker process has its own pools. Their sizes come from ``Settings``;
+the statistics kept here (checkout wait times, connections in use, timeouts)
+are reported by ``/ready`` and ``/metrics`` so the sizes can be tuned from
+what the pools actually see.
+"""
+import asyncio
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from pymongo import monitoring
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.metrics import pool_checkout_seconds, pool_checkout_timeouts_total, pool_connections
+
+if sys.version_info >= (3, 11):
+    from asyncio import timeout as async_timeout
+else:  # pragma: no cover - redis depends on async-timeout before 3.11
+    from async_timeout import timeout as async_timeout
+
+class PoolStats:
+    """
+    Connection counts and recent checkout wait times of one pool.
+
+    Updated from the event loop (Redis) and from driver threads (MongoDB).
+    """
+
+    def __init__(self, name: str, capacity: int = 0, window: int = 1024):
+        self.name = name
+        self.capacity = capacity
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self._waits: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def _publish(self) -> None:
+        pool_connections.set(self.open, pool=self.name, state="open")
+        pool_connections.set(self.in_use, pool=self.name, state="in_use")
+        pool_connections.set(self.waiting, pool=self.name, state="waiting")
+
+    def checkout_started(self) -> None:
+        with self._lock:
+            self.waiting += 1
+            self._publish()
+
+    def checked_out(self, wait: float) -> None:
+        pool_checkout_seconds.observe(wait, pool=self.name)
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self._waits.append(wait)
+            self._publish()
+
+    def checkout_failed(self, timed_out: bool) -> None:
+        if timed_out:
+            pool_checkout_timeouts_total.inc(pool=self.name)
+        with self._lock:
+            self.waiting -= 1
+            self.timeouts += timed_out
+            self._publish()
+
+    def checked_in(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+            self._publish()
+
+    def set_counts(self, open_: int, in_use: int) -> None:
+        with self._lock:
+            self.open = open_
+            self.in_use = in_use
+            self._publish()
+
+    def adjust_open(self, delta: int) -> None:
+        with self._lock:
+            self.open = max(0, self.open + delta)
+            self._publish()
+
+    def adjust_capacity(self, delta: int) -> None:
+        with self._lock:
+            self.capacity = max(0, self.capacity + delta)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counts, wait time percentiles (ms) over recent checkouts, and saturation."""
+        with self._lock:
+            waits = sorted(self._waits)
+            in_use, open_, waiting, timeouts = self.in_use, self.open, self.waiting, self.timeouts
+
+        def wait_ms(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(len(waits) * q))] * 1000, 3) if waits else 0.0
+
+        return {
+            "capacity": self.capacity,
+            "open": open_,
+            "in_use": in_use,
+            "waiting": waiting,
+            "saturation": round(in_use / self.capacity, 3) if self.capacity else 0.0,
+            "checkout_timeouts": timeouts,
+            "checkout_wait_ms": {"p50": wait_ms(0.5), "p95": wait_ms(0.95), "max": wait_ms(1.0)},
+        }
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """
+    Feed driver pool events into :class:`PoolStats`.
+
+    The driver keeps one pool per server, each of ``max_pool_size``, so the
+    capacity grows and shrinks with the number of known servers. A checkout
+    starts and finishes on the same thread, which times the wait.
+    """
+
+    def __init__(self, stats: PoolStats):
+        self.stats = stats
+        self.max_pool_size = 0
+        self._started = threading.local()
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        self.stats.adjust_capacity(self.max_pool_size)
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        self.stats.adjust_capacity(-self.max_pool_size)
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        self.stats.adjust_open(1)
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        self.stats.adjust_open(-1)
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._started.at = time.perf_counter()
+        self.stats.checkout_started()
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self.stats.checkout_failed(event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT)
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        started = getattr(self._started, "at", None)
+        self.stats.checked_out(time.perf_counter() - started if started is not None else 0.0)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        self.stats.checked_in()
+
+mongo_pool_stats = PoolStats("mongodb")
+mongo_pool_listener = MongoPoolListener(mongo_pool_stats)
+
+redis_pool_stats = PoolStats("redis")
+
+class InstrumentedBlockingConnectionPool(BlockingConnectionPool):
+    """
+    Redis pool capped at ``max_connections`` whose callers queue for a free
+    connection (up to ``timeout`` seconds) and whose waits are recorded.
+
+    Long-lived connections such as pub/sub subscriptions count as in use for
+    as long as they are held.
+    """
+
+    def __init__(self, *args: Any, stats: PoolStats = redis_pool_stats, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        self.stats.capacity = self.max_connections
+
+    def _sync_counts(self) -> None:
+        # The pool's own bookkeeping is authoritative; the base class also
+        # releases connections that failed to connect during a checkout
+        in_use = len(self._in_use_connections)
+        self.stats.set_counts(len(self._available_connections) + in_use, in_use)
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        self.stats.checkout_started()
+        try:
+            async with async_timeout(self.timeout):
+                async with self._condition:
+                    await self._condition.wait_for(self.can_get_connection)
+                    try:
+                        connection = self._available_connections.pop()
+                    except IndexError:
+                        connection = self.make_connection()
+                    self._in_use_connections.add(connection)
+        except asyncio.TimeoutError as err:
+            self.stats.checkout_failed(timed_out=True)
+            raise RedisConnectionError("No connection available.") from err
+
+        # Connect outside the condition: the base class connects while holding
+        # it, so a failed connect deadlocks in release() until the timeout
+        try:
+            await self.ensure_connection(connection)
+        except BaseException:
+            self.stats.checkout_failed(timed_out=False)
+            await self.release(connection)
+            raise
+        self.stats.checked_out(time.perf_counter() - started)
+        self._sync_counts()
+        return connection
+
+    async def release(self, connection):
+        await super().release(connection)
+        self._sync_counts()
@@ -1,37 +1,408 @@
+import asyncio
+import contextlib
 import json
-from typing import Any, Optional
+import math
+import random
+import time
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set, Tuple
 
-import redis
+from bson import ObjectId
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
 from app.core.config import settings
+from app.core.metrics import cache_requests_total
+from app.core.tracing import span
+from app.db.pools import InstrumentedBlockingConnectionPool, redis_pool_stats
+from app.utils.cache import TTLCache
+from app.utils.singleflight import SingleFlight
 
-redis_client = redis.Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    decode_responses=True,
-)
+# Channel on which deleted keys are broadcast to every worker
+INVALIDATION_CHANNEL = "cache:invalidate"
+# Delay before the invalidation listener subscribes again after an error
+LISTENER_RETRY_SECONDS = 1.0
 
-def get_cache(key: str) -> Optional[Any]:
-    """Get data from Redis cache."""
-    data = redis_client.get(key)
+class RedisCache:
+    pool: InstrumentedBlockingConnectionPool = None
+    client: Redis = None
+    listener: Optional["asyncio.Task[None]"] = None
+
+cache = RedisCache()
+
+# Per-worker L1 tier: key -> {field: value}, with None as the field of plain keys
+local_cache = TTLCache(settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_TTL_SECONDS)
+
+def _family(key: str) -> str:
+    """Key family used to label metrics, e.g. ``task`` for ``task:{id}``."""
+    return key.split(":", 1)[0]
+
+def _remember(key: str, field: Optional[str], value: Any) -> None:
+    entries = local_cache.get(key)
+    if entries is None:
+        entries = {}
+        local_cache.set(key, entries)
+    entries[field] = value
+
+async def _listen_for_invalidations() -> None:
+    """
+    Drop L1 entries whenever any worker deletes the matching Redis keys.
+
+    If the subscription breaks, or anything else goes wrong, invalidations
+    may have been missed, so the whole L1 tier is cleared before subscribing
+    again. Messages are polled
+    with an explicit timeout because a blocking read would otherwise fail
+    after the pool's socket timeout on a quiet channel.
+    """
+    poll_seconds = max(1, settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS)
+    while True:
+        pubsub = cache.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            while True:
+                message = await pubsub.get_message(timeout=poll_seconds)
+                if message is None:
+                    continue
+                for key in message["data"].split("\n"):
+                    local_cache.pop(key)
+        except Exception as e:
+            # A dead listener would leave L1 serving stale entries until they expire
+            print(f"Redis invalidation listener error: {e}")
+            local_cache.clear()
+            await asyncio.sleep(LISTENER_RETRY_SECONDS)
+        finally:
+            await pubsub.aclose()
+
+def _json_default(value: Any) -> Any:
+    """Serialize the BSON/datetime values found in Mongo documents."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def connect_to_redis():
+    """Open the shared Redis connection pool and pre-warm its minimum connections."""
+    cache.pool = InstrumentedBlockingConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+    )
+    cache.client = Redis(connection_pool=cache.pool)
+    try:
+        await warm_redis_pool(min(settings.REDIS_MIN_CONNECTIONS, settings.REDIS_MAX_CONNECTIONS))
+    except RedisError as e:
+        print(f"Could not pre-warm the Redis pool: {e}")
+    cache.listener = asyncio.ensure_future(_listen_for_invalidations())
+    print(f"Connected to Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
+
+async def warm_redis_pool(connections: int) -> None:
+    """Connect ``connections`` pooled connections up front by holding them all at once."""
+    acquired = []
+    try:
+        for _ in range(connections):
+            acquired.append(await cache.pool.get_connection("PING"))
+    finally:
+        for connection in acquired:
+            await cache.pool.release(connection)
+
+async def check_redis() -> Dict[str, Any]:
+    """Ping Redis and report the latency together with the pool statistics."""
+    started = time.perf_counter()
+    try:
+        await cache.client.ping()
+        status: Dict[str, Any] = {"ok": True}
+    except Exception as e:
+        status = {"ok": False, "error": str(e)}
+    status["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    status["pool"] = redis_pool_stats.snapshot()
+    return status
+
+async def close_redis_connection():
+    """Close the Redis connection pool."""
+    if cache.listener:
+        # Let the listener release its subscription before the pool closes
+        cache.listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await cache.listener
+        cache.listener = None
+    local_cache.clear()
+    if cache.client:
+        await cache.client.aclose()
+        await cache.pool.aclose()
+        cache.client = None
+        cache.pool = None
+        print("Closed connection to Redis")
+
+async def get_cache(key: str, field: Optional[str] = None, raw: bool = False) -> Optional[Any]:
+    """
+    Get data from the cache, checking this worker's L1 tier before Redis.
+
+    When ``field`` is given the value is read from the hash stored at ``key``,
+    which lets related entries (e.g. every page of a user's task list) share
+    a single key that can be invalidated at once. With ``raw`` the stored
+    string is returned as is instead of being decoded as JSON.
+    """
+    family = _family(key)
+    entries = local_cache.get(key)
+    if entries is not None and field in entries:
+        cache_requests_total.inc(tier="l1", family=family, result="hit")
+        return entries[field]
+    cache_requests_total.inc(tier="l1", family=family, result="miss")
+
+    if cache.client is None:
+        return None
+    try:
+        with span("redis.get", **{"db.system": "redis", "cache.family": family}):
+            if field is None:
+                data = await cache.client.get(key)
+            else:
+                data = await cache.client.hget(key, field)
+    except RedisError as e:
+        print(f"Redis error: {e}")
+        return None
     if data:
-        return json.loads(data)
+        cache_requests_total.inc(tier="l2", family=family, result="hit")
+        value = data if raw else json.loads(data)
+        _remember(key, field, value)
+        return value
+    cache_requests_total.inc(tier="l2", family=family, result="miss")
     return None
 
-def set_cache(key: str, value: Any, expire: int = 3600) -> bool:
-    """Set data in Redis cache with expiration time in seconds."""
+async def set_cache(
+    key: str, value: Any, expire: int = 3600, field: Optional[str] = None, raw: bool = False
+) -> bool:
+    """
+    Set data in Redis cache with expiration time in seconds.
+
+    With ``field`` the value is stored in the hash at ``key``; the expiration
+    applies to the whole hash and is only set when the hash has none yet, so
+    frequently written hashes still expire ``expire`` seconds after creation.
+    With ``raw`` the value must already be a string and is stored verbatim.
+    """
+    if cache.client is None:
+        return False
     try:
-        redis_client.setex(key, expire, json.dumps(value))
-        return True
-    except Exception as e:
+        data = value if raw else json.dumps(value, default=_json_default)
+        with span("redis.set", **{"db.system": "redis", "cache.family": _family(key)}):
+            if field is None:
+                await cache.client.setex(key, expire, data)
+            else:
+                async with cache.client.pipeline(transaction=True) as pipe:
+                    pipe.hset(key, field, data)
+                    pipe.expire(key, expire, nx=True)
+                    await pipe.execute()
+    except (RedisError, TypeError) as e:
         print(f"Redis error: {e}")
         return False
+    # Keep the L1 copy in the same form a Redis read would produce
+    _remember(key, field, data if raw else json.loads(data))
+    return True
+
+async def delete_cache(*keys: str, bump: Sequence[str] = ()) -> bool:
+    """
+    Delete one or more keys from the cache on every worker.
 
-def delete_cache(key: str) -> bool:
-    """Delete data from Redis cache."""
+    All keys are deleted and broadcast to the other workers' L1 tiers in a
+    single pipelined round trip, so invalidating e.g. ``task:{id}`` and
+    ``tasks:{user_id}`` together costs one RTT. Version counters named in
+    ``bump`` (see :func:`get_version`) are incremented in the same
+    transaction.
+    """
+    for key in (*keys, *bump):
+        local_cache.pop(key)
+    if cache.client is None or not (keys or bump):
+        return False
     try:
-        redis_client.delete(key)
+        with span("redis.delete", **{"db.system": "redis", "cache.keys": len(keys) + len(bump)}):
+            async with cache.client.pipeline(transaction=True) as pipe:
+                for key in keys:
+                    pipe.delete(key)
+                for key in bump:
+                    _init_version(pipe, key)
+                    pipe.incr(key)
+                pipe.publish(INVALIDATION_CHANNEL, "\n".join((*keys, *bump)))
+                await pipe.execute()
         return True
-    except Exception as e:
+    except RedisError as e:
+        print(f"Redis error: {e}")
+        return False
+
+def _init_version(pipe: Any, key: str) -> None:
+    # Seed missing counters with a timestamp rather than 0 so that a counter
+    # lost to eviction can never repeat a version handed out before
+    pipe.set(key, time.time_ns(), nx=True)
+
+async def get_version(key: str) -> Optional[str]:
+    """
+    Return the current value of a version counter, creating it if needed.
+
+    Counters change whenever they are passed as ``bump`` to
+    :func:`delete_cache`. Returns None when Redis is unavailable.
+    """
+    entries = local_cache.get(key)
+    if entries is not None and None in entries:
+        cache_requests_total.inc(tier="l1", family=_family(key), result="hit")
+        return entries[None]
+    cache_requests_total.inc(tier="l1", family=_family(key), result="miss")
+
+    if cache.client is None:
+        return None
+    try:
+        with span("redis.get_version", **{"db.system": "redis", "cache.family": _family(key)}):
+            async with cache.client.pipeline(transaction=False) as pipe:
+                _init_version(pipe, key)
+                pipe.get(key)
+                _, version = await pipe.execute()
+    except RedisError as e:
+        print(f"Redis error: {e}")
+        return None
+    _remember(key, None, version)
+    return version
+
+# Concurrent loads of the same cache entry within this worker share one task
+_loads = SingleFlight()
+# Background refreshes, referenced so they are not garbage collected mid-flight
+_refreshes: Set["asyncio.Task[Any]"] = set()
+
+def _lock_name(key: str, field: Optional[str]) -> str:
+    return f"lock:{key}" if field is None else f"lock:{key}:{field}"
+
+def _pack(payload: str, soft_expiry: float, duration: float) -> str:
+    # A plain text header keeps the payload verbatim, so hits need no JSON decoding
+    return f"{soft_expiry:.3f} {duration:.6f} {payload}"
+
+def _unpack(entry: str) -> Tuple[str, float, float]:
+    soft_expiry, duration, payload = entry.split(" ", 2)
+    return payload, float(soft_expiry), float(duration)
+
+def _is_fresh(soft_expiry: float, duration: float, now: float) -> bool:
+    """
+    Decide whether a cached entry can be served without a refresh.
+
+    Uses probabilistic early expiration: the closer an entry is to its soft
+    expiry, and the longer it took to compute, the more likely a request
+    refreshes it early, so hot keys do not all expire at the same moment.
+    """
+    beta = settings.CACHE_EARLY_EXPIRATION_BETA
+    early = duration * beta * -math.log(1.0 - random.random()) if beta > 0 else 0.0
+    return now + early < soft_expiry
+
+async def _load_and_store(
+    key: str, field: Optional[str], loader: Callable[[], Awaitable[Optional[str]]], expire: int
+) -> Optional[str]:
+    started = time.time()
+    payload = await loader()
+    finished = time.time()
+    if payload is not None:
+        entry = _pack(payload, finished + expire, finished - started)
+        await set_cache(key, entry, expire=expire + settings.CACHE_STALE_SECONDS, field=field, raw=True)
+    return payload
+
+async def _locked_load(
+    key: str, field: Optional[str], loader: Callable[[], Awaitable[Optional[str]]], expire: int, wait: bool
+) -> Optional[str]:
+    """
+    Load an entry while holding a short Redis lock so only one worker hits the database.
+
+    Without the lock, ``wait`` polls briefly for the lock holder's result and
+    falls back to loading directly; otherwise the call gives up and returns None.
+    Waiters also load directly as soon as the holder releases the lock without
+    caching anything (its loader returned None or failed), and so does a
+    caller that cannot reach Redis, since there is no holder to wait for.
+    """
+    lock = cache.client.lock(_lock_name(key, field), timeout=settings.CACHE_LOCK_TIMEOUT_SECONDS)
+    try:
+        acquired = await lock.acquire(blocking=False)
+    except RedisError as e:
         print(f"Redis error: {e}")
-        return False 
\ No newline at end of file
+        return await loader()
+
+    if acquired:
+        try:
+            return await _load_and_store(key, field, loader, expire)
+        finally:
+            try:
+                await lock.release()
+            except RedisError:
+                # The lock expired while loading; another worker may hold it now
+                pass
+
+    if not wait:
+        return None
+
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT_SECONDS
+    delay = 0.025
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        entry = await get_cache(key, field=field, raw=True)
+        if entry is not None:
+            return _unpack(entry)[0]
+        try:
+            held = await lock.locked()
+        except RedisError as e:
+            print(f"Redis error: {e}")
+            break
+        if not held:
+            # Holders store before releasing, so a result would be there by now
+            entry = await get_cache(key, field=field, raw=True)
+            if entry is not None:
+                return _unpack(entry)[0]
+            break
+        delay = min(delay * 2, 0.2)
+    return await _load_and_store(key, field, loader, expire)
+
+def _refresh_in_background(
+    key: str, field: Optional[str], loader: Callable[[], Awaitable[Optional[str]]], expire: int
+) -> None:
+    flight = (key, field)
+    if _loads.in_flight(flight):
+        return
+
+    async def refresh() -> None:
+        try:
+            await _loads.do(flight, lambda: _locked_load(key, field, loader, expire, wait=False))
+        except Exception as e:
+            print(f"Cache refresh failed for {key}: {e}")
+
+    task = asyncio.ensure_future(refresh())
+    _refreshes.add(task)
+    task.add_done_callback(_refreshes.discard)
+
+async def get_or_load(
+    key: str,
+    loader: Callable[[], Awaitable[Optional[str]]],
+    expire: int = 300,
+    field: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Return the cached payload for ``key``/``field``, loading it on a miss.
+
+    Concurrent misses in this worker share one call to ``loader``, and a
+    short Redis lock lets a single worker load the entry while the others
+    wait for its result. Entries past their ``expire`` are kept for
+    ``CACHE_STALE_SECONDS`` more and served stale while one request refreshes
+    them in the background. A ``None`` result is returned but not cached.
+
+    ``loader`` returns an already serialized string (typically JSON) which is
+    stored and returned verbatim. Entries carry a small header, so keys used
+    here must not be read with :func:`get_cache`.
+    """
+    if cache.client is None:
+        return await loader()
+
+    entry = await get_cache(key, field=field, raw=True)
+    if entry is not None:
+        payload, soft_expiry, duration = _unpack(entry)
+        if not _is_fresh(soft_expiry, duration, time.time()):
+            _refresh_in_background(key, field, loader, expire)
+        return payload
+
+    return await _loads.do(
+        (key, field), lambda: _locked_load(key, field, loader, expire, wait=True)
+    )
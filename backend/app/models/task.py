@@ -1,8 +1,8 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
 
 class TaskStatus(str, Enum):
     TODO = "todo"
@@ -14,6 +14,38 @@ class TaskPriority(str, Enum):
     MEDIUM = "medium"
     HIGH = "high"
 
+class RecurrenceFrequency(str, Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+
+class Recurrence(BaseModel):
+    """
+    Repetition rule of a task, modelled on iCalendar RRULEs.
+
+    The task's due date is the first occurrence; the others repeat every
+    ``interval`` periods of ``freq``, on the ``by_weekday`` days (0 is Monday)
+    for weekly rules. A rule ends after ``count`` occurrences or at ``until``
+    (inclusive), whichever comes first.
+    """
+    freq: RecurrenceFrequency
+    interval: int = Field(1, ge=1, le=1000)
+    by_weekday: Optional[List[int]] = None
+    count: Optional[int] = Field(None, ge=1)
+    until: Optional[datetime] = None
+
+    @field_validator("by_weekday")
+    @classmethod
+    def normalize_weekdays(cls, value: Optional[List[int]], info: ValidationInfo) -> Optional[List[int]]:
+        if value is None:
+            return None
+        if info.data.get("freq") != RecurrenceFrequency.WEEKLY:
+            raise ValueError("by_weekday is only allowed in weekly rules")
+        if not value or any(day < 0 or day > 6 for day in value):
+            raise ValueError("by_weekday must list days from 0 (Monday) to 6 (Sunday)")
+        return sorted(set(value))
+
 class TaskInDB(BaseModel):
     id: Optional[str] = None
     title: str
@@ -22,5 +54,8 @@ class TaskInDB(BaseModel):
     priority: TaskPriority = TaskPriority.MEDIUM
     user_id: str
     due_date: Optional[datetime] = None
+    recurrence: Optional[Recurrence] = None
+    # Id of the first task of a recurring series, set on later occurrences
+    series_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow) 
\ No newline at end of file
@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
-from app.models.task import TaskPriority, TaskStatus
+from app.models.task import Recurrence, TaskPriority, TaskStatus
 
 # Shared properties
 class TaskBase(BaseModel):
@@ -12,6 +12,7 @@ class TaskBase(BaseModel):
     status: Optional[TaskStatus] = None
     priority: Optional[TaskPriority] = None
     due_date: Optional[datetime] = None
+    recurrence: Optional[Recurrence] = None
 
 # Properties to receive via API on creation
 class TaskCreate(TaskBase):
@@ -19,9 +20,23 @@ class TaskCreate(TaskBase):
     status: TaskStatus = TaskStatus.TODO
     priority: TaskPriority = TaskPriority.MEDIUM
 
-# Properties to receive via API on update
+    @model_validator(mode="after")
+    def check_recurrence(self) -> "TaskCreate":
+        # The due date is the first occurrence every other one is computed from
+        if self.recurrence is not None and self.due_date is None:
+            raise ValueError("A recurring task needs a due_date")
+        return self
+
+# Properties to receive via API on update; whether the result still has a
+# due date when it recurs also depends on the stored task, and is checked by
+# the endpoints
 class TaskUpdate(TaskBase):
-    pass
+    @model_validator(mode="after")
+    def check_recurrence(self) -> "TaskUpdate":
+        fields = self.model_fields_set
+        if self.recurrence is not None and "due_date" in fields and self.due_date is None:
+            raise ValueError("A recurring task needs a due_date")
+        return self
 
 # Properties to return via API
 class Task(TaskBase):
@@ -30,12 +45,64 @@ class Task(TaskBase):
     status: TaskStatus
     priority: TaskPriority
     user_id: str
+    series_id: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
 
+    @model_validator(mode="before")
+    @classmethod
+    def derive_id(cls, data: Any) -> Any:
+        # Documents only store _id; expose it as the string id
+        if isinstance(data, dict) and data.get("id") is None and data.get("_id") is not None:
+            data = {**data, "id": str(data["_id"])}
+        return data
+
 # Properties stored in DB
 class TaskInDB(Task):
-    pass 
\ No newline at end of file
+    pass
+
+# Page of tasks returned by cursor pagination
+class TaskPage(BaseModel):
+    items: List[Task]
+    next_cursor: Optional[str] = None
+
+# Task of a calendar window. Occurrences of a recurring task that are not
+# stored yet are virtual: they carry the id of the task that generates them
+# and their own due date.
+class TaskOccurrence(Task):
+    virtual: bool = False
+
+# Search result: the task with its relevance score and highlighted fields
+class TaskSearchHit(Task):
+    score: float
+    highlights: Dict[str, str] = {}
+
+# Page of ranked search results
+class TaskSearchPage(BaseModel):
+    items: List[TaskSearchHit]
+    next_cursor: Optional[str] = None
+
+# Task counts of one user; overdue counts unfinished tasks past their due date
+class TaskStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    overdue: int
+
+# Item of a bulk update: the task id plus the fields to change
+class TaskBulkUpdate(TaskUpdate):
+    id: str
+
+# Task ids to remove in a bulk delete
+class TaskBulkDelete(BaseModel):
+    ids: List[str]
+
+# Outcome of one item of a bulk operation
+class TaskBulkResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str  # created, updated, deleted, not_found, forbidden or failed
+    detail: Optional[str] = None
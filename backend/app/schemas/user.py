@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -40,8 +40,31 @@ class UserInDB(User):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
-# Token payload
+# Refresh request
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+# Token payload; tokens issued before versions existed carry only sub and exp
 class TokenPayload(BaseModel):
     sub: str
-    exp: datetime 
\ No newline at end of file
+    exp: datetime
+    username: Optional[str] = None
+    ver: int = 0
+    type: Literal["access", "refresh", "stream"] = "access"
+    # Stream tickets only: when the streams they open must end
+    until: Optional[datetime] = None
+
+# Authenticated user as described by their access token alone
+class Principal(BaseModel):
+    id: str
+    username: Optional[str] = None
+    token_version: int = 0
+    # When the credentials the request was authenticated with expire
+    expires_at: Optional[datetime] = None
+
+# Event stream ticket
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int 
\ No newline at end of file
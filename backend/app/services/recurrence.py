@@ -0,0 +1,266 @@
+"""
+Recurring tasks, expanded lazily.
+
+A recurring series is stored as one task, its head: the next occurrence to
+be done, holding the rule in ``recurrence`` and the occurrence date in
+``due_date``. Later occurrences are never stored ahead of time. Windows of
+the task list and the calendar expand the heads into virtual occurrences
+and merge them with the stored tasks, and completing a head stores only the
+occurrence that follows it as the new head. A series therefore costs one
+document whatever its length, and listings that do not ask for a window
+cost the same as for plain tasks.
+
+Expansions are pure functions of the rule, the first occurrence and the
+window, and are cached per worker.
+"""
+import calendar
+import itertools
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING
+
+from app.core.config import settings
+from app.models.task import RecurrenceFrequency, TaskStatus
+from app.services.task_query import TaskFilter
+from app.services.task_serialization import task_to_dict
+
+# Matches the partial index user_recurring; queries for heads must include
+# it to use the index
+RECURRING_FILTER = {"recurrence": {"$type": "object"}}
+
+# Hashable form of a rule: freq, interval, weekdays, count, until
+RuleKey = Tuple[str, int, Tuple[int, ...], Optional[int], Optional[datetime]]
+
+def _naive_utc(value: datetime) -> datetime:
+    # MongoDB returns naive UTC datetimes; compare everything in that form
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def rule_key(recurrence: Dict[str, Any]) -> RuleKey:
+    """Normalize a stored rule into the hashable key expansions are cached by."""
+    until = recurrence.get("until")
+    return (
+        RecurrenceFrequency(recurrence["freq"]).value,
+        recurrence.get("interval") or 1,
+        tuple(sorted(set(recurrence.get("by_weekday") or ()))),
+        recurrence.get("count"),
+        _naive_utc(until) if until is not None else None,
+    )
+
+def _add_months(value: datetime, months: int) -> Optional[datetime]:
+    """``value`` moved by ``months``, or None if that month lacks its day."""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    if value.day > calendar.monthrange(year, month)[1]:
+        return None
+    return value.replace(year=year, month=month)
+
+def _iterate(rule: RuleKey, anchor: datetime, start: datetime) -> Iterator[Tuple[int, datetime]]:
+    """
+    Yield ``(index, occurrence)`` in order, ``index`` counting from the anchor.
+
+    Fixed-length periods jump straight to ``start``; months and years are
+    walked from the anchor since skipped dates (a 31st, February 29th) do not
+    count towards ``count``.
+    """
+    freq, interval, weekdays, _, _ = rule
+
+    if freq == RecurrenceFrequency.WEEKLY.value and weekdays:
+        # The anchor is always the first occurrence, then the listed days
+        # of every interval-th week, counted from the anchor's week
+        week = anchor - timedelta(days=anchor.weekday())
+        span = timedelta(weeks=interval)
+        first_week = [day for day in weekdays if day > anchor.weekday()]
+        skipped = max(0, (start - week) // span) if start > anchor else 0
+        if skipped == 0:
+            yield 0, anchor
+            for index, day in enumerate(first_week, 1):
+                yield index, week + timedelta(days=day)
+            skipped = 1
+        index = 1 + len(first_week) + (skipped - 1) * len(weekdays)
+        for n in itertools.count(skipped):
+            base = week + n * span
+            for day in weekdays:
+                yield index, base + timedelta(days=day)
+                index += 1
+
+    elif freq in (RecurrenceFrequency.DAILY.value, RecurrenceFrequency.WEEKLY.value):
+        step = timedelta(days=interval * (7 if freq == RecurrenceFrequency.WEEKLY.value else 1))
+        first = -((anchor - start) // step) if start > anchor else 0
+        for index in itertools.count(first):
+            yield index, anchor + index * step
+
+    else:
+        months = interval * (12 if freq == RecurrenceFrequency.YEARLY.value else 1)
+        index = 0
+        for n in itertools.count():
+            if anchor.year + (anchor.month - 1 + n * months) // 12 > datetime.max.year:
+                return
+            occurrence = _add_months(anchor, n * months)
+            if occurrence is not None:
+                yield index, occurrence
+                index += 1
+
+@lru_cache(maxsize=settings.RECURRENCE_CACHE_SIZE)
+def _expand(rule: RuleKey, anchor: datetime, start: datetime, end: datetime, limit: int) -> Tuple[datetime, ...]:
+    _, _, _, count, until = rule
+    found: List[datetime] = []
+    try:
+        for index, occurrence in _iterate(rule, anchor, start):
+            if count is not None and index >= count:
+                break
+            if occurrence >= end or (until is not None and occurrence > until):
+                break
+            if occurrence >= start:
+                found.append(occurrence)
+                if len(found) >= limit:
+                    break
+    except OverflowError:
+        # Ran past datetime.max
+        pass
+    return tuple(found)
+
+def occurrences(
+    recurrence: Dict[str, Any],
+    anchor: datetime,
+    start: datetime,
+    end: datetime,
+    limit: Optional[int] = None,
+) -> Tuple[datetime, ...]:
+    """
+    Occurrences in ``[start, end)`` of a rule whose first occurrence is
+    ``anchor``, at most ``limit`` (``RECURRENCE_MAX_OCCURRENCES`` by default).
+    """
+    return _expand(
+        rule_key(recurrence),
+        _naive_utc(anchor),
+        _naive_utc(start),
+        _naive_utc(end),
+        min(limit or settings.RECURRENCE_MAX_OCCURRENCES, settings.RECURRENCE_MAX_OCCURRENCES),
+    )
+
+def next_occurrence(recurrence: Dict[str, Any], anchor: datetime) -> Optional[datetime]:
+    """The occurrence following ``anchor``, or None if the rule has ended."""
+    following = occurrences(recurrence, anchor, _naive_utc(anchor) + timedelta(microseconds=1), datetime.max, 1)
+    return following[0] if following else None
+
+def completes_occurrence(before: Dict[str, Any], after: Dict[str, Any]) -> bool:
+    """Whether an update marks the head of a recurring series as done."""
+    return (
+        bool(after.get("recurrence"))
+        and after.get("due_date") is not None
+        and before.get("status") != TaskStatus.DONE.value
+        and after.get("status") == TaskStatus.DONE.value
+        and not before.get("next_id")
+    )
+
+def next_task(document: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+    """The task of the occurrence following ``document``, or None if there is none."""
+    recurrence = document.get("recurrence")
+    due_date = document.get("due_date")
+    if not recurrence or due_date is None:
+        return None
+    following = next_occurrence(recurrence, due_date)
+    if following is None:
+        return None
+
+    rule = dict(recurrence)
+    if rule.get("count") is not None:
+        # The new head is the first of the remaining occurrences
+        rule["count"] -= 1
+    return {
+        "title": document["title"],
+        "description": document.get("description"),
+        "status": TaskStatus.TODO.value,
+        "priority": document["priority"],
+        "user_id": document["user_id"],
+        "due_date": following,
+        "recurrence": rule,
+        "series_id": document.get("series_id") or str(document["_id"]),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+async def materialize_next(
+    collection: AsyncIOMotorCollection, documents: Iterable[Dict[str, Any]], now: datetime
+) -> List[Dict[str, Any]]:
+    """
+    Store the next occurrence of each completed head and return the new tasks.
+
+    A head records its successor in ``next_id`` before the successor is
+    written, so completing it again after reopening it, or twice at once,
+    never stores a second one.
+    """
+    created = []
+    for document in documents:
+        successor = next_task(document, now)
+        if successor is None:
+            continue
+        successor["_id"] = ObjectId()
+        claimed = await collection.update_one(
+            {"_id": document["_id"], "next_id": {"$exists": False}},
+            {"$set": {"next_id": successor["_id"]}},
+        )
+        if claimed.modified_count:
+            created.append(successor)
+    if created:
+        await collection.insert_many(created, ordered=False)
+    return created
+
+def expand_heads(
+    heads: Iterable[Dict[str, Any]], start: datetime, end: datetime, limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Virtual occurrences in ``[start, end)`` of the given heads, as task dicts.
+
+    The head's own occurrence is the stored task and is not repeated.
+    """
+    items = []
+    for head in heads:
+        anchor = _naive_utc(head["due_date"])
+        after_anchor = max(_naive_utc(start), anchor + timedelta(microseconds=1))
+        base = task_to_dict(head)
+        for due_date in occurrences(head["recurrence"], anchor, after_anchor, end, limit):
+            items.append({**base, "due_date": due_date, "virtual": True})
+    return items
+
+async def load_window(
+    collection: AsyncIOMotorCollection, user_id: str, filters: TaskFilter, skip: int, limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Tasks of ``user_id`` due between ``filters.due_after`` and
+    ``filters.due_before``, including virtual occurrences, by due date.
+
+    Stored tasks are read in due date order, one page deep; every head due
+    before the end of the window is read too, one document per series.
+    """
+    start, end = _naive_utc(filters.due_after), _naive_utc(filters.due_before)
+    descending = filters.sort_field == "due_date" and filters.direction == DESCENDING
+    direction = DESCENDING if descending else ASCENDING
+    depth = skip + limit
+
+    stored = await collection.find(filters.to_query(user_id)).sort(
+        [("due_date", direction), ("_id", direction)]
+    ).limit(depth).to_list(length=depth)
+
+    # Heads are unfinished by definition, and only those not yet succeeded
+    statuses = [s for s in (filters.status or list(TaskStatus)) if s != TaskStatus.DONE]
+    heads = []
+    if statuses:
+        head_filters = filters.model_copy(update={"status": statuses, "due_after": None, "due_before": None})
+        head_query = head_filters.to_query(user_id)
+        head_query.update(RECURRING_FILTER)
+        head_query["next_id"] = {"$exists": False}
+        head_query["due_date"] = {"$lt": end}
+        heads = await collection.find(head_query).to_list(length=None)
+
+    items = [{**task_to_dict(doc), "due_date": _naive_utc(doc["due_date"]), "virtual": False} for doc in stored]
+    # Ascending windows only need each head's first page of occurrences
+    items.extend(expand_heads(heads, start, end, None if descending else depth))
+    items.sort(key=lambda item: (item["due_date"], item["id"]), reverse=descending)
+    return items[skip:depth]
@@ -0,0 +1,226 @@
+"""
+Due date reminders, scheduled in a Redis sorted set.
+
+Task writes keep ``reminders`` up to date: it holds the id of every
+unfinished task due in the future, scored by the time its reminder is due
+(``REMINDER_LEAD_SECONDS`` before the due date). Each worker polls it and
+atomically moves up to ``REMINDER_BATCH_SIZE`` due entries to
+``reminders:processing``, scored by the time the claim expires. Entries are
+removed from there once the notifier has delivered them; a worker that dies
+or fails to deliver leaves them to be claimed again after
+``REMINDER_VISIBILITY_TIMEOUT_SECONDS``, so every reminder is delivered at
+least once. A poll costs one script call and, when reminders are due, one
+query for their tasks, whatever the number of tasks scheduled.
+
+Recurring tasks get a reminder for their stored occurrence only; the next
+one is scheduled when it is stored.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import reminder_delivery_failures_total, reminder_lag_seconds, reminders_delivered_total
+from app.db.redis import cache
+from app.models.task import TaskStatus
+
+REMINDERS_KEY = "reminders"
+PROCESSING_KEY = "reminders:processing"
+
+# Fields a task must be fetched with to compute its reminder time
+REMINDER_PROJECTION = {"status": 1, "due_date": 1}
+
+# Claims up to ARGV[3] entries for delivery: claims that expired before
+# ARGV[1] first, then reminders due by then. Claimed entries move to the
+# processing set, scored by ARGV[2], when their claim expires.
+_CLAIM = """
+local claimed = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+local room = tonumber(ARGV[3]) - #claimed
+if room > 0 then
+    local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, room)
+    if #due > 0 then
+        redis.call('ZREM', KEYS[1], unpack(due))
+        for _, member in ipairs(due) do
+            table.insert(claimed, member)
+        end
+    end
+end
+for _, member in ipairs(claimed) do
+    redis.call('ZADD', KEYS[2], ARGV[2], member)
+end
+return claimed
+"""
+
+class Reminder(NamedTuple):
+    task_id: str
+    user_id: str
+    title: str
+    due_date: datetime
+
+class Notifier(ABC):
+    """Delivers reminders; raising leaves the whole batch for redelivery."""
+
+    @abstractmethod
+    async def notify(self, reminders: List[Reminder]) -> None:
+        ...
+
+class LogNotifier(Notifier):
+    async def notify(self, reminders: List[Reminder]) -> None:
+        for reminder in reminders:
+            print(
+                f"Reminder for user {reminder.user_id}: task {reminder.task_id} "
+                f"'{reminder.title}' is due at {reminder.due_date.isoformat()}"
+            )
+
+class MemoryNotifier(Notifier):
+    """Keeps delivered reminders in ``sent``, for tests and local runs."""
+
+    def __init__(self) -> None:
+        self.sent: List[Reminder] = []
+
+    async def notify(self, reminders: List[Reminder]) -> None:
+        self.sent.extend(reminders)
+
+NOTIFIERS: Dict[str, Type[Notifier]] = {"log": LogNotifier, "memory": MemoryNotifier}
+
+class _Scheduler:
+    task: Optional["asyncio.Task[None]"] = None
+    notifier: Optional[Notifier] = None
+
+scheduler = _Scheduler()
+
+def _value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        # MongoDB returns naive datetimes in UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def reminder_score(doc: Optional[Dict[str, Any]], now: float) -> Optional[float]:
+    """
+    When the reminder of a task is due, as a Unix timestamp, or None if it
+    gets none: it is finished, has no due date, or is already due.
+    """
+    if doc is None or doc.get("due_date") is None or _value(doc.get("status")) == TaskStatus.DONE.value:
+        return None
+    due = _timestamp(doc["due_date"])
+    if due <= now:
+        return None
+    return due - settings.REMINDER_LEAD_SECONDS
+
+def reminder_changes(
+    changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]], now: float
+) -> Tuple[Dict[str, float], List[str]]:
+    """
+    Entries to add (task id to score) and remove for tasks changing from a
+    before to an after image.
+    """
+    additions: Dict[str, float] = {}
+    removals: List[str] = []
+    for before, after in changes:
+        before_score, after_score = reminder_score(before, now), reminder_score(after, now)
+        if after_score is None:
+            if before is not None:
+                removals.append(str(before["_id"]))
+        elif after_score != before_score:
+            additions[str(after["_id"])] = after_score
+    return additions, removals
+
+async def schedule_reminders(
+    changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+) -> None:
+    """
+    Schedule, move or cancel the reminders of tasks changing from a before to
+    an after image (None for a created or deleted task).
+
+    Images hold at least ``_id`` and the fields in REMINDER_PROJECTION.
+    """
+    if cache.client is None:
+        return
+    additions, removals = reminder_changes(changes, datetime.now(timezone.utc).timestamp())
+    if not (additions or removals):
+        return
+    try:
+        async with cache.client.pipeline(transaction=False) as pipe:
+            if removals:
+                pipe.zrem(REMINDERS_KEY, *removals)
+            if additions:
+                pipe.zadd(REMINDERS_KEY, additions)
+            await pipe.execute()
+    except RedisError as e:
+        print(f"Redis error: {e}")
+
+async def deliver_due_reminders(
+    database: AsyncIOMotorDatabase, notifier: Notifier, batch_size: Optional[int] = None
+) -> int:
+    """
+    Claim up to ``batch_size`` due reminders, deliver them and acknowledge
+    them. Returns the number of entries claimed.
+
+    Tasks are re-read before delivery, so reminders of tasks finished,
+    deleted or moved since they were scheduled are dropped.
+    """
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    now = datetime.now(timezone.utc).timestamp()
+    script = cache.client.register_script(_CLAIM)
+    claimed = await script(
+        keys=[REMINDERS_KEY, PROCESSING_KEY],
+        args=[now, now + settings.REMINDER_VISIBILITY_TIMEOUT_SECONDS, batch_size],
+    )
+    if not claimed:
+        return 0
+
+    ids = [ObjectId(task_id) for task_id in claimed if ObjectId.is_valid(task_id)]
+    reminders = []
+    projection = {"user_id": 1, "title": 1, **REMINDER_PROJECTION}
+    async for doc in database.tasks.find({"_id": {"$in": ids}}, projection):
+        if _value(doc.get("status")) == TaskStatus.DONE.value or doc.get("due_date") is None:
+            continue
+        due = _timestamp(doc["due_date"])
+        if due - settings.REMINDER_LEAD_SECONDS > now:
+            # Moved to a later date; its new entry is already scheduled
+            continue
+        reminders.append(Reminder(str(doc["_id"]), doc["user_id"], doc["title"], doc["due_date"]))
+
+    if reminders:
+        try:
+            await notifier.notify(reminders)
+        except Exception:
+            reminder_delivery_failures_total.inc()
+            raise
+        reminders_delivered_total.inc(len(reminders))
+        for reminder in reminders:
+            scheduled = _timestamp(reminder.due_date) - settings.REMINDER_LEAD_SECONDS
+            reminder_lag_seconds.observe(max(0.0, now - scheduled))
+
+    await cache.client.zrem(PROCESSING_KEY, *claimed)
+    return len(claimed)
+
+async def _deliver_forever(database: AsyncIOMotorDatabase, notifier: Notifier) -> None:
+    while True:
+        try:
+            # A full batch means more may be due: claim again right away
+            if await deliver_due_reminders(database, notifier) >= settings.REMINDER_BATCH_SIZE:
+                continue
+        except Exception as e:
+            print(f"Reminder delivery failed: {e}")
+        await asyncio.sleep(settings.REMINDER_POLL_SECONDS)
+
+def start_reminder_scheduler(database: AsyncIOMotorDatabase, notifier: Optional[Notifier] = None) -> None:
+    """Start delivering due reminders from this worker through ``notifier``."""
+    if cache.client is None:
+        return
+    scheduler.notifier = notifier or NOTIFIERS[settings.REMINDER_NOTIFIER]()
+    scheduler.task = asyncio.ensure_future(_deliver_forever(database, scheduler.notifier))
+
+def stop_reminder_scheduler() -> None:
+    if scheduler.task:
+        scheduler.task.cancel()
+        scheduler.task = None
@@ -0,0 +1,252 @@
+"""
+Real-time feed of task changes, sent to clients as Server-Sent Events.
+
+Write handlers publish their changes to one Redis channel; every worker
+holds a single subscription to it and hands each message to the streams of
+the affected user that are open in that worker. A stream costs a bounded
+queue and an idle coroutine, and no Redis connection of its own.
+
+Events are rendered as SSE frames once, by the publisher. A stream whose
+queue is full has its backlog dropped and receives a ``resync`` event
+instead, telling the client to refetch; one slow client therefore never
+holds up the others or grows without bound. Heartbeat comments are sent to
+all streams by one timer per worker.
+
+Streams are authenticated when they open and checked again on every
+heartbeat: one whose credentials expired, or whose user's token version
+changed since (revoked tokens, disabled users), is closed. The version check
+costs one lookup per user, normally answered by the worker's local cache.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import task_event_resyncs_total, task_event_streams
+from app.db.redis import cache
+from app.services.task_serialization import task_to_dict
+from app.services.token_versions import get_token_version
+
+# Channel carrying "<user_id>\n<SSE frames>" messages
+EVENTS_CHANNEL = "task_events"
+
+# Reconnection delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 3000
+
+READY_FRAME = f"retry: {RETRY_MS}\nevent: ready\ndata: {{}}\n\n"
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+HEARTBEAT_FRAME = ": heartbeat\n\n"
+# Queued to end a stream; never sent
+CLOSE = ""
+
+class Subscription:
+    """One open stream of a user's task events."""
+
+    def __init__(
+        self,
+        user_id: str,
+        size: int,
+        expires_at: Optional[datetime] = None,
+        token_version: Optional[int] = None,
+    ):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(size)
+        self.closed = False
+        # Credentials the stream was opened with
+        self.expires_at = expires_at
+        self.token_version = token_version
+
+    def deliver(self, frame: str) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # The client fell behind: drop what it has not read and let it refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+            task_event_resyncs_total.inc()
+
+    def close(self) -> None:
+        """End the stream once the client has read what is already queued."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.queue.put_nowait(CLOSE)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(CLOSE)
+
+class _EventHub:
+    subscribers: Dict[str, Set[Subscription]] = {}
+    listener: Optional["asyncio.Task[None]"] = None
+    heartbeat: Optional["asyncio.Task[None]"] = None
+
+hub = _EventHub()
+
+def subscribe(
+    user_id: str, expires_at: Optional[datetime] = None, token_version: Optional[int] = None
+) -> Subscription:
+    subscription = Subscription(user_id, settings.TASK_EVENTS_QUEUE_SIZE, expires_at, token_version)
+    hub.subscribers.setdefault(user_id, set()).add(subscription)
+    task_event_streams.inc()
+    return subscription
+
+def unsubscribe(subscription: Subscription) -> None:
+    subscriptions = hub.subscribers.get(subscription.user_id)
+    if subscriptions is None or subscription not in subscriptions:
+        return
+    subscriptions.discard(subscription)
+    if not subscriptions:
+        del hub.subscribers[subscription.user_id]
+    task_event_streams.dec()
+
+def dispatch(user_id: str, frames: str) -> None:
+    """Hand ``frames`` to every stream of ``user_id`` open in this worker."""
+    for subscription in hub.subscribers.get(user_id, ()):
+        subscription.deliver(frames)
+
+def _broadcast(frame: str) -> None:
+    for subscriptions in hub.subscribers.values():
+        for subscription in subscriptions:
+            subscription.deliver(frame)
+
+def close_streams() -> None:
+    """
+    End every stream in this worker, e.g. so a shutting down worker can drain.
+
+    Clients reconnect by themselves after ``RETRY_MS``.
+    """
+    for subscriptions in hub.subscribers.values():
+        for subscription in subscriptions:
+            subscription.close()
+
+async def close_unauthorized_streams() -> None:
+    """
+    End the streams whose credentials expired or were revoked since they
+    were opened. Clients must authenticate again to reconnect.
+    """
+    now = datetime.now(timezone.utc)
+    for user_id, subscriptions in list(hub.subscribers.items()):
+        checked = [s for s in subscriptions if s.token_version is not None]
+        version = await get_token_version(user_id) if checked else None
+        for subscription in checked:
+            if subscription.token_version != version:
+                subscription.close()
+        for subscription in subscriptions:
+            if subscription.expires_at is not None and subscription.expires_at <= now:
+                subscription.close()
+
+def task_event(kind: str, task_id: str, **data: Any) -> str:
+    """
+    Render one SSE frame for a ``created``, ``updated`` or ``deleted`` task.
+
+    ``data`` carries the task (``task=``) or the changed fields (``changes=``).
+    """
+    payload = orjson.dumps({"id": task_id, **data}).decode()
+    return f"event: task.{kind}\ndata: {payload}\n\n"
+
+def task_created(document: Dict[str, Any]) -> str:
+    return task_event("created", str(document["_id"]), task=task_to_dict(document))
+
+def task_updated(document: Dict[str, Any]) -> str:
+    return task_event("updated", str(document["_id"]), task=task_to_dict(document))
+
+def task_deleted(task_id: str) -> str:
+    return task_event("deleted", task_id)
+
+async def publish_task_events(user_id: str, frames: List[str]) -> None:
+    """
+    Send events to the user's streams on every worker.
+
+    Without Redis the events still reach the streams open in this worker.
+    """
+    if not frames:
+        return
+    message = "".join(frames)
+    if cache.client is not None:
+        try:
+            await cache.client.publish(EVENTS_CHANNEL, f"{user_id}\n{message}")
+            return
+        except RedisError as e:
+            print(f"Redis error: {e}")
+    dispatch(user_id, message)
+
+async def stream_events(
+    user_id: str, expires_at: Optional[datetime] = None, token_version: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Yield the SSE frames of one stream until the client disconnects, or its
+    credentials, expiring at ``expires_at`` and issued at ``token_version``,
+    are no longer valid.
+
+    The subscription is made when the response starts, so events published
+    after the ``ready`` event are never missed.
+    """
+    subscription = subscribe(user_id, expires_at, token_version)
+    try:
+        yield READY_FRAME
+        while True:
+            frame = await subscription.queue.get()
+            if frame == CLOSE:
+                return
+            yield frame
+    finally:
+        unsubscribe(subscription)
+
+async def _listen_for_events() -> None:
+    """
+    Dispatch published events to this worker's streams.
+
+    Events published while the subscription is broken are lost, so every
+    stream is told to resync once it is back.
+    """
+    poll_seconds = max(1, settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS)
+    while True:
+        pubsub = cache.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(EVENTS_CHANNEL)
+            while True:
+                message = await pubsub.get_message(timeout=poll_seconds)
+                if message is None:
+                    continue
+                user_id, frames = message["data"].split("\n", 1)
+                dispatch(user_id, frames)
+        except RedisError as e:
+            print(f"Redis task event listener error: {e}")
+            _broadcast(RESYNC_FRAME)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+async def _send_heartbeats(interval: float) -> None:
+    # Keeps proxies from closing idle streams and surfaces dead connections
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await close_unauthorized_streams()
+        except Exception as e:
+            print(f"Task event stream check failed: {e}")
+        for subscriptions in hub.subscribers.values():
+            for subscription in subscriptions:
+                if subscription.queue.empty():
+                    subscription.deliver(HEARTBEAT_FRAME)
+
+def start_task_event_listener() -> None:
+    """Subscribe this worker to the task event channel and start the heartbeats."""
+    if cache.client is not None:
+        hub.listener = asyncio.ensure_future(_listen_for_events())
+    hub.heartbeat = asyncio.ensure_future(_send_heartbeats(settings.TASK_EVENTS_HEARTBEAT_SECONDS))
+
+def stop_task_event_listener() -> None:
+    for task in (hub.listener, hub.heartbeat):
+        if task:
+            task.cancel()
+    hub.listener = None
+    hub.heartbeat = None
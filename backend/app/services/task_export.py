@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCursor
+
+EXPORT_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "status",
+    "priority",
+    "user_id",
+    "due_date",
+    "created_at",
+    "updated_at",
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Flush the output buffer once it grows past this many characters
+CHUNK_SIZE = 64 * 1024
+
+def projection_for(fields: List[str]) -> Dict[str, int]:
+    """Mongo projection fetching only the exported columns."""
+    projection = {"_id": 1 if "id" in fields else 0}
+    projection.update({field: 1 for field in fields if field != "id"})
+    return projection
+
+def _export_value(doc: Dict[str, Any], field: str) -> Any:
+    value = doc.get("_id") if field == "id" else doc.get(field)
+    if field == "id" and value is not None:
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+async def _rows(cursor: AsyncIOMotorCursor, fields: List[str], fmt: str) -> AsyncIterator[str]:
+    """Render documents as text chunks of roughly CHUNK_SIZE characters."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(fields)
+
+    async for doc in cursor:
+        row = [_export_value(doc, field) for field in fields]
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, row)), separators=(",", ":")))
+            buffer.write("\n")
+
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+async def stream_tasks(
+    cursor: AsyncIOMotorCursor,
+    fields: List[str],
+    fmt: str = "ndjson",
+    gzip_level: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Stream the documents of ``cursor`` as NDJSON or CSV.
+
+    Only one chunk is held in memory at a time, so memory use does not depend
+    on the number of tasks. With ``gzip_level`` the output is gzip-compressed
+    on the fly.
+    """
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip_level is not None else None
+
+    async for chunk in _rows(cursor, fields, fmt):
+        data = chunk.encode()
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            yield data
+
+    if compressor:
+        yield compressor.flush()
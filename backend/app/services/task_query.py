@@ -0,0 +1,79 @@
+"""
+Compilation of task list query parameters into Mongo filters and sorts.
+
+Filters are shaped to follow the equality, sort, range order of the compound
+indexes registered for the ``tasks`` collection in ``app.db.indexes``.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from pymongo import ASCENDING, DESCENDING
+
+from app.models.task import TaskPriority, TaskStatus
+
+SORT_FIELDS = ("created_at", "due_date")
+
+class TaskFilter(BaseModel):
+    status: Optional[List[TaskStatus]] = None
+    priority: Optional[List[TaskPriority]] = None
+    due_after: Optional[datetime] = None
+    due_before: Optional[datetime] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    # Sort field, prefixed with "-" for descending order
+    sort: str = "created_at"
+
+    @property
+    def sort_field(self) -> str:
+        return self.sort.lstrip("-")
+
+    @property
+    def direction(self) -> int:
+        return DESCENDING if self.sort.startswith("-") else ASCENDING
+
+    def to_query(self, user_id: str) -> Dict[str, Any]:
+        """Mongo filter selecting the tasks of ``user_id`` matching this filter."""
+        query: Dict[str, Any] = {"user_id": user_id}
+        if self.status:
+            statuses = sorted({s.value for s in self.status})
+            query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+        if self.priority:
+            priorities = sorted({p.value for p in self.priority})
+            query["priority"] = priorities[0] if len(priorities) == 1 else {"$in": priorities}
+
+        for field, lower, upper in (
+            ("due_date", self.due_after, self.due_before),
+            ("created_at", self.created_after, self.created_before),
+        ):
+            bounds = {}
+            if lower is not None:
+                bounds["$gte"] = lower
+            if upper is not None:
+                bounds["$lt"] = upper
+            if bounds:
+                query[field] = bounds
+        return query
+
+    def to_sort(self) -> List[Tuple[str, int]]:
+        """Sort specification, with ``_id`` as a tie-breaker for stable paging."""
+        return [(self.sort_field, self.direction), ("_id", self.direction)]
+
+    def cache_key(self) -> str:
+        """
+        Normalized representation of the filter.
+
+        Equivalent filters (e.g. statuses given in a different order) map to the
+        same key, and different filters never share one.
+        """
+        parts = []
+        if self.status:
+            parts.append("status=" + ",".join(sorted({s.value for s in self.status})))
+        if self.priority:
+            parts.append("priority=" + ",".join(sorted({p.value for p in self.priority})))
+        for name in ("due_after", "due_before", "created_after", "created_before"):
+            value = getattr(self, name)
+            if value is not None:
+                parts.append(f"{name}={value.isoformat()}")
+        parts.append(f"sort={self.sort}")
+        return ";".join(parts)
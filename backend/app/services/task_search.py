@@ -0,0 +1,139 @@
+"""
+Ranked full-text search over task titles and descriptions.
+
+Matches come from two index-backed queries scoped to one user: the
+``user_text`` text index (relevance ranked, with stemming) and the
+case-insensitive ``user_title`` index for titles starting with the query,
+which catches partially typed words the text index cannot match.
+"""
+import html
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING
+
+from app.core.config import settings
+from app.db.indexes import TITLE_COLLATION
+from app.services.task_serialization import task_to_dict
+
+# Added to the text score of tasks whose title starts with the query
+PREFIX_BOOST = 5.0
+# Characters of description shown around the first match
+SNIPPET_CHARS = 160
+# Sorts after every other character under the ICU collation, which makes
+# [prefix, prefix + PREFIX_END) the range of strings starting with prefix
+PREFIX_END = "\uffff"
+
+_TERM = re.compile(r'-?"[^"]*"|\S+')
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+def normalize_query(q: str) -> str:
+    """Canonical form of a search query, used for caching and cursors."""
+    return " ".join(unicodedata.normalize("NFKC", q).casefold().split())
+
+def search_terms(query: str) -> List[str]:
+    """
+    Words to highlight for a normalized query.
+
+    Phrases contribute their words, negated terms are dropped, and trailing
+    inflections are trimmed as a rough stand-in for the server's stemming.
+    """
+    terms = []
+    for token in _TERM.findall(query):
+        if token.startswith("-"):
+            continue
+        for word in re.findall(r"\w+", token):
+            for suffix in _SUFFIXES:
+                if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                    word = word[: -len(suffix)]
+                    break
+            terms.append(word)
+    # Longest first, so the highlight pattern prefers the longest match
+    return sorted(set(terms), key=lambda term: (-len(term), term))
+
+def highlight(text: Optional[str], terms: List[str], snippet: bool = False) -> Optional[str]:
+    """
+    HTML-escape ``text`` and wrap words starting with any term in ``<mark>``.
+
+    Returns None when nothing matches. With ``snippet`` only about
+    SNIPPET_CHARS characters around the first match are kept.
+    """
+    if not text or not terms:
+        return None
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + r")\w*", re.IGNORECASE)
+    first = pattern.search(text)
+    if first is None:
+        return None
+
+    prefix = suffix = ""
+    if snippet and len(text) > SNIPPET_CHARS:
+        start = max(0, first.start() - SNIPPET_CHARS // 4)
+        end = start + SNIPPET_CHARS
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(text) else ""
+        text = text[start:end]
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[position : match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(text[position:]))
+    return prefix + "".join(parts) + suffix
+
+async def search_tasks(
+    collection: AsyncIOMotorCollection, user_id: str, query: str, offset: int, limit: int
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Return one page of matching task documents, best first, each with a
+    ``score``, and whether more results follow.
+
+    Every page ranks the same window: the best ``TASK_SEARCH_MAX_RESULTS``
+    text matches and the first as many title prefix matches, ids only, with
+    ties broken by ``_id``. A task therefore keeps its score and position from
+    one page to the next, and only the documents of the page are fetched.
+    """
+    window = settings.TASK_SEARCH_MAX_RESULTS
+    text_matches = collection.find(
+        {"user_id": user_id, "$text": {"$search": query}},
+        {"_id": 1, "score": {"$meta": "textScore"}},
+    ).sort([("score", {"$meta": "textScore"}), ("_id", ASCENDING)]).limit(window)
+    title_matches = collection.find(
+        {"user_id": user_id, "title": {"$gte": query, "$lt": query + PREFIX_END}},
+        {"_id": 1},
+    ).sort([("title", ASCENDING), ("_id", ASCENDING)]).collation(TITLE_COLLATION).limit(window)
+
+    scores: Dict[Any, float] = {}
+    async for doc in text_matches:
+        scores[doc["_id"]] = doc["score"]
+    async for doc in title_matches:
+        scores[doc["_id"]] = scores.get(doc["_id"], 0.0) + PREFIX_BOOST
+
+    ranked = sorted(scores, key=lambda task_id: (-scores[task_id], task_id))[:window]
+    page = ranked[offset : offset + limit]
+    docs = {doc["_id"]: doc async for doc in collection.find({"_id": {"$in": page}, "user_id": user_id})}
+    # Tasks deleted since they were ranked are left out of the page
+    tasks = [{**docs[task_id], "score": scores[task_id]} for task_id in page if task_id in docs]
+    return tasks, len(ranked) > offset + limit
+
+def dump_search_page(docs: List[Dict[str, Any]], query: str, next_cursor: Optional[str]) -> str:
+    """Serialize a ``TaskSearchPage``, highlighting the query terms."""
+    terms = search_terms(query)
+    items = []
+    for doc in docs:
+        item = task_to_dict(doc)
+        item["score"] = round(doc["score"], 4)
+        item["highlights"] = {
+            field: marked
+            for field, marked in (
+                ("title", highlight(doc.get("title"), terms)),
+                ("description", highlight(doc.get("description"), terms, snippet=True)),
+            )
+            if marked is not None
+        }
+        items.append(item)
+    return orjson.dumps({"items": items, "next_cursor": next_cursor}).decode()
@@ -0,0 +1,63 @@
+"""
+Fast JSON serialization of task documents.
+
+Documents read from our own ``tasks`` collection were validated when they
+were written, so they take a trusted path: the ``Task`` fields are copied
+into a plain dict and encoded by orjson without building a model. Documents
+that are not shaped like ours fall back to a precompiled pydantic adapter.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.schemas.task import Task
+
+TASK_FIELDS = tuple(Task.model_fields)
+REQUIRED_FIELDS = tuple(name for name, field in Task.model_fields.items() if field.is_required())
+
+task_adapter = TypeAdapter(Task)
+
+def as_stored(value: Any) -> Any:
+    """
+    Return ``value`` as MongoDB stores and returns it: datetimes, also nested
+    ones, become naive UTC truncated to milliseconds.
+
+    Images of a write built from the written values then match later reads.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: as_stored(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_stored(item) for item in value]
+    return value
+
+def task_to_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the ``Task`` representation of a task document, ready for orjson.
+    """
+    data = {name: doc.get(name) for name in TASK_FIELDS}
+    oid = doc.get("_id", doc.get("id"))
+    data["id"] = str(oid) if oid is not None else None
+    if any(data[name] is None for name in REQUIRED_FIELDS):
+        # Not one of our documents; validate it the slow way
+        return task_adapter.dump_python(task_adapter.validate_python(doc), mode="json")
+    return data
+
+def dump_task(doc: Dict[str, Any]) -> str:
+    """Serialize a single task document."""
+    return orjson.dumps(task_to_dict(doc)).decode()
+
+def dump_tasks(docs: Iterable[Dict[str, Any]]) -> str:
+    """Serialize a list of task documents."""
+    return orjson.dumps([task_to_dict(doc) for doc in docs]).decode()
+
+def dump_task_page(docs: Iterable[Dict[str, Any]], next_cursor: Optional[str]) -> str:
+    """Serialize a ``TaskPage`` of task documents."""
+    return orjson.dumps(
+        {"items": [task_to_dict(doc) for doc in docs], "next_cursor": next_cursor}
+    ).decode()
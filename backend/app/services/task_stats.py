@@ -0,0 +1,275 @@
+"""
+Per-user task statistics maintained incrementally in Redis.
+
+Each user has a hash ``task_stats:{user_id}`` of counters (``total``,
+``status:<status>``, ``priority:<priority>``) and a sorted set
+``task_due:{user_id}`` of their unfinished tasks scored by due date, from
+which overdue tasks are counted. Writes apply deltas computed from the
+task's before and after images; reads cost one round trip whatever the
+number of tasks.
+
+Counters are rebuilt from MongoDB with an aggregation when missing, expire
+after ``TASK_STATS_TTL_SECONDS``, and users whose counters may have drifted
+are queued for the periodic reconciler. A write's Mongo update and its
+counter deltas are not atomic, so a rebuild running between the two counts
+the write twice or not at all; every rebuild is therefore registered while
+it runs and for ``REBUILD_GRACE_SECONDS`` after it, and writes applied then
+queue the user for another one.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.db.redis import cache
+from app.models.task import TaskPriority, TaskStatus
+
+# Fields a task must be fetched with to compute its counter deltas
+STATS_PROJECTION = {"status": 1, "priority": 1, "due_date": 1}
+
+# Users whose counters should be rebuilt by the reconciler
+DIRTY_KEY = "task_stats:dirty"
+
+# Rebuilds stay registered at most this long while they run, and this long
+# after storing their counters, to catch the deltas of writes they raced with
+REBUILD_TIMEOUT_SECONDS = 300
+REBUILD_GRACE_SECONDS = 5
+
+# Applies counter deltas and due-date changes, but only to counters that
+# exist: a missing hash is rebuilt from MongoDB on the next read instead.
+# While a rebuild is registered in KEYS[3] the user is also queued in
+# KEYS[4] for another one. ARGV: the time in milliseconds, the user id,
+# number of counters, counter/delta pairs, number of removals, task ids to
+# remove from the due set, then score/task id pairs to add to it.
+_APPLY_CHANGES = """
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[3]) > 0 then
+    redis.call('SADD', KEYS[4], ARGV[2])
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local i = 4
+for _ = 1, tonumber(ARGV[3]) do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    i = i + 2
+end
+local removals = tonumber(ARGV[i])
+i = i + 1
+for _ = 1, removals do
+    redis.call('ZREM', KEYS[2], ARGV[i])
+    i = i + 1
+end
+if i <= #ARGV then
+    while i <= #ARGV do
+        redis.call('ZADD', KEYS[2], ARGV[i], ARGV[i + 1])
+        i = i + 2
+    end
+    local ttl = redis.call('PTTL', KEYS[1])
+    if ttl > 0 then
+        redis.call('PEXPIRE', KEYS[2], ttl)
+    end
+end
+return 1
+"""
+
+class _Reconciler:
+    task: Optional["asyncio.Task[None]"] = None
+
+reconciler = _Reconciler()
+
+def _keys(user_id: str) -> Tuple[str, str]:
+    return f"task_stats:{user_id}", f"task_due:{user_id}"
+
+def _rebuilding_key(user_id: str) -> str:
+    # Sorted set of the rebuilds in progress, scored by when they stop counting
+    return f"task_stats:rebuilding:{user_id}"
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def _value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+def _counters(doc: Optional[Dict[str, Any]]) -> List[str]:
+    if doc is None:
+        return []
+    return ["total", f"status:{_value(doc.get('status'))}", f"priority:{_value(doc.get('priority'))}"]
+
+def _due_score(doc: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Due date of an unfinished task as a Unix timestamp, else None."""
+    if doc is None or doc.get("due_date") is None or _value(doc.get("status")) == TaskStatus.DONE.value:
+        return None
+    due = doc["due_date"]
+    if due.tzinfo is None:
+        # MongoDB returns naive datetimes in UTC
+        due = due.replace(tzinfo=timezone.utc)
+    return due.timestamp()
+
+def stats_deltas(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Counter changes for a task going from ``before`` to ``after`` (None if absent)."""
+    deltas: Dict[str, int] = {}
+    for field in _counters(before):
+        deltas[field] = deltas.get(field, 0) - 1
+    for field in _counters(after):
+        deltas[field] = deltas.get(field, 0) + 1
+    return {field: delta for field, delta in deltas.items() if delta}
+
+async def apply_changes(
+    user_id: str, changes: Iterable[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+) -> None:
+    """
+    Update a user's counters for tasks changing from a before to an after image.
+
+    Images are task documents (or None for a created or deleted task) holding
+    at least ``_id`` and the fields in STATS_PROJECTION. All changes are
+    applied atomically in one script call.
+    """
+    if cache.client is None:
+        return
+    deltas: Dict[str, int] = {}
+    removals: List[str] = []
+    additions: List[Any] = []
+    for before, after in changes:
+        for field, delta in stats_deltas(before, after).items():
+            deltas[field] = deltas.get(field, 0) + delta
+        before_due, after_due = _due_score(before), _due_score(after)
+        if before_due is not None and after_due is None:
+            removals.append(str(before["_id"]))
+        if after_due is not None and after_due != before_due:
+            additions.extend([after_due, str(after["_id"])])
+    if not (deltas or removals or additions):
+        return
+
+    args: List[Any] = [_now_ms(), user_id, len(deltas)]
+    for field, delta in deltas.items():
+        args.extend([field, delta])
+    args.append(len(removals))
+    args.extend(removals)
+    args.extend(additions)
+    try:
+        script = cache.client.register_script(_APPLY_CHANGES)
+        await script(keys=[*_keys(user_id), _rebuilding_key(user_id), DIRTY_KEY], args=args)
+    except RedisError as e:
+        print(f"Redis error: {e}")
+
+async def _aggregate(database: AsyncIOMotorDatabase, user_id: str) -> Tuple[Dict[str, int], Dict[str, float]]:
+    """Compute a user's counters and due dates from MongoDB."""
+    counters = {"total": 0}
+    counters.update({f"status:{s.value}": 0 for s in TaskStatus})
+    counters.update({f"priority:{p.value}": 0 for p in TaskPriority})
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": {"status": "$status", "priority": "$priority"}, "count": {"$sum": 1}}},
+    ]
+    async for group in database.tasks.aggregate(pipeline):
+        count = group["count"]
+        for field in _counters(group["_id"]):
+            counters[field] = counters.get(field, 0) + count
+
+    due = {}
+    async for doc in database.tasks.find(
+        {"user_id": user_id, "status": {"$ne": TaskStatus.DONE.value}, "due_date": {"$ne": None}},
+        {"due_date": 1, "status": 1},
+    ):
+        due[str(doc["_id"])] = _due_score(doc)
+    return counters, due
+
+async def rebuild_stats(database: AsyncIOMotorDatabase, user_id: str) -> Tuple[Dict[str, int], Dict[str, float]]:
+    """
+    Recompute a user's counters from MongoDB and store them.
+
+    Writes landing while the aggregation runs may be counted twice or not at
+    all, so if the user's task version moved meanwhile, or counter deltas
+    were applied during the rebuild or its grace period, they are queued for
+    another rebuild by the reconciler.
+    """
+    if cache.client is None:
+        return await _aggregate(database, user_id)
+
+    version_key = f"tasks_version:{user_id}"
+    rebuilding_key = _rebuilding_key(user_id)
+    token = os.urandom(8).hex()
+    try:
+        async with cache.client.pipeline(transaction=False) as pipe:
+            pipe.zadd(rebuilding_key, {token: _now_ms() + REBUILD_TIMEOUT_SECONDS * 1000})
+            pipe.expire(rebuilding_key, REBUILD_TIMEOUT_SECONDS)
+            pipe.get(version_key)
+            *_, version = await pipe.execute()
+    except RedisError as e:
+        print(f"Redis error: {e}")
+        return await _aggregate(database, user_id)
+    counters, due = await _aggregate(database, user_id)
+
+    stats_key, due_key = _keys(user_id)
+    try:
+        async with cache.client.pipeline(transaction=True) as pipe:
+            pipe.delete(stats_key, due_key)
+            pipe.hset(stats_key, mapping=counters)
+            pipe.expire(stats_key, settings.TASK_STATS_TTL_SECONDS)
+            if due:
+                pipe.zadd(due_key, due)
+                pipe.expire(due_key, settings.TASK_STATS_TTL_SECONDS)
+            pipe.zadd(rebuilding_key, {token: _now_ms() + REBUILD_GRACE_SECONDS * 1000})
+            pipe.get(version_key)
+            *_, current = await pipe.execute()
+        if current != version:
+            await cache.client.sadd(DIRTY_KEY, user_id)
+    except RedisError as e:
+        print(f"Redis error: {e}")
+    return counters, due
+
+def _stats(counters: Dict[str, Any], overdue: int) -> Dict[str, Any]:
+    return {
+        "total": int(counters.get("total", 0)),
+        "by_status": {s.value: int(counters.get(f"status:{s.value}", 0)) for s in TaskStatus},
+        "by_priority": {p.value: int(counters.get(f"priority:{p.value}", 0)) for p in TaskPriority},
+        "overdue": overdue,
+    }
+
+async def get_stats(database: AsyncIOMotorDatabase, user_id: str) -> Dict[str, Any]:
+    """Return a user's task statistics, rebuilding the counters if needed."""
+    now = datetime.now(timezone.utc).timestamp()
+    if cache.client is not None:
+        stats_key, due_key = _keys(user_id)
+        try:
+            async with cache.client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(stats_key)
+                pipe.zcount(due_key, "-inf", f"({now}")
+                counters, overdue = await pipe.execute()
+            if counters:
+                return _stats(counters, overdue)
+        except RedisError as e:
+            print(f"Redis error: {e}")
+
+    counters, due = await rebuild_stats(database, user_id)
+    return _stats(counters, sum(1 for score in due.values() if score < now))
+
+async def reconcile_dirty(database: AsyncIOMotorDatabase, batch_size: int = 100) -> int:
+    """Rebuild the counters of up to ``batch_size`` queued users."""
+    user_ids = await cache.client.spop(DIRTY_KEY, batch_size)
+    for user_id in user_ids or []:
+        await rebuild_stats(database, user_id)
+    return len(user_ids or [])
+
+async def _reconcile_forever(database: AsyncIOMotorDatabase) -> None:
+    while True:
+        await asyncio.sleep(settings.TASK_STATS_RECONCILE_SECONDS)
+        try:
+            await reconcile_dirty(database)
+        except Exception as e:
+            print(f"Task stats reconciliation failed: {e}")
+
+def start_stats_reconciler(database: AsyncIOMotorDatabase) -> None:
+    """Start the periodic rebuild of drifted counters in this worker."""
+    reconciler.task = asyncio.ensure_future(_reconcile_forever(database))
+
+def stop_stats_reconciler() -> None:
+    if reconciler.task:
+        reconciler.task.cancel()
+        reconciler.task = None
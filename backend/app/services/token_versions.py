@@ -0,0 +1,85 @@
+"""
+Per-user token versions used to revoke issued JWTs.
+
+Every token carries the version its user had when it was issued; bumping the
+version invalidates all of them at once. The version is stored in the user
+document and mirrored in Redis under ``token_version:{user_id}``, and each
+worker keeps it for ``TOKEN_VERSION_CACHE_SECONDS`` in a bounded local cache,
+so authenticating a request normally needs no round trip at all.
+"""
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.db.mongodb import db
+from app.db.redis import cache
+from app.utils.cache import TTLCache
+
+# Lifetime of the Redis copy; MongoDB holds the authoritative value. It also
+# bounds how long a bump that could not be written to Redis goes unnoticed.
+REDIS_TTL_SECONDS = 3600
+
+version_cache = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.TOKEN_VERSION_CACHE_SECONDS)
+
+def _key(user_id: str) -> str:
+    return f"token_version:{user_id}"
+
+async def get_token_version(user_id: str) -> Optional[int]:
+    """
+    Return the user's current token version, or None if the user does not exist.
+    """
+    version = version_cache.get(user_id)
+    if version is not None:
+        return version
+
+    stored = None
+    if cache.client is not None:
+        try:
+            stored = await cache.client.get(_key(user_id))
+        except RedisError as e:
+            print(f"Redis error: {e}")
+
+    if stored is not None:
+        version = int(stored)
+    else:
+        object_id = ObjectId(user_id) if ObjectId.is_valid(user_id) else None
+        user = await db.db.users.find_one({"_id": object_id}, {"token_version": 1}) if object_id else None
+        if user is None:
+            return None
+        version = user.get("token_version", 0)
+        if cache.client is not None:
+            try:
+                # NX: a concurrent bump must not be overwritten by the value read before it
+                await cache.client.set(_key(user_id), version, ex=REDIS_TTL_SECONDS, nx=True)
+            except RedisError as e:
+                print(f"Redis error: {e}")
+
+    version_cache.set(user_id, version)
+    return version
+
+async def bump_token_version(user_id: str) -> Optional[int]:
+    """
+    Revoke every token issued to the user so far and return the new version.
+
+    Other workers stop accepting the old tokens once their local copy of the
+    version expires.
+    """
+    user = await db.db.users.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        {"$inc": {"token_version": 1}},
+        projection={"token_version": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if user is None:
+        return None
+    version = user["token_version"]
+    version_cache.set(user_id, version)
+    if cache.client is not None:
+        try:
+            await cache.client.set(_key(user_id), version, ex=REDIS_TTL_SECONDS)
+        except RedisError as e:
+            print(f"Redis error: {e}")
+    return version
@@ -0,0 +1,21 @@
+import hashlib
+from typing import Optional
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag derived from the given parts."""
+    digest = hashlib.blake2b(":".join(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an ``If-None-Match`` header matches ``etag``.
+
+    Uses the weak comparison RFC 9110 requires for If-None-Match, so a
+    ``W/`` prefix added by an intermediary does not defeat revalidation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
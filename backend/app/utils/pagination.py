@@ -0,0 +1,94 @@
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def _encode(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _decode(cursor: str) -> Any:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str = "created_at", direction: int = 1) -> str:
+    """
+    Build an opaque cursor pointing just after ``doc`` in ``(sort_field, _id)`` order.
+    """
+    value = doc.get(sort_field)
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    return _encode({"k": sort_field, "d": direction, "v": value, "i": str(doc["_id"])})
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+    """
+    try:
+        payload = _decode(cursor)
+        value = payload["v"]
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+        return {"k": payload["k"], "d": payload.get("d", 1), "v": value, "i": ObjectId(payload["i"])}
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+def keyset_filter(cursor: Optional[str], sort_field: str = "created_at", direction: int = 1) -> Dict[str, Any]:
+    """
+    Translate a cursor into a Mongo filter selecting the documents after it.
+
+    Documents are ordered by ``(sort_field, _id)`` so that ties on the sort
+    key still page deterministically. Missing values sort as null, which Mongo
+    places before every other value.
+    """
+    if not cursor:
+        return {}
+    position = decode_cursor(cursor)
+    if position["k"] != sort_field or position["d"] != direction:
+        raise InvalidCursor("Cursor does not match the requested sort order")
+
+    op = "$gt" if direction > 0 else "$lt"
+    value = position["v"]
+    tie = {sort_field: value, "_id": {op: position["i"]}}
+
+    if value is None:
+        # Nulls come first ascending (all non-null values follow) and last descending
+        return {"$or": [{sort_field: {"$ne": None}}, tie]} if direction > 0 else tie
+
+    after = [{sort_field: {op: value}}, tie]
+    if direction < 0:
+        after.append({sort_field: None})
+    return {"$or": after}
+
+def encode_offset_cursor(offset: int, scope: str) -> str:
+    """
+    Build an opaque cursor for result sets that can only be paged by offset,
+    such as relevance-ranked search results.
+
+    ``scope`` ties the cursor to the query it was issued for.
+    """
+    return _encode({"o": offset, "s": hashlib.blake2b(scope.encode(), digest_size=8).hexdigest()})
+
+def decode_offset_cursor(cursor: Optional[str], scope: str) -> int:
+    """
+    Decode a cursor produced by :func:`encode_offset_cursor`; no cursor means offset 0.
+    """
+    if not cursor:
+        return 0
+    try:
+        payload = _decode(cursor)
+        offset = int(payload["o"])
+        matches = payload["s"] == hashlib.blake2b(scope.encode(), digest_size=8).hexdigest()
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+    if offset < 0 or not matches:
+        raise InvalidCursor("Cursor does not match the requested query")
+    return offset
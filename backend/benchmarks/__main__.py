@@ -0,0 +1,79 @@
+"""
+Run the API benchmark and compare it with a stored baseline.
+
+    python -m benchmarks                  # in-memory MongoDB/Redis stand-ins
+    python -m benchmarks --backend local  # services from MONGODB_URI / REDIS_HOST
+    python -m benchmarks --save-baseline  # record the current results
+
+Exits with status 1 when a route regresses past the tolerance. Latencies are
+absolute, so baselines are not committed: record one with --save-baseline on
+the runner that checks it. A baseline from another workload or runner is
+reported and skipped rather than compared.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from benchmarks.harness import BenchmarkConfig, comparable, run_benchmark
+from benchmarks.report import compare, format_table, load, save
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+def main() -> int:
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description="Benchmark the task API.")
+    parser.add_argument("--backend", choices=("memory", "local"), default=defaults.backend)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--tasks-per-user", type=int, default=defaults.tasks_per_user)
+    parser.add_argument("--requests", type=int, default=defaults.requests, help="measured requests")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--warmup", type=int, default=defaults.warmup, help="unmeasured requests run first")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--rate-limits", action="store_true", help="keep the configured rate limits")
+    parser.add_argument("--baseline", help="baseline file (default: baselines/<backend>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    config = BenchmarkConfig(
+        backend=args.backend,
+        users=args.users,
+        tasks_per_user=args.tasks_per_user,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        seed=args.seed,
+        rate_limits=args.rate_limits,
+    )
+    result = asyncio.run(run_benchmark(config))
+    print(format_table(result))
+
+    if args.output:
+        save(args.output, result)
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{config.backend}.json")
+    if args.save_baseline:
+        save(baseline_path, result)
+        print(f"Saved baseline to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline to record one")
+        return 0
+
+    baseline = load(baseline_path)
+    mismatch = comparable(config, baseline)
+    if mismatch:
+        print(f"Not comparing with {baseline_path}: {mismatch}; run with --save-baseline on this runner")
+        return 0
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions against {baseline_path}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"No regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Drive the real application from ``main.py`` with a seeded, mixed workload.
+
+Requests go through the full ASGI stack (middleware, routers, caches) via an
+in-process httpx client. Data lives either in in-memory stand-ins
+(mongomock-motor and fakeredis) or in the MongoDB and Redis configured by
+MONGODB_URI and REDIS_HOST/REDIS_PORT.
+"""
+import asyncio
+import os
+import platform
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from benchmarks.report import summarize
+
+PASSWORD = "benchmark-password"
+
+# Relative frequency of each operation in the mix
+WORKLOAD = {
+    "login": 2,
+    "list": 35,
+    "list_cursor": 10,
+    "get": 20,
+    "stats": 5,
+    "create": 12,
+    "update": 12,
+    "delete": 4,
+}
+
+# Statuses that are part of normal operation; anything else counts as an error.
+# Reads and updates may race with a concurrent delete of the same task.
+EXPECTED_STATUS = {
+    "login": {200},
+    "list": {200},
+    "list_cursor": {200},
+    "get": {200, 404},
+    "stats": {200},
+    "create": {201},
+    "update": {200, 404},
+    "delete": {204, 404},
+}
+
+class BenchmarkConfig(NamedTuple):
+    backend: str = "memory"
+    users: int = 20
+    tasks_per_user: int = 200
+    requests: int = 2000
+    concurrency: int = 16
+    warmup: int = 200
+    seed: int = 1
+    rate_limits: bool = False
+
+class BenchUser(NamedTuple):
+    username: str
+    user_id: str
+    headers: Dict[str, str]
+    task_ids: List[str]
+
+def configure_environment(config: BenchmarkConfig) -> None:
+    """Adjust settings through the environment; must run before the app is imported."""
+    if not config.rate_limits:
+        # Every simulated user shares one client IP, which the limits would throttle
+        for name in ("LOGIN_IP", "LOGIN_ACCOUNT", "REGISTER_IP", "WRITE_IP", "WRITE_ACCOUNT"):
+            os.environ[f"RATE_LIMIT_{name}"] = ""
+
+async def _connect(config: BenchmarkConfig, app: Any) -> None:
+    from app.db.mongodb import db
+    from app.db.redis import cache
+
+    if config.backend == "local":
+        await app.router.startup()
+        return
+    try:
+        import fakeredis
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("The memory backend needs: pip install -r benchmarks/requirements.txt")
+    db.client = AsyncMongoMockClient()
+    db.db = db.client["benchmark"]
+    cache.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+async def _disconnect(config: BenchmarkConfig, app: Any) -> None:
+    if config.backend == "local":
+        await app.router.shutdown()
+
+async def _seed(config: BenchmarkConfig, rng: random.Random) -> List[BenchUser]:
+    """Insert users and tasks directly, bypassing the API so setup stays fast."""
+    from bson import ObjectId
+
+    from app.core.security import create_access_token, get_password_hash
+    from app.db.mongodb import db
+    from app.models.task import TaskPriority, TaskStatus
+
+    run_id = uuid.uuid4().hex[:8]
+    hashed_password = get_password_hash(PASSWORD)
+    now = datetime.utcnow()
+    users = []
+    for index in range(config.users):
+        user_id = ObjectId()
+        username = f"bench-{run_id}-{index}"
+        await db.db.users.insert_one({
+            "_id": user_id,
+            "id": str(user_id),
+            "email": f"{username}@example.com",
+            "username": username,
+            "hashed_password": hashed_password,
+            "full_name": None,
+            "disabled": False,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        tasks = []
+        for number in range(config.tasks_per_user):
+            created_at = now - timedelta(minutes=rng.randrange(60 * 24 * 365))
+            tasks.append({
+                "_id": ObjectId(),
+                "title": f"Task {number} for {username}",
+                "description": rng.choice([None, "Follow up with the team about the quarterly report"]),
+                "status": rng.choice(list(TaskStatus)).value,
+                "priority": rng.choice(list(TaskPriority)).value,
+                "user_id": str(user_id),
+                "due_date": rng.choice([None, now + timedelta(days=rng.randrange(-30, 60))]),
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+        if tasks:
+            await db.db.tasks.insert_many(tasks)
+
+        token = create_access_token(subject=str(user_id))
+        users.append(BenchUser(
+            username=username,
+            user_id=str(user_id),
+            headers={"Authorization": f"Bearer {token}"},
+            task_ids=[str(task["_id"]) for task in tasks],
+        ))
+    return users
+
+async def _cleanup(users: List[BenchUser]) -> None:
+    """Remove the seeded data so repeated runs against local services start clean."""
+    from bson import ObjectId
+
+    from app.db.mongodb import db
+
+    user_ids = [user.user_id for user in users]
+    await db.db.tasks.delete_many({"user_id": {"$in": user_ids}})
+    await db.db.users.delete_many({"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}})
+
+def _operations() -> Dict[str, Callable[..., Awaitable[Any]]]:
+    prefix = "/api/v1"
+
+    async def login(client, user, rng):
+        return await client.post(f"{prefix}/auth/login", data={"username": user.username, "password": PASSWORD})
+
+    async def list_tasks(client, user, rng):
+        params = rng.choice([
+            {"limit": 50},
+            {"limit": 50, "skip": 50},
+            {"limit": 50, "status": "todo"},
+            {"limit": 50, "sort": "-due_date"},
+        ])
+        return await client.get(f"{prefix}/tasks/", params=params, headers=user.headers)
+
+    async def list_cursor(client, user, rng):
+        return await client.get(f"{prefix}/tasks/", params={"cursor": "", "limit": 50}, headers=user.headers)
+
+    async def get_task(client, user, rng):
+        task_id = rng.choice(user.task_ids) if user.task_ids else "0" * 24
+        return await client.get(f"{prefix}/tasks/{task_id}", headers=user.headers)
+
+    async def stats(client, user, rng):
+        return await client.get(f"{prefix}/tasks/stats", headers=user.headers)
+
+    async def create(client, user, rng):
+        response = await client.post(
+            f"{prefix}/tasks/",
+            json={"title": f"New task {rng.randrange(10**6)}", "priority": rng.choice(["low", "medium", "high"])},
+            headers=user.headers,
+        )
+        if response.status_code == 201:
+            user.task_ids.append(response.json()["id"])
+        return response
+
+    async def update(client, user, rng):
+        task_id = rng.choice(user.task_ids) if user.task_ids else "0" * 24
+        return await client.put(
+            f"{prefix}/tasks/{task_id}",
+            json={"status": rng.choice(["todo", "in_progress", "done"])},
+            headers=user.headers,
+        )
+
+    async def delete(client, user, rng):
+        task_id = user.task_ids.pop(rng.randrange(len(user.task_ids))) if user.task_ids else "0" * 24
+        return await client.delete(f"{prefix}/tasks/{task_id}", headers=user.headers)
+
+    return {
+        "login": login,
+        "list": list_tasks,
+        "list_cursor": list_cursor,
+        "get": get_task,
+        "stats": stats,
+        "create": create,
+        "update": update,
+        "delete": delete,
+    }
+
+async def _drive(
+    client: Any,
+    users: List[BenchUser],
+    plan: List[Tuple[str, int, int]],
+    concurrency: int,
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """Execute ``plan`` with ``concurrency`` workers; return latencies, errors and elapsed time."""
+    operations = _operations()
+    latencies: Dict[str, List[float]] = {name: [] for name in WORKLOAD}
+    errors: Dict[str, int] = {name: 0 for name in WORKLOAD}
+    items = iter(plan)
+
+    async def worker() -> None:
+        for name, user_index, seed in items:
+            rng = random.Random(seed)
+            started = time.perf_counter()
+            try:
+                response = await operations[name](client, users[user_index], rng)
+                failed = response.status_code not in EXPECTED_STATUS[name]
+            except Exception as e:
+                print(f"{name} failed: {e!r}")
+                failed = True
+            latencies[name].append(time.perf_counter() - started)
+            if failed:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+def _plan(config: BenchmarkConfig, rng: random.Random, count: int) -> List[Tuple[str, int, int]]:
+    names = list(WORKLOAD)
+    weights = [WORKLOAD[name] for name in names]
+    return [
+        (rng.choices(names, weights)[0], rng.randrange(config.users), rng.randrange(2**32))
+        for _ in range(count)
+    ]
+
+async def run_benchmark(config: BenchmarkConfig) -> Dict[str, Any]:
+    """Seed data, run the warmup and measured phases, and summarize the results."""
+    configure_environment(config)
+    from httpx import AsyncClient
+
+    from main import app
+
+    rng = random.Random(config.seed)
+    await _connect(config, app)
+    users: List[BenchUser] = []
+    try:
+        users = await _seed(config, rng)
+        async with AsyncClient(app=app, base_url="http://benchmark") as client:
+            await _drive(client, users, _plan(config, rng, config.warmup), config.concurrency)
+            latencies, errors, elapsed = await _drive(
+                client, users, _plan(config, rng, config.requests), config.concurrency
+            )
+    finally:
+        if config.backend == "local" and users:
+            await _cleanup(users)
+        await _disconnect(config, app)
+
+    result = summarize(latencies, errors, elapsed)
+    result["config"] = config._asdict()
+    result["environment"] = runner_environment()
+    return result
+
+def runner_environment() -> Dict[str, Any]:
+    """Describe the machine the numbers were measured on.
+
+    Latencies are absolute, so they only compare against a baseline taken on the
+    same runner. CI hosts get fresh hostnames; set BENCHMARK_RUNNER to a stable
+    name for the runner class instead.
+    """
+    return {
+        "runner": os.environ.get("BENCHMARK_RUNNER") or platform.node(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+def comparable(config: BenchmarkConfig, baseline: Dict[str, Any]) -> Optional[str]:
+    """Explain why ``baseline`` was recorded under a different workload or runner, if it was."""
+    recorded = baseline.get("config", {})
+    different = [name for name, value in config._asdict().items() if recorded.get(name) != value]
+    if different:
+        return "baseline was recorded with different " + ", ".join(different)
+    recorded = baseline.get("environment", {})
+    different = [name for name, value in runner_environment().items() if recorded.get(name) != value]
+    if different:
+        return "baseline was recorded on a different runner (" + ", ".join(different) + ")"
+    return None
@@ -0,0 +1,90 @@
+"""
+Latency statistics, result tables and baseline comparison.
+"""
+import json
+import math
+import os
+from typing import Any, Dict, List, Sequence
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Linearly interpolated ``q``-th percentile (0-100) of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    """
+    Per-route and overall statistics. Latencies are in seconds, reported in
+    milliseconds; throughput is requests per second of wall-clock time.
+    """
+    routes = {}
+    every = []
+    for route in sorted(latencies):
+        samples = latencies[route]
+        every.extend(samples)
+        routes[route] = _stats(samples, errors.get(route, 0), elapsed)
+    return {"routes": routes, "total": _stats(every, sum(errors.values()), elapsed)}
+
+def _stats(samples: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50": round(percentile(samples, 50) * 1000, 3),
+        "p95": round(percentile(samples, 95) * 1000, 3),
+        "p99": round(percentile(samples, 99) * 1000, 3),
+    }
+
+def format_table(summary: Dict[str, Any]) -> str:
+    rows = [("route", "count", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms")]
+    for route, stats in [*summary["routes"].items(), ("TOTAL", summary["total"])]:
+        rows.append((
+            route,
+            str(stats["count"]),
+            str(stats["errors"]),
+            f"{stats['rps']:.1f}",
+            f"{stats['p50']:.2f}",
+            f"{stats['p95']:.2f}",
+            f"{stats['p99']:.2f}",
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(widths[i]) if i == 0 else cell.rjust(widths[i]) for i, cell in enumerate(row))
+        for row in rows
+    )
+
+def compare(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    List the regressions of ``summary`` against ``baseline``.
+
+    A route regresses when its p95 or p99 latency grows, or its throughput
+    drops, by more than ``tolerance`` (a fraction). New errors always count.
+    """
+    regressions = []
+    for route, current in [*summary["routes"].items(), ("TOTAL", summary["total"])]:
+        reference = baseline["routes"].get(route) if route != "TOTAL" else baseline.get("total")
+        if reference is None:
+            continue
+        for metric in ("p95", "p99"):
+            if current[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{route}: {metric} {current[metric]:.2f} ms > baseline {reference[metric]:.2f} ms"
+                )
+        if current["rps"] < reference["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: {current['rps']:.1f} req/s < baseline {reference['rps']:.1f} req/s")
+        if current["errors"] > reference.get("errors", 0):
+            regressions.append(f"{route}: {current['errors']} errors (baseline {reference.get('errors', 0)})")
+    return regressions
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+def save(path: str, result: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+        f.write("\n")
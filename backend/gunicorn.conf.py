@@ -0,0 +1,38 @@
+"""
+Gunicorn settings for the production server; see app/core/server.py.
+
+    gunicorn -c gunicorn.conf.py main:app
+"""
+from app.core.config import settings
+from app.core.metrics import mark_process_dead, prepare_metrics_dir
+from app.core.server import available_cpus
+
+bind = settings.SERVER_BIND
+workers = settings.WEB_CONCURRENCY or available_cpus()
+worker_class = "app.core.server.TaskManagerWorker"
+
+# Import the app in each worker after the fork, never in the master
+preload_app = False
+
+# Recycle workers to bound memory growth
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT_SECONDS
+keepalive = settings.SERVER_KEEPALIVE_SECONDS
+
+# Take the client address from X-Forwarded-For when nginx sends the request
+forwarded_allow_ips = settings.FORWARDED_ALLOW_IPS
+
+accesslog = "-"
+errorlog = "-"
+
+# Workers share their metrics through METRICS_DIR so that /metrics reports
+# all of them, whichever worker a scrape reaches; see app/core/metrics.py
+def on_starting(server):
+    if settings.METRICS_DIR:
+        prepare_metrics_dir(settings.METRICS_DIR)
+
+def child_exit(server, worker):
+    if settings.METRICS_DIR:
+        mark_process_dead(settings.METRICS_DIR, worker.pid)
@@ -1,9 +1,17 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 
 from app.api.api import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.events import create_start_app_handler, create_stop_app_handler
+from app.core.metrics import collect, render_prometheus, write_snapshot
+from app.core.monitoring import RequestMetricsMiddleware
+from app.db.mongodb import check_mongo
+from app.db.redis import check_redis
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -12,6 +20,7 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 # Set up CORS
@@ -23,6 +32,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses and accept compressed task payloads
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    decompress_methods=("POST", "PUT", "PATCH"),
+    decompress_paths=(f"{settings.API_V1_STR}/tasks",),
+    max_request_size=settings.MAX_DECOMPRESSED_REQUEST_BYTES,
+)
+
+# Time every request, including the middleware above
+app.add_middleware(RequestMetricsMiddleware)
+
 # Set up event handlers
 app.add_event_handler("startup", create_start_app_handler(app))
 app.add_event_handler("shutdown", create_stop_app_handler(app))
@@ -33,10 +56,34 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 async def root():
     return {"message": "Welcome to Task Management API"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_DIR:
+        # Values are per worker process
+        return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+    # Summed over every worker, this one's values as of now
+    write_snapshot(settings.METRICS_DIR)
+    return PlainTextResponse(render_prometheus(collect(settings.METRICS_DIR)), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Report whether this worker can reach MongoDB and Redis, with the
+    checkout wait times and saturation of its connection pools.
+    """
+    mongodb, redis = await asyncio.gather(check_mongo(), check_redis())
+    ok = mongodb["ok"] and redis["ok"]
+    return ORJSONResponse(
+        {"status": "ok" if ok else "unavailable", "mongodb": mongodb, "redis": redis},
+        status_code=200 if ok else 503,
+    )
+
 if __name__ == "__main__":
+    # Single-process development server; production runs under gunicorn
+    # (gunicorn -c gunicorn.conf.py main:app)
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS)
\ No newline at end of file
@@ -317,6 +317,70 @@ async def setup_db() -> AsyncGenerator:
         if db.client:
             db.client.close()
 
+@pytest.fixture
+async def fake_redis(monkeypatch) -> AsyncGenerator:
+    """
+    In-memory Redis (with Lua scripting) installed as the application's
+    cache client, with the per-worker caches in front of it emptied.
+    """
+    import fakeredis
+
+    from app.api import deps
+    from app.db import redis as redis_module
+    from app.services import token_versions
+
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    monkeypatch.setattr(redis_module.cache, "client", client)
+    for local in (redis_module.local_cache, token_versions.version_cache, deps.token_cache, deps.principal_cache):
+        local.clear()
+    yield client
+    await client.aclose()
+
+@pytest.fixture
+async def fake_mongo(monkeypatch) -> AsyncGenerator:
+    """In-memory MongoDB installed as the application's database."""
+    from mongomock_motor import AsyncMongoMockClient
+
+    from app.db import mongodb
+
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(mongodb.db, "client", client)
+    monkeypatch.setattr(mongodb.db, "db", client["taskmanager_test"])
+    yield mongodb.db.db
+
+@pytest.fixture
+def fast_hashing(monkeypatch) -> None:
+    """Hash passwords at the cheapest bcrypt cost, keeping registrations and logins fast."""
+    from passlib.context import CryptContext
+
+    from app.core import security
+
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+
+@pytest.fixture
+async def api_client(fake_mongo, fake_redis, fast_hashing) -> AsyncGenerator:
+    """Client for the real application, backed by the in-memory stores."""
+    from main import app as backend_app
+
+    async with AsyncClient(app=backend_app, base_url="http://test") as ac:
+        yield ac
+
+@pytest.fixture
+def login(api_client):
+    """Register a user through the API and return its authorization header."""
+
+    async def register_and_login(username: str) -> dict:
+        await api_client.post(
+            "/api/v1/auth/register",
+            json={"email": f"{username}@example.com", "username": username, "password": "password123"},
+        )
+        response = await api_client.post(
+            "/api/v1/auth/login", data={"username": username, "password": "password123"}
+        )
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register_and_login
+
 # Clean up the temporary files when the tests are done
 def pytest_sessionfinish(session, exitstatus):
     """Clean up temporary files after the test session."""
@@ -0,0 +1,28 @@
+from benchmarks.harness import BenchmarkConfig, comparable, runner_environment
+from benchmarks.report import compare, percentile, summarize
+
+def test_percentile_interpolates():
+    samples = [0.1, 0.2, 0.3, 0.4, 0.5]
+
+    assert percentile(samples, 50) == 0.3
+    assert round(percentile(samples, 95), 3) == 0.48
+    assert percentile([], 99) == 0.0
+
+def test_regressions_are_reported():
+    baseline = summarize({"list": [0.010] * 100}, {}, elapsed=1.0)
+    slower = summarize({"list": [0.010] * 90 + [0.050] * 10}, {}, elapsed=1.0)
+
+    assert compare(baseline, baseline, tolerance=0.25) == []
+    assert any(line.startswith("list: p95") for line in compare(slower, baseline, tolerance=0.25))
+
+def test_baselines_from_another_runner_are_not_compared(monkeypatch):
+    monkeypatch.setenv("BENCHMARK_RUNNER", "ci-large")
+    config = BenchmarkConfig()
+    baseline = {"config": config._asdict(), "environment": runner_environment()}
+
+    assert comparable(config, baseline) is None
+    assert "requests" in comparable(config._replace(requests=10), baseline)
+
+    monkeypatch.setenv("BENCHMARK_RUNNER", "laptop")
+    assert "runner" in comparable(config, baseline)
+    assert "different runner" in comparable(config, {"config": config._asdict()})
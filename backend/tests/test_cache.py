@@ -0,0 +1,35 @@
+import time
+
+from app.utils.cache import TTLCache
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_entries_expire(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    assert cache.get("a") is None
+
+def test_pop_invalidates():
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.get("a") is None
+    assert cache.pop("a") is None
@@ -0,0 +1,101 @@
+import gzip
+
+import pytest
+from fastapi import Body, FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import BodyTooLarge, CompressionMiddleware, brotli, decompress_body, negotiate_encoding
+
+compression_app = FastAPI()
+compression_app.add_middleware(CompressionMiddleware, minimum_size=100, decompress_paths=("/echo",))
+
+@compression_app.get("/large")
+async def large():
+    return PlainTextResponse("x" * 1000)
+
+@compression_app.get("/small")
+async def small():
+    return PlainTextResponse("x" * 10)
+
+@compression_app.get("/encoded")
+async def encoded():
+    return PlainTextResponse(gzip.compress(b"x" * 1000), headers={"Content-Encoding": "gzip"})
+
+@compression_app.post("/echo")
+async def echo(payload: dict = Body(...)):
+    return payload
+
+client = TestClient(compression_app)
+
+def test_large_response_is_gzipped():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == "x" * 1000
+
+def test_small_and_encoded_responses_pass_through():
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert client.get("/encoded", headers={"Accept-Encoding": "br, gzip"}).text == "x" * 1000
+
+def test_gzipped_request_body_is_decompressed():
+    response = client.post(
+        "/echo",
+        content=gzip.compress(b'{"title": "compressed"}'),
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"title": "compressed"}
+
+def test_corrupt_request_body_is_rejected():
+    response = client.post(
+        "/echo",
+        content=b"not gzip",
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 400
+
+def test_gzip_bomb_is_rejected_as_too_large():
+    bomb = gzip.compress(b"\0" * 20_000_000)
+    response = client.post(
+        "/echo",
+        content=bomb,
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 413
+
+def test_negotiation_honours_q_values():
+    assert negotiate_encoding("gzip;q=0.5, identity") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("") is None
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_brotli_is_preferred_when_available():
+    assert negotiate_encoding("gzip, br") == "br"
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_brotli_bomb_is_rejected_without_being_inflated():
+    # A few hundred bytes that inflate to 200 MB
+    bomb = brotli.compress(b"\0" * 200_000_000, quality=5)
+    assert len(bomb) < 1024
+
+    with pytest.raises(BodyTooLarge):
+        decompress_body(bomb, "br", max_size=1024 * 1024)
+    response = client.post(
+        "/echo",
+        content=bomb,
+        headers={"Content-Encoding": "br", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 413
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_brotli_request_body_is_decompressed():
+    body = b'{"title": "' + b"x" * 200_000 + b'"}'
+
+    assert decompress_body(brotli.compress(body), "br", max_size=len(body)) == body
+    with pytest.raises(BodyTooLarge):
+        decompress_body(brotli.compress(body), "br", max_size=len(body) - 1)
+    with pytest.raises(ValueError):
+        decompress_body(brotli.compress(body)[:-4], "br", max_size=len(body))
@@ -0,0 +1,16 @@
+from app.utils.etag import etag_matches, make_etag
+
+def test_etag_depends_on_every_part():
+    assert make_etag("u1", "5", "page") == make_etag("u1", "5", "page")
+    assert make_etag("u1", "5", "page") != make_etag("u1", "6", "page")
+    assert make_etag("u1", "5", "page").startswith('"')
+
+def test_if_none_match_parsing():
+    etag = make_etag("u1", "5")
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches(f"W/{etag}", etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
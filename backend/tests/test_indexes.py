@@ -0,0 +1,78 @@
+import pytest
+from pymongo import ASCENDING, IndexModel
+
+from app.db import indexes
+from app.db.indexes import INDEXES, IndexDrift, _compare, _main, _normalize_key, ensure_indexes, index_drift
+
+USERS = {"users": INDEXES["users"]}
+
+def _document(name):
+    return next(model.document for models in INDEXES.values() for model in models if model.document["name"] == name)
+
+def test_text_index_keys_compare_in_their_server_form():
+    desired = _document("user_text")
+    # What listIndexes returns for the same index
+    existing = {
+        "key": {"user_id": 1, "_fts": "text", "_ftsx": 1},
+        "name": "user_text",
+        "weights": {"title": 10, "description": 2},
+        "default_language": "english",
+        "language_override": "language",
+        "textIndexVersion": 3,
+    }
+
+    assert _normalize_key(desired["key"]) == _normalize_key(existing["key"]) == [("user_id", 1), ("_fts", "text")]
+    assert _compare(desired, existing) is None
+    assert _compare(desired, {**existing, "weights": {"title": 1, "description": 2}}) == "weights differs on title"
+
+def test_option_drift_is_reported():
+    title = _document("user_title")
+    # The server expands the collation with its defaults
+    expanded = {**title, "collation": {**title["collation"], "caseLevel": False, "version": "57.1"}}
+
+    assert _compare(title, expanded) is None
+    assert _compare(title, {**title, "collation": {"locale": "en", "strength": 3}}) == "collation differs on strength"
+    assert _compare(_document("email_unique"), {"key": {"email": 1.0}, "name": "email_unique"}) == "unique is False"
+    assert _compare(_document("user_due_date"), {"key": {"user_id": 1, "due_date": -1, "_id": 1}}).startswith("key ")
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_and_rebuilds_registry_indexes(fake_mongo, monkeypatch):
+    monkeypatch.setattr(indexes, "INDEXES", USERS)
+    await fake_mongo.users.create_indexes([
+        IndexModel([("email", ASCENDING)], name="email_unique"),
+        IndexModel([("full_name", ASCENDING)], name="manual"),
+    ])
+
+    drift = await ensure_indexes(fake_mongo)
+
+    assert drift == [
+        IndexDrift("users", "email_unique", "changed", "unique is False"),
+        IndexDrift("users", "username_unique", "missing"),
+        IndexDrift("users", "manual", "extra"),
+    ]
+    # Extra indexes are reported but never dropped
+    assert await index_drift(fake_mongo) == [IndexDrift("users", "manual", "extra")]
+    assert await ensure_indexes(fake_mongo) == [IndexDrift("users", "manual", "extra")]
+
+class _Client:
+    def __init__(self, database):
+        self.database = database
+
+    def get_database(self):
+        return self.database
+
+    def close(self):
+        pass
+
+@pytest.mark.asyncio
+async def test_check_exits_non_zero_on_drift(fake_mongo, monkeypatch, capsys):
+    monkeypatch.setattr(indexes, "INDEXES", USERS)
+    monkeypatch.setattr(indexes, "AsyncIOMotorClient", lambda uri, **kwargs: _Client(fake_mongo))
+
+    assert await _main("mongodb://test", apply=False) == 1
+    assert "missing  users.email_unique" in capsys.readouterr().out
+    assert await index_drift(fake_mongo) != []
+
+    assert await _main("mongodb://test", apply=True) == 0
+    assert await _main("mongodb://test", apply=False) == 0
+    assert capsys.readouterr().out.endswith("Indexes are in sync with the registry\n")
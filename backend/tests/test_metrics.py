@@ -0,0 +1,100 @@
+import json
+import os
+from types import SimpleNamespace
+
+from app.core.metrics import (
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    collect,
+    mark_process_dead,
+    mongo_command_seconds,
+    prepare_metrics_dir,
+    render_prometheus,
+    snapshot,
+    write_snapshot,
+)
+from app.core.monitoring import MongoCommandListener
+
+def _unregister(*metrics):
+    for metric in metrics:
+        REGISTRY.remove(metric)
+
+def test_prometheus_text_format():
+    counter = Counter("test_events_total", "Events", labelnames=("kind",))
+    histogram = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    try:
+        counter.inc(kind='say "hi"')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        text = render_prometheus()
+    finally:
+        _unregister(counter, histogram)
+
+    assert "# TYPE test_events_total counter" in text
+    assert 'test_events_total{kind="say \\"hi\\""} 1' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_sum 5.55" in text
+    assert "test_latency_seconds_count 3" in text
+
+def test_gauge_goes_up_and_down():
+    gauge = Gauge("test_connections", "Connections", labelnames=("state",))
+    try:
+        gauge.inc(3, state="open")
+        gauge.dec(state="open")
+        gauge.set(2, state="in_use")
+        text = render_prometheus()
+    finally:
+        _unregister(gauge)
+
+    assert "# TYPE test_connections gauge" in text
+    assert 'test_connections{state="open"} 2' in text
+    assert 'test_connections{state="in_use"} 2' in text
+
+def test_mongo_command_listener_records_durations():
+    def count():
+        samples = dict(mongo_command_seconds.samples())
+        return samples.get(("find", "success"), ([], 0.0, 0))[2]
+
+    listener = MongoCommandListener()
+    before = count()
+    event = SimpleNamespace(command_name="find", database_name="t", connection_id=("h", 1), request_id=7, duration_micros=1500)
+    listener.started(event)
+    listener.succeeded(event)
+
+    assert count() == before + 1
+
+def test_workers_metrics_are_summed(tmp_path):
+    directory = str(tmp_path)
+    counter = Counter("test_requests_total", "Requests")
+    gauge = Gauge("test_streams", "Streams")
+    histogram = Histogram("test_latency_seconds", "Latency", buckets=(1.0,))
+    try:
+        prepare_metrics_dir(directory)
+        counter.inc(2)
+        gauge.set(1)
+        histogram.observe(0.5)
+        # Another worker, as of its last snapshot
+        with open(os.path.join(directory, "1.json"), "w") as f:
+            json.dump(snapshot(), f)
+        counter.inc(3)
+        write_snapshot(directory)
+
+        text = render_prometheus(collect(directory))
+        assert "test_requests_total 7" in text
+        assert "test_streams 2" in text
+        assert 'test_latency_seconds_bucket{le="1"} 2' in text
+
+        # Totals survive the other worker exiting; its gauges do not
+        mark_process_dead(directory, 1)
+        text = render_prometheus(collect(directory))
+        assert set(os.listdir(directory)) == {"archive.json", f"{os.getpid()}.json", "lock"}
+        assert "test_requests_total 7" in text
+        assert "test_streams 1" in text
+        assert "test_latency_seconds_count 2" in text
+    finally:
+        _unregister(counter, gauge, histogram)
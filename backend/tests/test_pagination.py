@@ -0,0 +1,33 @@
+import pytest
+from bson import ObjectId
+from datetime import datetime
+
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "created_at": datetime(2024, 5, 1, 12, 30, 15, 123000)}
+    cursor = encode_cursor(doc)
+
+    position = decode_cursor(cursor)
+    assert position["k"] == "created_at"
+    assert position["v"] == doc["created_at"]
+    assert position["i"] == doc["_id"]
+
+def test_keyset_filter_breaks_ties_on_id():
+    doc = {"_id": ObjectId(), "created_at": datetime(2024, 5, 1)}
+    query = keyset_filter(encode_cursor(doc))
+
+    assert query == {
+        "$or": [
+            {"created_at": {"$gt": doc["created_at"]}},
+            {"created_at": doc["created_at"], "_id": {"$gt": doc["_id"]}},
+        ]
+    }
+
+def test_empty_cursor_selects_first_page():
+    assert keyset_filter("") == {}
+    assert keyset_filter(None) == {}
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(InvalidCursor):
+        keyset_filter("not-a-cursor")
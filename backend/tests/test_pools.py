@@ -0,0 +1,67 @@
+import socket
+import time
+from types import SimpleNamespace
+
+import pytest
+from pymongo import monitoring
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.db.pools import InstrumentedBlockingConnectionPool, MongoPoolListener, PoolStats
+
+def test_pool_stats_snapshot_reports_waits_and_saturation():
+    stats = PoolStats("test", capacity=4)
+    for wait in (0.001, 0.002, 0.003, 0.010):
+        stats.checkout_started()
+        stats.checked_out(wait)
+    stats.checked_in()
+    stats.checkout_started()
+    stats.checkout_failed(timed_out=True)
+
+    snapshot = stats.snapshot()
+    assert snapshot["in_use"] == 3
+    assert snapshot["waiting"] == 0
+    assert snapshot["saturation"] == 0.75
+    assert snapshot["checkout_timeouts"] == 1
+    assert snapshot["checkout_wait_ms"] == {"p50": 3.0, "p95": 10.0, "max": 10.0}
+
+def test_pool_stats_snapshot_without_checkouts():
+    snapshot = PoolStats("test").snapshot()
+    assert snapshot["saturation"] == 0.0
+    assert snapshot["checkout_wait_ms"] == {"p50": 0.0, "p95": 0.0, "max": 0.0}
+
+def test_mongo_pool_listener_tracks_connections_per_server():
+    stats = PoolStats("test")
+    listener = MongoPoolListener(stats)
+    listener.max_pool_size = 10
+    event = SimpleNamespace(address=("db", 27017), connection_id=1)
+
+    listener.pool_created(event)
+    listener.connection_created(event)
+    listener.connection_check_out_started(event)
+    listener.connection_checked_out(event)
+    assert (stats.capacity, stats.open, stats.in_use) == (10, 1, 1)
+
+    listener.connection_checked_in(event)
+    listener.connection_check_out_started(event)
+    listener.connection_check_out_failed(
+        SimpleNamespace(address=("db", 27017), reason=monitoring.ConnectionCheckOutFailedReason.TIMEOUT)
+    )
+    listener.connection_closed(event)
+    listener.pool_closed(event)
+    assert (stats.capacity, stats.open, stats.in_use, stats.timeouts) == (0, 0, 0, 1)
+
+@pytest.mark.asyncio
+async def test_redis_pool_fails_fast_when_the_server_is_down():
+    # Find a local port nothing listens on
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    stats = PoolStats("test")
+    pool = InstrumentedBlockingConnectionPool(host="127.0.0.1", port=port, max_connections=1, timeout=5, stats=stats)
+
+    started = time.perf_counter()
+    for _ in range(2):
+        with pytest.raises(RedisConnectionError):
+            await pool.get_connection("GET")
+    assert time.perf_counter() - started < 1
+    assert (stats.in_use, stats.waiting, stats.timeouts) == (0, 0, 0)
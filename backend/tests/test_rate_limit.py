@@ -0,0 +1,59 @@
+import pytest
+from httpx import AsyncClient
+
+from app.core.rate_limit import RateLimit, check_rate_limits
+from app.db.redis import cache
+
+def test_parse_limits():
+    assert RateLimit.parse("5/60") == RateLimit(5, 60)
+    assert RateLimit.parse("") is None
+    with pytest.raises(ValueError):
+        RateLimit.parse("0/60")
+    with pytest.raises(ValueError):
+        RateLimit.parse("five")
+
+@pytest.mark.asyncio
+async def test_requests_are_allowed_without_redis(monkeypatch):
+    monkeypatch.setattr(cache, "client", None)
+    assert await check_rate_limits("login", [("ip:127.0.0.1", RateLimit(1, 60))]) == 0
+
+@pytest.mark.asyncio
+async def test_sliding_window_in_redis(fake_redis):
+    login_ip = [("ip:10.0.0.1", RateLimit(2, 60))]
+
+    assert await check_rate_limits("login", login_ip) == 0
+    assert await check_rate_limits("login", login_ip) == 0
+    retry_after = await check_rate_limits("login", login_ip)
+    assert 0 < retry_after <= 60
+    # Rejected requests are not recorded, and other keys keep their own window
+    assert await fake_redis.zcard("ratelimit:login:ip:10.0.0.1") == 2
+    assert await check_rate_limits("login", [("ip:10.0.0.2", RateLimit(2, 60))]) == 0
+    # A request is rejected when any of its keys is over its limit
+    assert await check_rate_limits("login", [("ip:10.0.0.3", RateLimit(5, 60)), *login_ip]) > 0
+    assert await fake_redis.zcard("ratelimit:login:ip:10.0.0.3") == 0
+
+@pytest.mark.asyncio
+async def test_clients_behind_the_proxy_are_limited_separately(fake_mongo, fake_redis, fast_hashing):
+    from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+    from app.core.config import settings
+    from main import app
+
+    # The test client connects from 127.0.0.1, the default trusted proxy
+    proxied = ProxyHeadersMiddleware(app, trusted_hosts=settings.FORWARDED_ALLOW_IPS)
+    allowed = RateLimit.parse(settings.RATE_LIMIT_REGISTER_IP).requests
+
+    async with AsyncClient(app=proxied, base_url="http://test") as client:
+        async def register(n: int, ip: str):
+            return await client.post(
+                "/api/v1/auth/register",
+                json={"email": f"user{n}@example.com", "username": f"user{n}", "password": "password123"},
+                headers={"X-Forwarded-For": ip},
+            )
+
+        for n in range(allowed):
+            assert (await register(n, "203.0.113.1")).status_code != 429
+        rejected = await register(allowed, "203.0.113.1")
+        assert rejected.status_code == 429
+        assert 0 < int(rejected.headers["Retry-After"]) <= RateLimit.parse(settings.RATE_LIMIT_REGISTER_IP).seconds
+        assert (await register(allowed + 1, "203.0.113.2")).status_code != 429
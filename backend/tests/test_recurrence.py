@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pydantic import ValidationError
+
+from app.models.task import Recurrence
+from app.schemas.task import TaskCreate
+from app.services.recurrence import completes_occurrence, expand_heads, next_occurrence, next_task, occurrences
+
+ANCHOR = datetime(2024, 1, 31, 9, 0)
+
+def test_daily_rule_jumps_to_the_window():
+    rule = {"freq": "daily", "interval": 2}
+
+    found = occurrences(rule, ANCHOR, datetime(2030, 1, 1), datetime(2030, 1, 6))
+
+    assert found == (
+        datetime(2030, 1, 1, 9, 0),
+        datetime(2030, 1, 3, 9, 0),
+        datetime(2030, 1, 5, 9, 0),
+    )
+
+def test_weekly_rule_on_weekdays_counts_from_the_anchor():
+    # ANCHOR is a Wednesday; the rule repeats on Mondays and Fridays
+    rule = {"freq": "weekly", "by_weekday": [4, 0], "count": 4}
+
+    found = occurrences(rule, ANCHOR, datetime(2024, 1, 1), datetime(2024, 3, 1))
+
+    assert found == (
+        ANCHOR,
+        datetime(2024, 2, 2, 9, 0),
+        datetime(2024, 2, 5, 9, 0),
+        datetime(2024, 2, 9, 9, 0),
+    )
+    # Jumping into a later window keeps the count
+    assert occurrences(rule, ANCHOR, datetime(2024, 2, 6), datetime(2024, 3, 1)) == (datetime(2024, 2, 9, 9, 0),)
+
+def test_monthly_rule_skips_months_without_the_day():
+    rule = {"freq": "monthly", "count": 3}
+
+    assert occurrences(rule, ANCHOR, ANCHOR, datetime(2025, 1, 1)) == (
+        ANCHOR,
+        datetime(2024, 3, 31, 9, 0),
+        datetime(2024, 5, 31, 9, 0),
+    )
+
+def test_yearly_rule_on_february_29th():
+    rule = {"freq": "yearly"}
+
+    found = occurrences(rule, datetime(2024, 2, 29), datetime(2024, 3, 1), datetime(2033, 1, 1))
+
+    assert found == (datetime(2028, 2, 29), datetime(2032, 2, 29))
+
+def test_until_is_inclusive():
+    rule = {"freq": "daily", "until": datetime(2024, 2, 2, 9, 0)}
+
+    assert next_occurrence(rule, datetime(2024, 2, 1, 9, 0)) == datetime(2024, 2, 2, 9, 0)
+    assert next_occurrence(rule, datetime(2024, 2, 2, 9, 0)) is None
+
+def test_expansion_is_capped():
+    rule = {"freq": "daily"}
+
+    assert len(occurrences(rule, ANCHOR, ANCHOR, ANCHOR + timedelta(days=365), limit=10)) == 10
+
+def test_rule_validation():
+    with pytest.raises(ValidationError):
+        Recurrence(freq="daily", by_weekday=[1])
+    with pytest.raises(ValidationError):
+        Recurrence(freq="weekly", by_weekday=[7])
+    with pytest.raises(ValidationError):
+        TaskCreate(title="No anchor", recurrence={"freq": "daily"})
+
+    assert Recurrence(freq="weekly", by_weekday=[4, 0, 4]).by_weekday == [0, 4]
+
+def _head(**fields):
+    return {
+        "_id": ObjectId(),
+        "title": "Water plants",
+        "status": "todo",
+        "priority": "medium",
+        "user_id": "u1",
+        "due_date": ANCHOR,
+        "recurrence": {"freq": "daily", "count": 3},
+        "created_at": ANCHOR,
+        "updated_at": ANCHOR,
+        **fields,
+    }
+
+def test_virtual_occurrences_follow_the_head():
+    head = _head()
+
+    items = expand_heads([head], datetime(2024, 1, 1), datetime(2024, 3, 1))
+
+    assert [item["due_date"] for item in items] == [datetime(2024, 2, 1, 9, 0), datetime(2024, 2, 2, 9, 0)]
+    assert all(item["virtual"] and item["id"] == str(head["_id"]) for item in items)
+
+def test_completing_a_head_builds_the_next_occurrence():
+    head = _head()
+    done = {**head, "status": "done"}
+
+    assert completes_occurrence(head, done)
+    assert not completes_occurrence(done, done)
+    assert not completes_occurrence({**head, "next_id": ObjectId()}, done)
+
+    successor = next_task(done, ANCHOR)
+    assert successor["due_date"] == datetime(2024, 2, 1, 9, 0)
+    assert successor["status"] == "todo"
+    assert successor["recurrence"]["count"] == 2
+    assert successor["series_id"] == str(head["_id"])
+
+    last = {**head, "recurrence": {"freq": "daily", "count": 1}, "status": "done"}
+    assert next_task(last, ANCHOR) is None
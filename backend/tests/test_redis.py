@@ -0,0 +1,204 @@
+import asyncio
+import contextlib
+import socket
+import time
+
+import pytest
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.core.metrics import cache_requests_total
+from app.db import redis as redis_module
+from app.db.pools import InstrumentedBlockingConnectionPool, PoolStats
+
+@pytest.mark.asyncio
+async def test_get_or_load_loads_directly_when_redis_is_down(monkeypatch):
+    # Find a local port nothing listens on
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    pool = InstrumentedBlockingConnectionPool(
+        host="127.0.0.1", port=port, max_connections=2, timeout=5, stats=PoolStats("test")
+    )
+    monkeypatch.setattr(redis_module.cache, "client", Redis(connection_pool=pool, decode_responses=True))
+    redis_module.local_cache.clear()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return '{"ok": true}'
+
+    started = time.perf_counter()
+    assert await redis_module.get_or_load("tasks:down", loader, field="page") == '{"ok": true}'
+    assert time.perf_counter() - started < 1
+    assert calls == [1]
+
+async def _wait_behind_holder(holder_loader):
+    """Time a waiter that polls while another worker's load runs ``holder_loader``."""
+    started_loading = asyncio.Event()
+    calls = []
+
+    async def holder():
+        started_loading.set()
+        await asyncio.sleep(0.1)
+        return await holder_loader()
+
+    async def waiter_loader():
+        calls.append(1)
+        return None
+
+    holding = asyncio.ensure_future(redis_module._locked_load("task:1", None, holder, 300, wait=True))
+    await started_loading.wait()
+    started = time.perf_counter()
+    result = await redis_module._locked_load("task:1", None, waiter_loader, 300, wait=True)
+    elapsed = time.perf_counter() - started
+    return holding, result, elapsed, calls
+
+@pytest.mark.asyncio
+async def test_waiters_load_once_the_holder_caches_nothing(fake_redis):
+    async def missing():
+        return None
+
+    holding, result, elapsed, calls = await _wait_behind_holder(missing)
+
+    assert await holding is None
+    assert (result, calls) == (None, [1])
+    assert elapsed < 1
+
+@pytest.mark.asyncio
+async def test_waiters_load_once_the_holder_fails(fake_redis):
+    async def failing():
+        raise ConnectionError("database down")
+
+    holding, result, elapsed, calls = await _wait_behind_holder(failing)
+
+    with pytest.raises(ConnectionError):
+        await holding
+    assert (result, calls) == (None, [1])
+    assert elapsed < 1
+
+def _requests(tier, result):
+    return cache_requests_total.value(tier=tier, family="task", result=result)
+
+@pytest.mark.asyncio
+async def test_l1_tier_serves_repeat_reads_until_it_expires(fake_redis, monkeypatch):
+    await redis_module.set_cache("task:1", {"title": "a"})
+    redis_module.local_cache.clear()
+    before = {(tier, result): _requests(tier, result) for tier in ("l1", "l2") for result in ("hit", "miss")}
+
+    assert await redis_module.get_cache("task:1") == {"title": "a"}
+    assert await redis_module.get_cache("task:1") == {"title": "a"}
+    assert _requests("l1", "miss") - before["l1", "miss"] == 1
+    assert _requests("l2", "hit") - before["l2", "hit"] == 1
+    assert _requests("l1", "hit") - before["l1", "hit"] == 1
+
+    # Past the L1 TTL the entry is read from Redis again
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + settings.CACHE_L1_TTL_SECONDS + 1)
+    await fake_redis.set("task:1", '{"title": "b"}')
+    assert await redis_module.get_cache("task:1") == {"title": "b"}
+    assert _requests("l2", "hit") - before["l2", "hit"] == 2
+
+    assert await redis_module.get_cache("task:2") is None
+    assert _requests("l2", "miss") - before["l2", "miss"] == 1
+
+async def _listening(fake_redis):
+    listener = asyncio.ensure_future(redis_module._listen_for_invalidations())
+    while (await fake_redis.pubsub_numsub(redis_module.INVALIDATION_CHANNEL))[0][1] == 0:
+        await asyncio.sleep(0.01)
+    return listener
+
+async def _stop(listener):
+    listener.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await listener
+
+async def _bump_elsewhere(fake_redis, key):
+    # What delete_cache does on another worker
+    await fake_redis.incr(key)
+    await fake_redis.publish(redis_module.INVALIDATION_CHANNEL, key)
+
+async def _until_dropped(key):
+    for _ in range(200):
+        if redis_module.local_cache.get(key) is None:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{key} was not dropped from L1")
+
+@pytest.mark.asyncio
+async def test_other_workers_bumps_invalidate_l1(fake_redis):
+    listener = await _listening(fake_redis)
+    try:
+        version = await redis_module.get_version("tasks_version:u1")
+        assert await redis_module.get_version("tasks_version:u1") == version
+
+        await _bump_elsewhere(fake_redis, "tasks_version:u1")
+        await _until_dropped("tasks_version:u1")
+        assert int(await redis_module.get_version("tasks_version:u1")) == int(version) + 1
+    finally:
+        await _stop(listener)
+
+@pytest.mark.asyncio
+async def test_invalidation_listener_survives_unexpected_errors(fake_redis, monkeypatch):
+    monkeypatch.setattr(redis_module, "LISTENER_RETRY_SECONDS", 0.01)
+    pop = redis_module.local_cache.pop
+    failures = []
+
+    def pop_failing_once(key):
+        if not failures:
+            failures.append(key)
+            raise RuntimeError("unexpected")
+        return pop(key)
+
+    monkeypatch.setattr(redis_module.local_cache, "pop", pop_failing_once)
+    listener = await _listening(fake_redis)
+    try:
+        await redis_module.get_version("tasks_version:u1")
+        await _bump_elsewhere(fake_redis, "tasks_version:u1")
+        # The failed message may have been missed, so all of L1 is dropped
+        await _until_dropped("tasks_version:u1")
+        assert failures == ["tasks_version:u1"] and not listener.done()
+
+        # Once subscribed again, later invalidations still arrive
+        for _ in range(100):
+            await redis_module.get_version("tasks_version:u1")
+            await _bump_elsewhere(fake_redis, "tasks_version:u1")
+            await asyncio.sleep(0.02)
+            if redis_module.local_cache.get("tasks_version:u1") is None:
+                break
+        else:
+            raise AssertionError("the listener did not subscribe again")
+    finally:
+        await _stop(listener)
+
+@pytest.mark.asyncio
+async def test_pool_is_opened_warmed_and_closed(monkeypatch):
+    import fakeredis
+    from fakeredis.aioredis import FakeAsyncConnection
+
+    server = fakeredis.FakeServer()
+
+    def fake_pool(**kwargs):
+        return InstrumentedBlockingConnectionPool(
+            connection_class=FakeAsyncConnection, server=server, stats=PoolStats("test"), **kwargs
+        )
+
+    monkeypatch.setattr(redis_module, "InstrumentedBlockingConnectionPool", fake_pool)
+    monkeypatch.setattr(settings, "REDIS_MIN_CONNECTIONS", 3)
+    # fakeredis connections do not answer the pool's health check PINGs
+    monkeypatch.setattr(settings, "REDIS_HEALTH_CHECK_INTERVAL_SECONDS", 0)
+    await redis_module.connect_to_redis()
+    pool, listener = redis_module.cache.pool, redis_module.cache.listener
+    try:
+        assert redis_module.cache.client.connection_pool is pool
+        # Warmed connections wait in the pool, next to the invalidation listener's
+        assert len(pool._available_connections) + len(pool._in_use_connections) >= 3
+        assert (await redis_module.check_redis())["ok"]
+        await redis_module.set_cache("task:1", {"title": "a"})
+    finally:
+        await redis_module.close_redis_connection()
+
+    assert (redis_module.cache.client, redis_module.cache.pool, redis_module.cache.listener) == (None, None, None)
+    assert listener.cancelled()
+    # Nothing cached by the closed client is served afterwards
+    assert await redis_module.get_cache("task:1") is None
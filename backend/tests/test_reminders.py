@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.models.task import TaskStatus
+from app.services.reminders import (
+    NOTIFIERS,
+    PROCESSING_KEY,
+    REMINDERS_KEY,
+    MemoryNotifier,
+    Notifier,
+    Reminder,
+    deliver_due_reminders,
+    reminder_changes,
+    reminder_score,
+)
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+DUE = datetime(2024, 1, 2)
+
+def _task(**fields):
+    return {"_id": ObjectId(), "status": "todo", "due_date": DUE, **fields}
+
+def test_reminder_is_due_ahead_of_the_due_date():
+    due = DUE.replace(tzinfo=timezone.utc).timestamp()
+
+    assert reminder_score(_task(), NOW) == due - settings.REMINDER_LEAD_SECONDS
+    assert reminder_score(_task(status=TaskStatus.DONE), NOW) is None
+    assert reminder_score(_task(due_date=None), NOW) is None
+    # Tasks already past their due date get no reminder
+    assert reminder_score(_task(due_date=datetime(2023, 12, 31)), NOW) is None
+
+def test_changes_schedule_move_and_cancel_reminders():
+    task = _task()
+    moved = {**task, "due_date": DUE + timedelta(days=1)}
+    done = {**task, "status": "done"}
+    task_id = str(task["_id"])
+
+    additions, removals = reminder_changes([(None, task)], NOW)
+    assert list(additions) == [task_id] and removals == []
+
+    additions, removals = reminder_changes([(task, moved)], NOW)
+    assert additions == {task_id: reminder_score(moved, NOW)} and removals == []
+
+    assert reminder_changes([(task, dict(task))], NOW) == ({}, [])
+    assert reminder_changes([(task, done)], NOW) == ({}, [task_id])
+    assert reminder_changes([(task, None)], NOW) == ({}, [task_id])
+
+@pytest.mark.asyncio
+async def test_memory_notifier_keeps_what_it_delivered():
+    notifier = NOTIFIERS["memory"]()
+    reminder = Reminder("t1", "u1", "Pay rent", DUE)
+
+    await notifier.notify([reminder])
+
+    assert isinstance(notifier, MemoryNotifier)
+    assert notifier.sent == [reminder]
+
+def test_notifiers_must_implement_notify():
+    class Incomplete(Notifier):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+class FailingNotifier(Notifier):
+    async def notify(self, reminders):
+        raise ConnectionError("mail server down")
+
+async def _due_task(database, fake_redis, title):
+    # Due in ten minutes, so its reminder is due now
+    now = datetime.now(timezone.utc)
+    task = {"user_id": "u1", "title": title, "status": "todo", "due_date": now + timedelta(minutes=10)}
+    await database.tasks.insert_one(task)
+    await fake_redis.zadd(REMINDERS_KEY, {str(task["_id"]): now.timestamp() - 1})
+    return str(task["_id"])
+
+@pytest.mark.asyncio
+async def test_claimed_reminders_are_delivered_and_acknowledged(fake_mongo, fake_redis):
+    first = await _due_task(fake_mongo, fake_redis, "First")
+    second = await _due_task(fake_mongo, fake_redis, "Second")
+    notifier = MemoryNotifier()
+
+    assert await deliver_due_reminders(fake_mongo, notifier, batch_size=1) == 1
+    assert await deliver_due_reminders(fake_mongo, notifier, batch_size=1) == 1
+    assert await deliver_due_reminders(fake_mongo, notifier) == 0
+
+    assert [reminder.task_id for reminder in notifier.sent] == [first, second]
+    assert await fake_redis.zcard(REMINDERS_KEY) == 0
+    assert await fake_redis.zcard(PROCESSING_KEY) == 0
+
+@pytest.mark.asyncio
+async def test_reminders_are_redelivered_once_their_claim_expires(fake_mongo, fake_redis):
+    task_id = await _due_task(fake_mongo, fake_redis, "Pay rent")
+    notifier = MemoryNotifier()
+
+    # The worker holding the claim fails before acknowledging it
+    with pytest.raises(ConnectionError):
+        await deliver_due_reminders(fake_mongo, FailingNotifier())
+    assert await fake_redis.zrange(PROCESSING_KEY, 0, -1) == [task_id]
+
+    # Other workers leave it alone until the claim expires
+    assert await deliver_due_reminders(fake_mongo, notifier) == 0
+    await fake_redis.zadd(PROCESSING_KEY, {task_id: datetime.now(timezone.utc).timestamp() - 1})
+    assert await deliver_due_reminders(fake_mongo, notifier) == 1
+
+    assert [reminder.task_id for reminder in notifier.sent] == [task_id]
+    assert await fake_redis.zcard(PROCESSING_KEY) == 0
+
+@pytest.mark.asyncio
+async def test_reminders_of_finished_tasks_are_dropped(fake_mongo, fake_redis):
+    task_id = await _due_task(fake_mongo, fake_redis, "Done already")
+    await fake_mongo.tasks.update_one({"user_id": "u1"}, {"$set": {"status": "done"}})
+    notifier = MemoryNotifier()
+
+    assert await deliver_due_reminders(fake_mongo, notifier) == 1
+    assert notifier.sent == []
+    assert await fake_redis.zscore(PROCESSING_KEY, task_id) is None
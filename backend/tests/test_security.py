@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from passlib.context import CryptContext
+
+from app.core import security
+from app.core.config import settings
+from app.core.metrics import password_hash_queue_seconds, password_hash_seconds
+from app.core.security import hash_password
+
+pytestmark = pytest.mark.asyncio
+
+class SlowContext:
+    """Stands in for the CryptContext, recording where and how concurrently it hashes."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.threads = []
+        self.running = self.most_running = 0
+        self.lock = threading.Lock()
+
+    def hash(self, password):
+        with self.lock:
+            self.threads.append(threading.current_thread().name)
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+        return f"hashed:{password}"
+
+def _totals(histogram, operation):
+    samples = dict(histogram.samples())
+    _, total, count = samples.get((operation,), ([], 0.0, 0))
+    return total, count
+
+async def test_hashing_runs_off_the_event_loop(monkeypatch):
+    context = SlowContext(0.2)
+    monkeypatch.setattr(security, "pwd_context", context)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.ensure_future(tick())
+    try:
+        assert await hash_password("secret") == "hashed:secret"
+    finally:
+        ticker.cancel()
+
+    assert context.threads[0].startswith("password-hash")
+    # The loop kept running while the hash was computed
+    assert ticks >= 10
+
+async def test_hashing_pool_is_bounded_and_queue_waits_are_recorded(monkeypatch):
+    assert security.hash_executor._max_workers == settings.PASSWORD_HASH_WORKERS
+    context = SlowContext(0.1)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(security, "pwd_context", context)
+    monkeypatch.setattr(security, "hash_executor", executor)
+    queued_before, _ = _totals(password_hash_queue_seconds, "hash")
+    _, hashed_before = _totals(password_hash_seconds, "hash")
+
+    try:
+        await asyncio.gather(hash_password("a"), hash_password("b"), hash_password("c"))
+    finally:
+        executor.shutdown()
+
+    assert context.most_running == 1
+    queued, _ = _totals(password_hash_queue_seconds, "hash")
+    _, hashed = _totals(password_hash_seconds, "hash")
+    # The second job waited for one hash, the third for two
+    assert queued - queued_before >= 0.25
+    assert hashed - hashed_before == 3
+
+async def test_login_upgrades_hashes_made_with_other_rounds(api_client, login, fake_mongo, monkeypatch):
+    await login("alice")
+    assert (await fake_mongo.users.find_one({"username": "alice"}))["hashed_password"].startswith("$2b$04$")
+
+    # BCRYPT_ROUNDS was raised since the password was hashed
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+    for _ in range(2):
+        response = await api_client.post("/api/v1/auth/login", data={"username": "alice", "password": "password123"})
+        assert response.status_code == 200
+        upgraded = (await fake_mongo.users.find_one({"username": "alice"}))["hashed_password"]
+        assert upgraded.startswith("$2b$05$")
+
+    response = await api_client.post("/api/v1/auth/login", data={"username": "alice", "password": "wrong"})
+    assert response.status_code == 401
+    assert (await fake_mongo.users.find_one({"username": "alice"}))["hashed_password"] == upgraded
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import socket
+
+import httpx
+import pytest
+from uvicorn import Config
+
+from app.core.server import DrainingServer, available_cpus
+from app.services.task_events import stream_events
+
+def test_available_cpus_is_within_the_affinity_mask():
+    assert 1 <= available_cpus() <= len(os.sched_getaffinity(0))
+
+async def _app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return
+    headers = [(b"content-type", b"text/event-stream")]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    if scope["path"] == "/events":
+        async for frame in stream_events("user"):
+            await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+    else:
+        await asyncio.sleep(0.5)
+        await send({"type": "http.response.body", "body": b"slow", "more_body": True})
+    await send({"type": "http.response.body", "body": b"done"})
+
+@pytest.mark.asyncio
+async def test_shutdown_ends_streams_and_drains_requests():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = DrainingServer(Config(_app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+        async def read(path):
+            async with client.stream("GET", path) as response:
+                return b"".join([chunk async for chunk in response.aiter_bytes()])
+
+        stream = asyncio.ensure_future(read("/events"))
+        slow = asyncio.ensure_future(read("/slow"))
+        await asyncio.sleep(0.1)
+        server.should_exit = True
+
+        assert (await asyncio.wait_for(stream, 2)).endswith(b"done")
+        assert await asyncio.wait_for(slow, 2) == b"slowdone"
+        await asyncio.wait_for(serving, 2)
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*[flight.do("key", load) for _ in range(10)])
+
+    assert results == [1] * 10
+    assert calls == 1
+    assert not flight.in_flight("key")
+
+async def test_errors_reach_every_waiter_and_are_not_cached():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await flight.do("key", succeed) == "ok"
+
+async def test_cancelled_caller_does_not_cancel_the_load():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.ensure_future(flight.do("key", load))
+    second = asyncio.ensure_future(flight.do("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.db.redis import cache
+from app.services import task_events, token_versions
+from app.services.task_events import (
+    READY_FRAME,
+    RESYNC_FRAME,
+    Subscription,
+    close_streams,
+    close_unauthorized_streams,
+    publish_task_events,
+    stream_events,
+    task_deleted,
+    task_event,
+)
+
+def test_task_event_frames():
+    assert task_deleted("abc") == 'event: task.deleted\ndata: {"id":"abc"}\n\n'
+    assert task_event("updated", "abc", changes={"status": "done"}) == (
+        'event: task.updated\ndata: {"id":"abc","changes":{"status":"done"}}\n\n'
+    )
+
+@pytest.mark.asyncio
+async def test_slow_subscription_is_told_to_resync():
+    subscription = Subscription("user", size=2)
+    for number in range(3):
+        subscription.deliver(task_deleted(str(number)))
+
+    assert subscription.queue.qsize() == 1
+    assert subscription.queue.get_nowait() == RESYNC_FRAME
+
+@pytest.mark.asyncio
+async def test_events_reach_only_the_users_streams(monkeypatch):
+    monkeypatch.setattr(cache, "client", None)
+    mine, theirs = stream_events("me"), stream_events("them")
+    assert await mine.__anext__() == READY_FRAME
+    assert await theirs.__anext__() == READY_FRAME
+
+    await publish_task_events("me", [task_deleted("1"), task_deleted("2")])
+
+    assert await mine.__anext__() == task_deleted("1") + task_deleted("2")
+    assert all(subscription.queue.empty() for subscription in task_events.hub.subscribers["them"])
+    await mine.aclose()
+    assert "me" not in task_events.hub.subscribers
+    await theirs.aclose()
+    assert task_events.hub.subscribers == {}
+
+@pytest.mark.asyncio
+async def test_closed_streams_end_after_queued_events():
+    stream = stream_events("me")
+    assert await stream.__anext__() == READY_FRAME
+    next(iter(task_events.hub.subscribers["me"])).deliver(task_deleted("1"))
+
+    close_streams()
+
+    assert [frame async for frame in stream] == [task_deleted("1")]
+    assert task_events.hub.subscribers == {}
+
+@pytest.mark.asyncio
+async def test_streams_end_when_their_credentials_expire_or_are_revoked():
+    now = datetime.now(timezone.utc)
+    expired = stream_events("me", expires_at=now - timedelta(seconds=1), token_version=1)
+    revoked = stream_events("them", expires_at=now + timedelta(hours=1), token_version=1)
+    valid = stream_events("me", expires_at=now + timedelta(hours=1), token_version=1)
+    for stream in (expired, revoked, valid):
+        assert await stream.__anext__() == READY_FRAME
+    token_versions.version_cache.set("me", 1)
+    token_versions.version_cache.set("them", 2)
+
+    try:
+        await close_unauthorized_streams()
+    finally:
+        token_versions.version_cache.pop("me")
+        token_versions.version_cache.pop("them")
+
+    assert [frame async for frame in expired] == []
+    assert [frame async for frame in revoked] == []
+    assert [s.closed for s in task_events.hub.subscribers["me"]] == [False]
+    await valid.aclose()
+    assert task_events.hub.subscribers == {}
@@ -0,0 +1,72 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services import task_export
+
+pytestmark = pytest.mark.asyncio
+
+async def _create(api_client, headers, count):
+    response = await api_client.post(
+        "/api/v1/tasks/bulk", json=[{"title": f"Task {n}", "priority": "high"} for n in range(count)], headers=headers
+    )
+    return [result["id"] for result in response.json()]
+
+async def test_ndjson_export_streams_every_task_in_batches(api_client, login, fake_mongo, monkeypatch):
+    alice, bob = await login("alice"), await login("bob")
+    ids = await _create(api_client, alice, 7)
+    await _create(api_client, bob, 1)
+    # Several cursor batches and several output chunks
+    monkeypatch.setattr(settings, "TASK_EXPORT_BATCH_SIZE", 3)
+    monkeypatch.setattr(task_export, "CHUNK_SIZE", 200)
+    cursor_class = type(fake_mongo.tasks.find({}))
+    batch_sizes = []
+    batch_size = cursor_class.batch_size
+
+    def record_batch_size(self, size):
+        batch_sizes.append(size)
+        return batch_size(self, size)
+
+    monkeypatch.setattr(cursor_class, "batch_size", record_batch_size)
+
+    response = await api_client.get("/api/v1/tasks/export", headers=alice)
+    assert batch_sizes == [3]
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.ndjson"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert list(rows[0]) == list(task_export.EXPORT_FIELDS)
+    assert (rows[0]["title"], rows[0]["priority"], rows[0]["due_date"]) == ("Task 0", "high", None)
+
+async def test_csv_export_of_selected_fields(api_client, login):
+    headers = await login("alice")
+    ids = await _create(api_client, headers, 2)
+
+    response = await api_client.get("/api/v1/tasks/export?format=csv&fields=id, title", headers=headers)
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert list(csv.reader(io.StringIO(response.text))) == [["id", "title"], [ids[0], "Task 0"], [ids[1], "Task 1"]]
+
+    response = await api_client.get("/api/v1/tasks/export?fields=title,secret", headers=headers)
+    assert (response.status_code, response.json()["detail"]) == (400, "Unknown export fields: secret")
+
+def test_projection_fetches_only_exported_fields():
+    assert task_export.projection_for(["title", "status"]) == {"_id": 0, "title": 1, "status": 1}
+    assert task_export.projection_for(["id", "due_date"]) == {"_id": 1, "due_date": 1}
+
+async def test_gzip_export_is_compressed_once(api_client, login):
+    headers = await login("alice")
+    ids = await _create(api_client, headers, 3)
+
+    async with api_client.stream(
+        "GET", "/api/v1/tasks/export?gzip=true&fields=id", headers={**headers, "Accept-Encoding": "identity"}
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+    lines = gzip.decompress(body).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ids
@@ -0,0 +1,49 @@
+import itertools
+from datetime import datetime
+
+import pytest
+
+from app.db.indexes import INDEXES
+from app.models.task import TaskPriority, TaskStatus
+from app.services.task_query import SORT_FIELDS, TaskFilter
+
+def test_filter_compiles_to_mongo_query():
+    filters = TaskFilter(
+        status=[TaskStatus.TODO, TaskStatus.DONE],
+        priority=[TaskPriority.HIGH],
+        due_after=datetime(2024, 1, 1),
+        due_before=datetime(2024, 2, 1),
+        sort="-due_date",
+    )
+
+    assert filters.to_query("u1") == {
+        "user_id": "u1",
+        "status": {"$in": ["done", "todo"]},
+        "priority": "high",
+        "due_date": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2024, 2, 1)},
+    }
+    assert filters.to_sort() == [("due_date", -1), ("_id", -1)]
+
+def test_cache_key_is_normalized():
+    a = TaskFilter(status=[TaskStatus.TODO, TaskStatus.DONE, TaskStatus.TODO])
+    b = TaskFilter(status=[TaskStatus.DONE, TaskStatus.TODO])
+    c = TaskFilter(status=[TaskStatus.DONE])
+
+    assert a.cache_key() == b.cache_key()
+    assert a.cache_key() != c.cache_key()
+    assert TaskFilter().cache_key() != TaskFilter(sort="-created_at").cache_key()
+
+@pytest.mark.parametrize(
+    "equality,sort_field",
+    list(itertools.product([(), ("status",), ("priority",), ("status", "priority")], SORT_FIELDS)),
+)
+def test_every_filter_shape_has_an_index(equality, sort_field):
+    index_keys = [list(index.document["key"]) for index in INDEXES["tasks"]]
+    # Any one equality field may follow user_id; the rest are residual filters
+    leading = [[field] for field in equality] or [[]]
+
+    assert any(
+        keys[: len(lead) + 2] == ["user_id", *lead, sort_field]
+        for keys in index_keys
+        for lead in leading
+    )
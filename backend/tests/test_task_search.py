@@ -0,0 +1,82 @@
+import pytest
+
+from app.core.config import settings
+from app.services.task_search import SNIPPET_CHARS, highlight, normalize_query, search_tasks, search_terms
+from app.utils.pagination import InvalidCursor, decode_offset_cursor, encode_offset_cursor
+
+def test_query_normalization():
+    assert normalize_query("  Quarterly   REPORT ") == "quarterly report"
+    assert normalize_query("ｒｅｐｏｒｔ") == "report"
+
+def test_search_terms_skip_negations_and_trim_inflections():
+    assert search_terms('reports "weekly sync" -draft') == ["report", "weekly", "sync"]
+
+def test_highlight_escapes_html():
+    assert highlight("Fix <b> in reporting", ["report"]) == "Fix &lt;b&gt; in <mark>reporting</mark>"
+    assert highlight("Nothing here", ["report"]) is None
+
+def test_highlight_snippet_is_centred_on_first_match():
+    text = "x " * 200 + "the report" + " y" * 200
+    marked = highlight(text, ["report"], snippet=True)
+
+    assert "<mark>report</mark>" in marked
+    assert marked.startswith("…") and marked.endswith("…")
+    assert len(marked) < SNIPPET_CHARS + 20
+
+def test_offset_cursor_is_bound_to_query():
+    cursor = encode_offset_cursor(40, "report")
+
+    assert decode_offset_cursor(cursor, "report") == 40
+    assert decode_offset_cursor(None, "report") == 0
+    with pytest.raises(InvalidCursor):
+        decode_offset_cursor(cursor, "other")
+    with pytest.raises(InvalidCursor):
+        decode_offset_cursor("garbage!", "report")
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        return self
+
+    def collation(self, collation):
+        return self
+
+    def limit(self, count):
+        return _Cursor(self.docs[:count])
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+class _Tasks:
+    """Answers the text and title queries of search_tasks from fixed, ordered hits."""
+
+    def __init__(self, text_hits, title_hits):
+        self.text_hits, self.title_hits = text_hits, title_hits
+
+    def find(self, query, projection=None):
+        if "$text" in query:
+            return _Cursor([{"_id": task_id, "score": score} for task_id, score in self.text_hits])
+        if "title" in query:
+            return _Cursor([{"_id": task_id} for task_id in self.title_hits])
+        ids = query["_id"]["$in"]
+        return _Cursor([{"_id": task_id, "title": str(task_id)} for task_id in ids])
+
+@pytest.mark.asyncio
+async def test_search_pages_rank_one_window(monkeypatch):
+    monkeypatch.setattr(settings, "TASK_SEARCH_MAX_RESULTS", 6)
+    # "late" is a weak text match but a title prefix hit, so it ranks first
+    # whichever page is asked for; equal scores are ordered by id
+    text_hits = [("a", 3.0), ("b", 3.0), ("c", 2.0), ("d", 1.0), ("late", 0.5)]
+    tasks = _Tasks(text_hits, ["late", "title-only"])
+
+    pages = []
+    for offset in range(0, 6, 2):
+        page, has_more = await search_tasks(tasks, "u1", "report", offset, 2)
+        pages.append(([doc["_id"] for doc in page], has_more))
+
+    assert pages == [(["late", "title-only"], True), (["a", "b"], True), (["c", "d"], False)]
+    first, _ = await search_tasks(tasks, "u1", "report", 0, 1)
+    assert first[0]["score"] == 5.5
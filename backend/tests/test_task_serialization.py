@@ -0,0 +1,44 @@
+import json
+from datetime import datetime
+from typing import List
+
+import pytest
+from bson import ObjectId
+from pydantic import TypeAdapter, ValidationError
+
+from app.schemas.task import Task
+from app.services.task_serialization import dump_task, dump_task_page, dump_tasks
+
+def _doc(**overrides):
+    doc = {
+        "_id": ObjectId(),
+        "title": "Write report",
+        "description": None,
+        "status": "todo",
+        "priority": "high",
+        "due_date": datetime(2024, 5, 1, 12, 30, 0, 123000),
+        "user_id": "user-1",
+        "created_at": datetime(2024, 4, 1, 8, 0),
+        "updated_at": datetime(2024, 4, 2, 9, 15, 30),
+        "extra": "not part of the schema",
+    }
+    doc.update(overrides)
+    return doc
+
+def test_trusted_path_matches_pydantic():
+    docs = [_doc(), _doc(due_date=None, description="notes")]
+    adapter = TypeAdapter(List[Task])
+    expected = adapter.dump_json(adapter.validate_python(docs))
+    assert json.loads(dump_tasks(docs)) == json.loads(expected)
+
+def test_page_envelope():
+    doc = _doc()
+    page = json.loads(dump_task_page([doc], "abc"))
+    assert page["next_cursor"] == "abc"
+    assert page["items"][0]["id"] == str(doc["_id"])
+
+def test_incomplete_documents_are_validated():
+    doc = _doc()
+    del doc["status"]
+    with pytest.raises(ValidationError):
+        dump_task(doc)
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.task import TaskStatus
+from app.services.task_stats import DIRTY_KEY, _due_score, apply_changes, get_stats, reconcile_dirty, stats_deltas
+
+def test_deltas_for_create_update_and_delete():
+    todo = {"status": "todo", "priority": "high"}
+    done = {"status": TaskStatus.DONE, "priority": "high"}
+
+    assert stats_deltas(None, todo) == {"total": 1, "status:todo": 1, "priority:high": 1}
+    assert stats_deltas(todo, done) == {"status:todo": -1, "status:done": 1}
+    assert stats_deltas(done, None) == {"total": -1, "status:done": -1, "priority:high": -1}
+    assert stats_deltas(todo, dict(todo)) == {}
+
+def test_only_unfinished_tasks_with_a_due_date_can_be_overdue():
+    due = datetime(2024, 1, 1)
+
+    assert _due_score({"status": "todo", "due_date": due}) == due.replace(tzinfo=timezone.utc).timestamp()
+    assert _due_score({"status": "done", "due_date": due}) is None
+    assert _due_score({"status": "todo", "due_date": None}) is None
+    aware = datetime(2024, 1, 1, 2, tzinfo=timezone(timedelta(hours=2)))
+    assert _due_score({"status": "todo", "due_date": aware}) == _due_score({"status": "todo", "due_date": due})
+
+@pytest.mark.asyncio
+async def test_writes_racing_a_rebuild_queue_another(fake_mongo, fake_redis):
+    task = {"user_id": "u1", "status": "todo", "priority": "high"}
+    await fake_mongo.tasks.insert_one(task)
+    await apply_changes("u1", [(None, task)])
+
+    # The write reached MongoDB before the rebuild's aggregation, but its
+    # deltas are applied after the rebuild stored its counters
+    assert (await get_stats(fake_mongo, "u1"))["total"] == 1
+    await apply_changes("u1", [(None, task)])
+    assert (await get_stats(fake_mongo, "u1"))["total"] == 2
+    assert await fake_redis.smembers(DIRTY_KEY) == {"u1"}
+
+    assert await reconcile_dirty(fake_mongo) == 1
+    assert (await get_stats(fake_mongo, "u1"))["total"] == 1
@@ -0,0 +1,158 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+pytestmark = pytest.mark.asyncio
+
+async def _create(api_client, headers, *titles):
+    response = await api_client.post("/api/v1/tasks/bulk", json=[{"title": title} for title in titles], headers=headers)
+    assert response.status_code == 200
+    return [result["id"] for result in response.json()]
+
+async def _total(api_client, headers):
+    return (await api_client.get("/api/v1/tasks/stats", headers=headers)).json()["total"]
+
+async def test_bulk_writes_report_each_item(api_client, login):
+    alice, bob = await login("alice"), await login("bob")
+    a, b = await _create(api_client, alice, "a", "b")
+    (other,) = await _create(api_client, bob, "other")
+
+    response = await api_client.patch(
+        "/api/v1/tasks/bulk",
+        json=[{"id": a, "status": "done"}, {"id": other, "status": "done"}, {"id": "bogus", "status": "done"}],
+        headers=alice,
+    )
+    assert [(r["id"], r["status"]) for r in response.json()] == [
+        (a, "updated"), (other, "forbidden"), ("bogus", "not_found"),
+    ]
+    assert (await api_client.get(f"/api/v1/tasks/{a}", headers=alice)).json()["status"] == "done"
+    assert (await api_client.get(f"/api/v1/tasks/{other}", headers=bob)).json()["status"] == "todo"
+
+    response = await api_client.request("DELETE", "/api/v1/tasks/bulk", json={"ids": [b, other]}, headers=alice)
+    assert [r["status"] for r in response.json()] == ["deleted", "forbidden"]
+    assert await _total(api_client, alice) == 1
+    assert await _total(api_client, bob) == 1
+
+async def test_repeated_ids_are_written_once(api_client, login):
+    headers = await login("alice")
+    a, b = await _create(api_client, headers, "a", "b")
+
+    response = await api_client.patch(
+        "/api/v1/tasks/bulk",
+        json=[{"id": a, "status": "done"}, {"id": a, "status": "done"}],
+        headers=headers,
+    )
+    assert [(r["status"], r["detail"]) for r in response.json()] == [("updated", None), ("failed", "Duplicate id")]
+    stats = (await api_client.get("/api/v1/tasks/stats", headers=headers)).json()
+    assert (stats["by_status"]["todo"], stats["by_status"]["done"]) == (1, 1)
+
+    response = await api_client.request("DELETE", "/api/v1/tasks/bulk", json={"ids": [b, b, "x", "y"]}, headers=headers)
+    assert [r["status"] for r in response.json()] == ["deleted", "failed", "not_found", "not_found"]
+    assert await _total(api_client, headers) == 1
+
+async def test_bulk_write_errors_are_reported_per_item(api_client, login, fake_mongo, monkeypatch):
+    headers = await login("alice")
+    a, b = await _create(api_client, headers, "a", "b")
+    bulk_write = type(fake_mongo.tasks).bulk_write
+
+    async def fail_second(self, operations, ordered=True):
+        await bulk_write(self, operations[:1], ordered=ordered)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "write conflict"}]})
+
+    monkeypatch.setattr(type(fake_mongo.tasks), "bulk_write", fail_second)
+    response = await api_client.patch(
+        "/api/v1/tasks/bulk", json=[{"id": a, "status": "done"}, {"id": b, "status": "done"}], headers=headers
+    )
+
+    assert [(r["status"], r["detail"]) for r in response.json()] == [("updated", None), ("failed", "write conflict")]
+    stats = (await api_client.get("/api/v1/tasks/stats", headers=headers)).json()
+    assert (stats["by_status"]["todo"], stats["by_status"]["done"]) == (1, 1)
+
+async def test_single_writes_tell_forbidden_from_missing(api_client, login):
+    alice, bob = await login("alice"), await login("bob")
+    (task_id,) = await _create(api_client, bob, "bob's")
+
+    for missing in (str(ObjectId()), "not-an-id"):
+        assert (await api_client.put(f"/api/v1/tasks/{missing}", json={"title": "x"}, headers=alice)).status_code == 404
+        assert (await api_client.delete(f"/api/v1/tasks/{missing}", headers=alice)).status_code == 404
+
+    assert (await api_client.put(f"/api/v1/tasks/{task_id}", json={"title": "x"}, headers=alice)).status_code == 403
+    assert (await api_client.delete(f"/api/v1/tasks/{task_id}", headers=alice)).status_code == 403
+    assert (await api_client.get(f"/api/v1/tasks/{task_id}", headers=bob)).json()["title"] == "bob's"
+
+async def test_write_during_a_task_load_is_not_served_stale(api_client, login, fake_mongo, monkeypatch):
+    headers = await login("alice")
+    (task_id,) = await _create(api_client, headers, "before")
+    find_one = type(fake_mongo.tasks).find_one
+    interleaved = []
+
+    async def load_then_write(self, *args, **kwargs):
+        document = await find_one(self, *args, **kwargs)
+        if not interleaved:
+            # The write lands after the read but before the result is cached
+            response = await api_client.put(f"/api/v1/tasks/{task_id}", json={"title": "after"}, headers=headers)
+            interleaved.append(response)
+        return document
+
+    monkeypatch.setattr(type(fake_mongo.tasks), "find_one", load_then_write)
+    stale = await api_client.get(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert stale.json()["title"] == "before" and interleaved[0].status_code == 200
+
+    fresh = await api_client.get(f"/api/v1/tasks/{task_id}", headers=headers)
+    assert fresh.json()["title"] == "after"
+    assert fresh.headers["etag"] != stale.headers["etag"]
+    revalidated = await api_client.get(
+        f"/api/v1/tasks/{task_id}", headers={**headers, "If-None-Match": stale.headers["etag"]}
+    )
+    assert revalidated.status_code == 200 and revalidated.json()["title"] == "after"
+
+async def test_update_response_matches_what_is_stored(api_client, login):
+    headers = await login("alice")
+    (task_id,) = await _create(api_client, headers, "a")
+
+    response = await api_client.put(
+        f"/api/v1/tasks/{task_id}", json={"due_date": "2030-01-02T10:00:00.123456+02:00"}, headers=headers
+    )
+    stored = (await api_client.get(f"/api/v1/tasks/{task_id}", headers=headers)).json()
+
+    assert response.json() == stored
+    assert stored["due_date"] == "2030-01-02T08:00:00.123000"
+
+async def test_recurring_tasks_keep_a_due_date(api_client, login):
+    headers = await login("alice")
+    recurring = (await api_client.post(
+        "/api/v1/tasks/",
+        json={"title": "Water plants", "due_date": "2030-01-01T09:00:00", "recurrence": {"freq": "daily"}},
+        headers=headers,
+    )).json()["id"]
+    (plain,) = await _create(api_client, headers, "plain")
+
+    response = await api_client.put(f"/api/v1/tasks/{recurring}", json={"due_date": None}, headers=headers)
+    assert (response.status_code, response.json()["detail"]) == (400, "A recurring task needs a due_date")
+    response = await api_client.put(f"/api/v1/tasks/{plain}", json={"recurrence": {"freq": "daily"}}, headers=headers)
+    assert response.status_code == 400
+    response = await api_client.put(
+        f"/api/v1/tasks/{plain}", json={"recurrence": {"freq": "daily"}, "due_date": None}, headers=headers
+    )
+    assert response.status_code == 422
+
+    response = await api_client.patch(
+        "/api/v1/tasks/bulk",
+        json=[{"id": recurring, "due_date": None}, {"id": plain, "recurrence": {"freq": "weekly"}}],
+        headers=headers,
+    )
+    assert [(r["status"], r["detail"]) for r in response.json()] == [
+        ("failed", "A recurring task needs a due_date"), ("failed", "A recurring task needs a due_date"),
+    ]
+    assert (await api_client.get(f"/api/v1/tasks/{recurring}", headers=headers)).json()["due_date"] is not None
+    assert (await api_client.get(f"/api/v1/tasks/{plain}", headers=headers)).json()["recurrence"] is None
+
+    # Stopping the series and clearing its date together is allowed
+    response = await api_client.put(
+        f"/api/v1/tasks/{recurring}", json={"recurrence": None, "due_date": None}, headers=headers
+    )
+    assert response.status_code == 200
+    response = await api_client.put(
+        f"/api/v1/tasks/{plain}", json={"recurrence": {"freq": "daily"}, "due_date": "2030-01-01T09:00:00"}, headers=headers
+    )
+    assert response.status_code == 200
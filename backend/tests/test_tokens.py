@@ -0,0 +1,64 @@
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.api.deps import _authenticate, get_event_stream_principal
+from app.core.config import settings
+from app.core.security import create_access_token, create_refresh_token
+from app.schemas.user import TokenPayload
+from app.services import token_versions
+
+def _claims(token):
+    return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+
+def test_tokens_carry_identity_version_and_type():
+    access = _claims(create_access_token("user-1", username="alice", version=3))
+    refresh = _claims(create_refresh_token("user-1", version=3))
+
+    assert {key: access[key] for key in ("sub", "username", "ver", "type")} == {
+        "sub": "user-1", "username": "alice", "ver": 3, "type": "access",
+    }
+    assert (refresh["sub"], refresh["ver"], refresh["type"]) == ("user-1", 3, "refresh")
+
+def test_tokens_issued_before_versions_default_to_access_version_zero():
+    payload = TokenPayload(sub="user-1", exp=1_900_000_000)
+    assert (payload.ver, payload.type, payload.username) == (0, "access", None)
+
+@pytest.mark.asyncio
+async def test_refresh_tokens_are_not_access_tokens():
+    with pytest.raises(HTTPException) as error:
+        await _authenticate(create_refresh_token("user-1"))
+    assert error.value.status_code == 403
+
+@pytest.mark.asyncio
+async def test_outdated_token_version_is_rejected():
+    token_versions.version_cache.set("user-2", 1)
+    try:
+        with pytest.raises(HTTPException):
+            await _authenticate(create_access_token("user-2", version=0))
+        principal = await _authenticate(create_access_token("user-2", username="bob", version=1))
+    finally:
+        token_versions.version_cache.pop("user-2")
+    assert (principal.id, principal.username) == ("user-2", "bob")
+
+@pytest.mark.asyncio
+async def test_event_streams_take_tickets_but_not_tokens_in_the_url(api_client, login):
+    headers = await login("alice")
+    token = headers["Authorization"].split()[1]
+
+    response = await api_client.post("/api/v1/tasks/events/ticket", headers=headers)
+    assert response.json()["expires_in"] == settings.TASK_EVENTS_TICKET_SECONDS
+    ticket = response.json()["ticket"]
+    claims = _claims(ticket)
+    assert claims["type"] == "stream"
+    # Streams opened with the ticket last as long as the access token
+    assert claims["until"] == _claims(token)["exp"]
+
+    principal = await get_event_stream_principal(token=None, ticket=ticket)
+    assert (principal.username, principal.expires_at.timestamp()) == ("alice", claims["until"])
+    with pytest.raises(HTTPException):
+        await _authenticate(ticket)
+    with pytest.raises(HTTPException):
+        await get_event_stream_principal(token=None, ticket=token)
+    response = await api_client.get(f"/api/v1/tasks/events?access_token={token}")
+    assert response.status_code == 401
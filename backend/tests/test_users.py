@@ -0,0 +1,18 @@
+import pytest
+
+from app.db.indexes import ensure_indexes
+
+pytestmark = pytest.mark.asyncio
+
+async def test_taking_another_users_name_or_email_is_rejected(api_client, login, fake_mongo):
+    await ensure_indexes(fake_mongo)
+    headers = await login("alice")
+    await login("bob")
+
+    for update in ({"username": "bob"}, {"email": "bob@example.com"}):
+        response = await api_client.put("/api/v1/users/me", json=update, headers=headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "User with this email or username already exists"
+
+    response = await api_client.put("/api/v1/users/me", json={"full_name": "Alice"}, headers=headers)
+    assert (response.status_code, response.json()["username"]) == (200, "alice")